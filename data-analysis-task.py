@@ -1,117 +1,1825 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns # Often used with matplotlib for enhanced visuals
-
-# --- 1. Generate a Sample CSV File ---
-# In a real scenario, you would replace this with pd.read_csv('your_file.csv')
-data = {
-    'Product_Category': np.random.choice(['Electronics', 'Apparel', 'Home Goods', 'Books', 'Food'], 100),
-    'Sales_Amount': np.random.randint(100, 1000, 100),
-    'Customer_Rating': np.random.uniform(2.0, 5.0, 100).round(1),
-    'Units_Sold': np.random.randint(1, 50, 100),
-    'Region': np.random.choice(['North', 'South', 'East', 'West'], 100),
-    'Order_Date': pd.to_datetime(pd.date_range(start='2023-01-01', periods=100, freq='D'))
-}
-df = pd.DataFrame(data)
-
-# Save to a CSV file (optional, but good for demonstration)
-csv_file_path = 'sample_sales_data.csv'
-df.to_csv(csv_file_path, index=False)
-print(f"Sample CSV '{csv_file_path}' created successfully.\n")
-
-# --- 2. Load the CSV File using Pandas ---
-try:
-    df_loaded = pd.read_csv(csv_file_path)
-    print("CSV file loaded successfully. First 5 rows:\n")
-    print(df_loaded.head())
-    print("\nData Info:\n")
-    df_loaded.info()
-except FileNotFoundError:
-    print(f"Error: The file '{csv_file_path}' was not found.")
-    exit()
-
-# --- 3. Perform Basic Data Analysis Tasks ---
-
-print("\n--- Basic Data Analysis ---")
-
-# Calculate the average of a selected column (e.g., 'Sales_Amount')
-average_sales = df_loaded['Sales_Amount'].mean()
-print(f"\nAverage Sales Amount: ${average_sales:.2f}")
-
-# Descriptive statistics for numerical columns
-print("\nDescriptive Statistics for Numerical Columns:\n")
-print(df_loaded.describe())
-
-# Value counts for categorical columns
-print("\nValue Counts for 'Product_Category':\n")
-print(df_loaded['Product_Category'].value_counts())
-
-print("\nValue Counts for 'Region':\n")
-print(df_loaded['Region'].value_counts())
-
-# Group by 'Product_Category' and calculate sum of 'Sales_Amount'
-sales_by_category = df_loaded.groupby('Product_Category')['Sales_Amount'].sum().sort_values(ascending=False)
-print("\nTotal Sales by Product Category:\n")
-print(sales_by_category)
-
-# --- 4. Create Visualizations using Matplotlib and Seaborn ---
-
-print("\n--- Data Visualizations ---")
-
-# Set a style for better aesthetics
-plt.style.use('seaborn-v0_8-darkgrid')
-
-# Figure 1: Bar Chart - Total Sales by Product Category
-plt.figure(figsize=(10, 6))
-sales_by_category.plot(kind='bar', color=sns.color_palette("viridis", len(sales_by_category)))
-plt.title('Total Sales Amount by Product Category', fontsize=16)
-plt.xlabel('Product Category', fontsize=12)
-plt.ylabel('Total Sales Amount ($)', fontsize=12)
-plt.xticks(rotation=45, ha='right')
-plt.grid(axis='y', linestyle='--', alpha=0.7)
-plt.tight_layout()
-plt.show()
-
-# Figure 2: Scatter Plot - Sales Amount vs. Customer Rating
-plt.figure(figsize=(10, 6))
-plt.scatter(df_loaded['Customer_Rating'], df_loaded['Sales_Amount'],
-            alpha=0.7, color='purple', edgecolors='w', linewidth=0.5)
-plt.title('Sales Amount vs. Customer Rating', fontsize=16)
-plt.xlabel('Customer Rating (1-5)', fontsize=12)
-plt.ylabel('Sales Amount ($)', fontsize=12)
-plt.grid(True, linestyle='--', alpha=0.6)
-plt.tight_layout()
-plt.show()
-
-# Figure 3: Heatmap - Correlation Matrix of Numerical Columns
-plt.figure(figsize=(8, 7))
-# Select only numerical columns for correlation
-numerical_df = df_loaded.select_dtypes(include=np.number)
-correlation_matrix = numerical_df.corr()
-sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', fmt=".2f", linewidths=.5)
-plt.title('Correlation Matrix of Numerical Features', fontsize=16)
-plt.xticks(rotation=45, ha='right')
-plt.yticks(rotation=0)
-plt.tight_layout()
-plt.show()
-
-# Figure 4: Distribution of Customer Ratings (Histogram)
-plt.figure(figsize=(8, 6))
-sns.histplot(df_loaded['Customer_Rating'], bins=10, kde=True, color='skyblue', edgecolor='black')
-plt.title('Distribution of Customer Ratings', fontsize=16)
-plt.xlabel('Customer Rating', fontsize=12)
-plt.ylabel('Frequency', fontsize=12)
-plt.grid(axis='y', linestyle='--', alpha=0.7)
-plt.tight_layout()
-plt.show()
-
-# Figure 5: Box Plot - Sales Amount by Region
-plt.figure(figsize=(10, 6))
-sns.boxplot(x='Region', y='Sales_Amount', data=df_loaded, palette='pastel')
-plt.title('Sales Amount Distribution by Region', fontsize=16)
-plt.xlabel('Region', fontsize=12)
-plt.ylabel('Sales Amount ($)', fontsize=12)
-plt.grid(axis='y', linestyle='--', alpha=0.7)
-plt.tight_layout()
-plt.show()
+import argparse
+import collections
+import contextlib
+import datetime
+import csv
+import glob
+import hashlib
+import io
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import pickle
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+try:
+    import resource
+except ImportError: # Windows: CPU time falls back to time.process_time and peak RSS is not reported
+    resource = None
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns # Often used with matplotlib for enhanced visuals
+
+# --- Configuration ---
+CSV_FILE_PATH = 'sample_sales_data.csv'
+SAMPLE_CATEGORIES = ['Electronics', 'Apparel', 'Home Goods', 'Books', 'Food']
+SAMPLE_REGIONS = ['North', 'South', 'East', 'West']
+CATEGORY_COLUMN = 'Product_Category'
+REGION_COLUMN = 'Region'
+SALES_COLUMN = 'Sales_Amount'
+DESCRIBE_PERCENTILES = [0.25, 0.5, 0.75]
+DEFAULT_CHUNKSIZE = 1_000_000 # Rows per chunk when streaming files
+EXACT_QUANTILE_MAX_DISTINCT = 100_000 # Above this many distinct values a column's percentiles come from a KLL sketch
+
+# Accuracy targets for the approximate (sketch-based) analysis mode:
+# rank_error      - normalized rank error of the percentiles (KLL)
+# distinct_error  - relative standard error of the distinct counts (HyperLogLog)
+# count_error     - overcount of value counts and group sums, as a fraction of the total (Count-Min)
+# failure_probability - chance that a Count-Min estimate exceeds count_error
+# top_k           - number of top categories/regions reported
+ErrorBounds = collections.namedtuple('ErrorBounds',
+                                     ['rank_error', 'distinct_error', 'count_error', 'failure_probability', 'top_k'])
+DEFAULT_ERROR_BOUNDS = ErrorBounds(rank_error=0.01, distinct_error=0.02, count_error=0.001,
+                                   failure_probability=0.01, top_k=20)
+
+# Explicit schema for the sales data, used instead of re-inferring dtypes from text
+SALES_DTYPES = {
+    'Product_Category': 'category',
+    'Sales_Amount': 'int64', # Kept wide: group sums inherit this dtype and must not overflow
+    'Customer_Rating': 'float64',
+    'Units_Sold': 'int16',
+    'Region': 'category',
+}
+DATE_COLUMN = 'Order_Date'
+DATE_COLUMNS = [DATE_COLUMN]
+CACHE_SUFFIX = '.parquet' # Columnar cache written next to the source CSV
+CACHE_META_SUFFIX = '.cache.json' # Fingerprint of the CSV the cache was built from
+SUMMARY_STATE_SUFFIX = '.summary.pkl' # Persisted aggregates for incremental refreshes
+SUMMARY_STATE_VERSION = 3
+SUMMARY_STATE_TAIL_BYTES = 4096 # Bytes before the read offset kept to detect rewrites
+PARTITION_INDEX = 'index.json' # Per-file date ranges of a month-partitioned dataset
+BENCHMARK_SIZES = [10_000, 100_000, 1_000_000] # Dataset sizes (rows) for the benchmark suite
+
+# --- 1. Generate a Sample CSV File ---
+def generate_sample_csv(csv_file_path=CSV_FILE_PATH):
+    """
+    Generates a small random sales dataset and saves it as a CSV file.
+    In a real scenario, you would replace this with your own export.
+    Args:
+        csv_file_path (str): Where to write the CSV file.
+    Returns:
+        pandas.DataFrame: The generated data.
+    """
+    data = {
+        'Product_Category': np.random.choice(SAMPLE_CATEGORIES, 100),
+        'Sales_Amount': np.random.randint(100, 1000, 100),
+        'Customer_Rating': np.random.uniform(2.0, 5.0, 100).round(1),
+        'Units_Sold': np.random.randint(1, 50, 100),
+        'Region': np.random.choice(SAMPLE_REGIONS, 100),
+        'Order_Date': pd.to_datetime(pd.date_range(start='2023-01-01', periods=100, freq='D'))
+    }
+    df = pd.DataFrame(data)
+
+    # Save to a CSV file (optional, but good for demonstration)
+    df.to_csv(csv_file_path, index=False)
+    print(f"Sample CSV '{csv_file_path}' created successfully.\n")
+    return df
+
+def _skewed_weights(count, skew):
+    """Zipf-like probabilities for count values: 1 / rank**skew (skew 0 is uniform)."""
+    weights = 1.0 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
+
+def iter_sales_batches(rows, batch_size=1_000_000, seed=0, categories=SAMPLE_CATEGORIES, regions=SAMPLE_REGIONS,
+                       category_skew=0.0, region_skew=0.0, start_date='2023-01-01', end_date='2023-12-31',
+                       rating_decimals=1, extra_columns=0):
+    """
+    Yields synthetic sales data as DataFrames of at most batch_size rows,
+    built with vectorized NumPy calls. The output is reproducible for a
+    given seed and batch size (each batch has its own seeded generator).
+    Orders are spread evenly over the date range in date order, like an
+    append-only export.
+    Args:
+        rows (int): Total number of rows.
+        batch_size (int): Rows per batch (bounds the memory in use).
+        seed (int): Random seed.
+        categories (list): Product category names.
+        regions (list): Region names.
+        category_skew (float): Zipf exponent for category popularity (0 = uniform).
+        region_skew (float): Zipf exponent for region popularity (0 = uniform).
+        start_date (str): Date of the first order.
+        end_date (str): Date of the last order.
+        rating_decimals (int): Decimals to round Customer_Rating to (None: no rounding).
+        extra_columns (int): Additional random float columns (Extra_1, ...) to widen the rows.
+    Yields:
+        pandas.DataFrame: The next batch.
+    """
+    start = np.datetime64(pd.Timestamp(start_date).date(), 'D')
+    days = (np.datetime64(pd.Timestamp(end_date).date(), 'D') - start).astype(int) + 1
+    category_weights = _skewed_weights(len(categories), category_skew)
+    region_weights = _skewed_weights(len(regions), region_skew)
+    category_names = pd.Index(categories)
+    region_names = pd.Index(regions)
+
+    batch_seeds = np.random.SeedSequence(seed).spawn(math.ceil(rows / batch_size))
+    for batch_number, batch_seed in enumerate(batch_seeds):
+        rng = np.random.default_rng(batch_seed)
+        first = batch_number * batch_size
+        size = min(batch_size, rows - first)
+        ratings = rng.uniform(2.0, 5.0, size)
+        if rating_decimals is not None:
+            ratings = ratings.round(rating_decimals)
+        batch = {
+            'Product_Category': pd.Categorical.from_codes(rng.choice(len(categories), size, p=category_weights),
+                                                          categories=category_names),
+            'Sales_Amount': rng.integers(100, 1000, size),
+            'Customer_Rating': ratings,
+            'Units_Sold': rng.integers(1, 50, size, dtype=np.int16),
+            'Region': pd.Categorical.from_codes(rng.choice(len(regions), size, p=region_weights),
+                                                categories=region_names),
+            'Order_Date': start + (np.arange(first, first + size) * days // rows).astype('timedelta64[D]'),
+        }
+        for extra in range(1, extra_columns + 1):
+            batch[f"Extra_{extra}"] = rng.random(size)
+        yield pd.DataFrame(batch)
+
+def generate_sales_data(output_path, rows, target_rows_per_second=None, **options):
+    """
+    Streams synthetic sales data to a CSV or (for a .parquet path) Parquet
+    file one batch at a time, so memory stays flat whatever the row count.
+    Reports the throughput achieved against an optional target.
+    Args:
+        output_path (str): File to write; the format follows the extension.
+        rows (int): Total number of rows.
+        target_rows_per_second (float): Throughput the run is expected to reach.
+        **options: Passed on to iter_sales_batches (seed, skews, dates, ...).
+    Returns:
+        float: The achieved throughput in rows per second.
+    """
+    to_parquet = output_path.endswith('.parquet')
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        if to_parquet:
+            raise ImportError("Parquet output needs pyarrow (pip install pyarrow).") from e
+        pa = None # CSV falls back to pandas' (slower) writer
+
+    start_time = time.perf_counter()
+    written = 0
+    writer = None
+    try:
+        for batch in iter_sales_batches(rows, **options):
+            if pa is None and not to_parquet:
+                batch.to_csv(output_path, index=False, header=written == 0, mode='w' if written == 0 else 'a')
+            else:
+                table = pa.Table.from_pandas(batch, preserve_index=False)
+                if not to_parquet:
+                    # Plain dates without a time part, as pandas writes them
+                    position = table.schema.get_field_index(DATE_COLUMN)
+                    table = table.set_column(position, DATE_COLUMN, table.column(DATE_COLUMN).cast(pa.date32()))
+                if writer is None:
+                    writer = (pq.ParquetWriter(output_path, table.schema) if to_parquet else
+                              pa_csv.CSVWriter(output_path, table.schema,
+                                               write_options=pa_csv.WriteOptions(quoting_style='none')))
+                writer.write_table(table)
+            written += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.perf_counter() - start_time
+    rate = written / elapsed if elapsed else math.inf
+    print(f"Generated {written} rows into '{output_path}' in {elapsed:.2f}s ({rate:,.0f} rows/s).")
+    if target_rows_per_second and rate < target_rows_per_second:
+        print(f"Warning: below the throughput target of {target_rows_per_second:,.0f} rows/s.")
+    return rate
+
+# --- 2. Load the CSV File using Pandas ---
+def load_csv(csv_file_path=CSV_FILE_PATH, use_cache=False):
+    """
+    Loads the whole CSV file into memory and prints a quick overview.
+    Args:
+        csv_file_path (str): Path to the CSV file.
+        use_cache (bool): Load through the typed columnar cache (see load_sales_data).
+    Returns:
+        pandas.DataFrame: The loaded data.
+    """
+    try:
+        df_loaded = load_sales_data(csv_file_path) if use_cache else pd.read_csv(csv_file_path)
+        print("CSV file loaded successfully. First 5 rows:\n")
+        print(df_loaded.head())
+        print("\nData Info:\n")
+        df_loaded.info()
+    except FileNotFoundError:
+        print(f"Error: The file '{csv_file_path}' was not found.")
+        exit()
+    return df_loaded
+
+def read_csv_typed(csv_file_path, columns=None):
+    """
+    Reads the CSV with the explicit sales schema instead of inferred dtypes.
+    Args:
+        csv_file_path (str): Path to the CSV file.
+        columns (list): Optional subset of columns to read.
+    Returns:
+        pandas.DataFrame: The typed data.
+    """
+    wanted = lambda column: columns is None or column in columns
+    return pd.read_csv(csv_file_path, usecols=columns,
+                       dtype={column: dtype for column, dtype in SALES_DTYPES.items() if wanted(column)},
+                       parse_dates=[column for column in DATE_COLUMNS if wanted(column)])
+
+def _file_sha256(file_path, block_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _cache_is_fresh(csv_file_path, cache_path, meta_path):
+    """
+    Checks whether the columnar cache was built from the current CSV contents.
+    A matching size and mtime is trusted as is; if only the mtime changed,
+    the content hash decides (and the stored mtime is refreshed).
+    """
+    if not (os.path.exists(cache_path) and os.path.exists(meta_path)):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    stat = os.stat(csv_file_path)
+    if meta.get('size') != stat.st_size:
+        return False
+    if meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    if meta.get('sha256') != _file_sha256(csv_file_path):
+        return False
+    meta['mtime_ns'] = stat.st_mtime_ns
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    return True
+
+def build_columnar_cache(csv_file_path, cache_path, meta_path, block_size=64 << 20):
+    """
+    Converts the CSV into a typed Parquet file, streaming it block by block
+    so that files larger than memory can be converted.
+    Args:
+        csv_file_path (str): Path to the source CSV file.
+        cache_path (str): Where to write the Parquet file.
+        meta_path (str): Where to write the source fingerprint.
+        block_size (int): Bytes of CSV text parsed per batch.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    column_types = {column: pa.dictionary(pa.int32(), pa.string()) if dtype == 'category'
+                    else pa.from_numpy_dtype(np.dtype(dtype))
+                    for column, dtype in SALES_DTYPES.items()}
+    column_types.update({column: pa.timestamp('ns') for column in DATE_COLUMNS})
+
+    reader = pa_csv.open_csv(csv_file_path,
+                             read_options=pa_csv.ReadOptions(block_size=block_size),
+                             convert_options=pa_csv.ConvertOptions(column_types=column_types))
+    tmp_path = cache_path + '.tmp'
+    with pq.ParquetWriter(tmp_path, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+    os.replace(tmp_path, cache_path)
+
+    stat = os.stat(csv_file_path)
+    with open(meta_path, 'w') as f:
+        json.dump({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                   'sha256': _file_sha256(csv_file_path)}, f)
+    print(f"Columnar cache '{cache_path}' built from '{csv_file_path}'.")
+
+def ensure_columnar_cache(csv_file_path):
+    """
+    Returns the path of an up-to-date columnar cache for the CSV, building it if needed.
+    Args:
+        csv_file_path (str): Path to the source CSV file.
+    Returns:
+        str: Path to the Parquet cache.
+    """
+    cache_path = csv_file_path + CACHE_SUFFIX
+    meta_path = csv_file_path + CACHE_META_SUFFIX
+    if not _cache_is_fresh(csv_file_path, cache_path, meta_path):
+        build_columnar_cache(csv_file_path, cache_path, meta_path)
+    return cache_path
+
+def load_sales_data(csv_file_path=CSV_FILE_PATH, columns=None, use_cache=True):
+    """
+    Loads the sales data with explicit dtypes (categoricals for the string
+    columns, small ints, datetime64 dates), through the columnar cache when
+    possible. Only the requested columns are read.
+    Args:
+        csv_file_path (str): Path to the source CSV file.
+        columns (list): Optional subset of columns to load.
+        use_cache (bool): Whether to use (and maintain) the Parquet cache.
+    Returns:
+        pandas.DataFrame: The typed data.
+    """
+    if use_cache:
+        try:
+            return pd.read_parquet(ensure_columnar_cache(csv_file_path), columns=columns)
+        except ImportError:
+            print("pyarrow is not installed; reading the CSV without the columnar cache.")
+    return read_csv_typed(csv_file_path, columns)
+
+def _peak_rss_bytes():
+    """
+    Returns the peak resident memory of this process in bytes, or None where
+    it cannot be read (Windows).
+    Prefers VmHWM from /proc, because on Linux ru_maxrss survives exec() and
+    so would include the parent's peak for a freshly spawned process.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # ru_maxrss is in KiB on Linux
+
+def _reset_peak_rss():
+    """
+    Resets the peak resident memory high-water mark (Linux only), so that
+    the next _peak_rss_bytes() reflects what happened since. Elsewhere the
+    peak stays cumulative for the whole process.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+class StageTimer:
+    """
+    Records wall time, CPU time (including finished child processes), peak
+    resident memory and throughput for each stage of the pipeline.
+    Usage:
+        timer = StageTimer()
+        with timer.stage('load') as stage:
+            df = pd.read_csv(path)
+            stage['rows'] = len(df) # Rows may also be passed to stage() up front
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    @staticmethod
+    def _cpu_seconds():
+        if resource is None: # Finished child processes are not counted
+            return time.process_time()
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return time.process_time() + children.ru_utime + children.ru_stime
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """Times the enclosed block as one stage; yields its (mutable) record."""
+        record = {'stage': name, 'rows': rows}
+        _reset_peak_rss()
+        wall_start, cpu_start = time.perf_counter(), self._cpu_seconds()
+        try:
+            yield record
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            record['cpu_seconds'] = self._cpu_seconds() - cpu_start
+            record['peak_rss_bytes'] = _peak_rss_bytes()
+            record['rows_per_second'] = (record['rows'] / record['wall_seconds']
+                                         if record['rows'] and record['wall_seconds'] else None)
+            self.stages.append(record)
+
+    def to_json(self):
+        """Returns the recorded stages as a JSON string."""
+        return json.dumps(self.stages, indent=2)
+
+    def write_json(self, output_path):
+        """Writes the recorded stages as JSON to a file, or to stdout for '-'."""
+        if output_path == '-':
+            print(self.to_json())
+        else:
+            with open(output_path, 'w') as f:
+                f.write(self.to_json())
+            print(f"\nStage timings written to '{output_path}'.")
+
+    def print_summary(self):
+        """Prints the recorded stages as a table."""
+        print(f"\n{'Stage':<16}{'Wall (s)':>10}{'CPU (s)':>10}{'Peak RSS (MB)':>15}{'Rows/s':>14}")
+        for record in self.stages:
+            rate = f"{record['rows_per_second']:,.0f}" if record['rows_per_second'] else '-'
+            peak = f"{record['peak_rss_bytes'] / 1e6:.1f}" if record['peak_rss_bytes'] is not None else '-'
+            print(f"{record['stage']:<16}{record['wall_seconds']:>10.4f}{record['cpu_seconds']:>10.4f}"
+                  f"{peak:>15}{rate:>14}")
+
+def _measure_load(loader, csv_file_path, columns):
+    """
+    Loads the data once and reports the cost. Runs in a fresh process so the
+    peak resident memory belongs to this load alone.
+    Returns:
+        tuple: (seconds, DataFrame bytes, peak RSS bytes or None)
+    """
+    start = time.perf_counter()
+    if loader == 'read_csv':
+        df = pd.read_csv(csv_file_path, usecols=columns)
+    elif loader == 'cache':
+        df = load_sales_data(csv_file_path, columns=columns)
+    else: # Baseline: interpreter and imports only
+        df = pd.DataFrame()
+    elapsed = time.perf_counter() - start
+    return elapsed, int(df.memory_usage(deep=True).sum()), _peak_rss_bytes()
+
+def benchmark_load(csv_file_path, repeats=3):
+    """
+    Compares load time and memory of plain read_csv against the typed columnar cache.
+    Args:
+        csv_file_path (str): Path to the CSV file.
+        repeats (int): Runs per case; the fastest time and lowest peak RSS are reported.
+    """
+    ensure_columnar_cache(csv_file_path) # Measure warm cache loads, not the one-off conversion
+    cases = [
+        ("baseline (no load)", None, None),
+        ("read_csv, all columns", 'read_csv', None),
+        ("columnar cache, all columns", 'cache', None),
+        (f"read_csv, {SALES_COLUMN} only", 'read_csv', [SALES_COLUMN]),
+        (f"columnar cache, {SALES_COLUMN} only", 'cache', [SALES_COLUMN]),
+    ]
+    context = multiprocessing.get_context('spawn')
+    print(f"\n--- Load Benchmark: '{csv_file_path}' ({repeats} runs each) ---")
+    print(f"{'Case':<40}{'Time (s)':>12}{'Frame (MB)':>12}{'Peak RSS (MB)':>15}")
+    for label, loader, columns in cases:
+        runs = []
+        for _ in range(repeats):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                runs.append(pool.submit(_measure_load, loader, csv_file_path, columns).result())
+        seconds = min(run[0] for run in runs)
+        frame_bytes = runs[0][1]
+        peak_rss = f"{min(run[2] for run in runs) / 1e6:.1f}" if runs[0][2] is not None else '-'
+        print(f"{label:<40}{seconds:>12.4f}{frame_bytes / 1e6:>12.2f}{peak_rss:>15}")
+
+# --- 3. Perform Basic Data Analysis Tasks ---
+def analyze_dataframe(df_loaded, timer=None):
+    """
+    Computes the sales report from a fully loaded DataFrame.
+    Args:
+        df_loaded (pandas.DataFrame): The sales data.
+        timer (StageTimer): Optional timer that records each analysis stage.
+    Returns:
+        dict: The report (see print_report for the keys).
+    """
+    timer = timer or StageTimer()
+    rows = len(df_loaded)
+    report = {'rows': rows}
+    with timer.stage('describe', rows):
+        # Calculate the average of a selected column (e.g., 'Sales_Amount')
+        report['average_sales'] = df_loaded[SALES_COLUMN].mean()
+        # Descriptive statistics for numerical columns
+        report['describe'] = df_loaded.describe(include=np.number)
+    with timer.stage('value_counts', rows):
+        # Value counts for categorical columns
+        report['category_counts'] = df_loaded[CATEGORY_COLUMN].value_counts()
+        report['region_counts'] = df_loaded[REGION_COLUMN].value_counts()
+    with timer.stage('groupby', rows):
+        # Group by 'Product_Category' and calculate sum of 'Sales_Amount'
+        report['sales_by_category'] = df_loaded.groupby(CATEGORY_COLUMN)[SALES_COLUMN].sum().sort_values(ascending=False)
+        report['sales_by_region'] = df_loaded.groupby(REGION_COLUMN)[SALES_COLUMN].sum().sort_values(ascending=False)
+    with timer.stage('correlation', rows):
+        # Correlation matrix of the numerical columns
+        report['correlation'] = df_loaded.select_dtypes(include=np.number).corr()
+    return report
+
+def _merge_counts(target, counts):
+    """Adds the entries of a value -> count mapping into target (in place)."""
+    for key, count in counts.items():
+        target[key] = target.get(key, 0) + count
+
+class FrequencyTable:
+    """
+    Exact, mergeable quantile summary: a table of value frequencies. Its size
+    is bounded by the number of distinct values in the column rather than
+    the number of rows, which suits low-cardinality columns. RunningStats
+    turns it into a KLLSketch (see to_sketch) once a column has more than
+    EXACT_QUANTILE_MAX_DISTINCT distinct values.
+    """
+
+    def __init__(self):
+        self.frequencies = {}
+
+    def update(self, values):
+        """Adds a batch of values (numpy array without missing values)."""
+        distinct, counts = np.unique(values, return_counts=True)
+        _merge_counts(self.frequencies, dict(zip(distinct.tolist(), counts.tolist())))
+
+    def merge(self, other):
+        """Combines another FrequencyTable into this one (in place)."""
+        _merge_counts(self.frequencies, other.frequencies)
+
+    def __len__(self):
+        return len(self.frequencies)
+
+    def to_sketch(self, k):
+        """Returns a KLLSketch holding the same values (see KLLSketch.update_counts)."""
+        sketch = KLLSketch(k)
+        if self.frequencies:
+            sketch.update_counts(np.fromiter(self.frequencies.keys(), dtype=float, count=len(self.frequencies)),
+                                 np.fromiter(self.frequencies.values(), dtype=np.int64, count=len(self.frequencies)))
+        return sketch
+
+    def quantile(self, q):
+        """
+        Exact quantile with linear interpolation, like pandas.Series.quantile.
+        Args:
+            q (float): The quantile to compute, between 0 and 1.
+        Returns:
+            float: The quantile, or NaN if there are no values.
+        """
+        if not self.frequencies:
+            return np.nan
+        values = np.array(sorted(self.frequencies))
+        cumulative = np.cumsum([self.frequencies[value] for value in values])
+        position = q * (cumulative[-1] - 1)
+        lower = math.floor(position)
+        upper = math.ceil(position)
+        # The value at sorted index i is the first one whose cumulative count exceeds i
+        lower_value = float(values[np.searchsorted(cumulative, lower, side='right')])
+        upper_value = float(values[np.searchsorted(cumulative, upper, side='right')])
+        return lower_value + (upper_value - lower_value) * (position - lower)
+
+class KLLSketch:
+    """
+    Approximate, mergeable quantile summary (KLL sketch).
+    Values are kept in a hierarchy of compactors: an item at level h stands
+    for 2**h original values. When a level outgrows its capacity it is
+    sorted and every other item (from a random offset) is promoted, so the
+    sketch holds O(k) items whatever the number of rows. The rank error is
+    about 3.3 / k with high probability.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        """Lower levels get geometrically smaller capacities (factor 2/3)."""
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        """Compacts the lowest over-full level until every level fits."""
+        while True:
+            level = next((h for h, items in enumerate(self.levels) if len(items) > self._capacity(h)), None)
+            if level is None:
+                return
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # With an odd number of items, the largest one stays behind at this level
+            leftover = items[len(items) - len(items) % 2:]
+            promoted = items[self._rng.integers(2):len(items) - len(leftover):2]
+            self.levels[level] = leftover
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def update(self, values):
+        """Adds a batch of values (numpy array without missing values)."""
+        self.levels[0] = np.concatenate([self.levels[0], np.asarray(values, dtype=float)])
+        self._compress()
+
+    def update_counts(self, values, counts):
+        """
+        Adds values that occur counts times each. A value occurring c times is
+        placed at every level h whose bit is set in c, which represents it
+        exactly before compaction.
+        """
+        for level in range(int(counts.max()).bit_length()):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], values[(counts >> level) & 1 == 1]])
+        self._compress()
+
+    def merge(self, other):
+        """Combines another KLLSketch into this one (in place)."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def quantile(self, q):
+        """
+        Approximate quantile (the item at rank q * (n - 1) among the weighted items).
+        Args:
+            q (float): The quantile to compute, between 0 and 1.
+        Returns:
+            float: The quantile, or NaN if the sketch is empty.
+        """
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return np.nan
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        rank = q * (cumulative[-1] - 1)
+        return float(items[order][min(np.searchsorted(cumulative, rank, side='right'), len(items) - 1)])
+
+class RunningStats:
+    """
+    Mergeable statistics for one numerical column.
+    Mean and variance are kept with Welford's algorithm (merged with Chan's
+    parallel formula), so chunks can be folded in one at a time or combined
+    from independent partial results. Percentiles come from a mergeable
+    quantile summary: a KLLSketch, or by default an exact FrequencyTable
+    that becomes a KLLSketch (with the default rank error) once the column
+    has more than max_distinct distinct values, so memory stays bounded for
+    continuous columns such as amounts with cents.
+    """
+
+    def __init__(self, quantiles=None, max_distinct=EXACT_QUANTILE_MAX_DISTINCT):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # Sum of squared deviations from the mean
+        self.min = math.inf
+        self.max = -math.inf
+        self.quantiles = quantiles if quantiles is not None else FrequencyTable()
+        self.max_distinct = max_distinct
+
+    def _bound_quantiles(self):
+        """Swaps an exact FrequencyTable that has grown too large for a KLLSketch."""
+        if isinstance(self.quantiles, FrequencyTable) and len(self.quantiles) > self.max_distinct:
+            self.quantiles = self.quantiles.to_sketch(math.ceil(3.3 / DEFAULT_ERROR_BOUNDS.rank_error))
+
+    def _merge_moments(self, count, mean, m2, minimum, maximum):
+        """Folds the moments of a disjoint set of values into these ones."""
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    def update(self, values):
+        """
+        Folds a batch of values into the statistics.
+        Args:
+            values (pandas.Series): The new values; missing values are ignored.
+        """
+        array = values.dropna().to_numpy(dtype=float)
+        if len(array) == 0:
+            return
+        mean = float(array.mean())
+        self._merge_moments(len(array), mean, float(((array - mean) ** 2).sum()),
+                            float(array.min()), float(array.max()))
+        self.quantiles.update(array)
+        self._bound_quantiles()
+
+    def merge(self, other):
+        """
+        Combines another RunningStats into this one (in place).
+        Args:
+            other (RunningStats): Statistics over a disjoint set of rows.
+        """
+        if other.count == 0:
+            return
+        self._merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+        quantiles = other.quantiles
+        if isinstance(self.quantiles, FrequencyTable) and isinstance(quantiles, KLLSketch):
+            self.quantiles = self.quantiles.to_sketch(quantiles.k)
+        elif isinstance(self.quantiles, KLLSketch) and isinstance(quantiles, FrequencyTable):
+            quantiles = quantiles.to_sketch(self.quantiles.k)
+        self.quantiles.merge(quantiles)
+        self._bound_quantiles()
+
+    def std(self):
+        """Sample standard deviation (ddof=1), like pandas."""
+        if self.count < 2:
+            return np.nan
+        return math.sqrt(self.m2 / (self.count - 1))
+
+    def quantile(self, q):
+        """Quantile from the quantile summary (NaN if there are no values)."""
+        return self.quantiles.quantile(q) if self.count else np.nan
+
+    def describe(self):
+        """
+        Returns:
+            list: count, mean, std, min, percentiles and max, in describe() order.
+        """
+        if self.count == 0:
+            return [0.0] + [np.nan] * (4 + len(DESCRIBE_PERCENTILES))
+        return ([float(self.count), self.mean, self.std(), self.min]
+                + [self.quantile(q) for q in DESCRIBE_PERCENTILES]
+                + [self.max])
+
+def _hash_values(values):
+    """
+    Returns 64-bit hashes of the non-missing values of a Series. Numbers are
+    hashed as float64 so that e.g. 5 and 5.0 from differently typed chunks agree.
+    """
+    values = values.dropna()
+    if pd.api.types.is_numeric_dtype(values):
+        values = values.astype('float64')
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+def _bit_length(x):
+    """Vectorized int.bit_length() for an array of uint64."""
+    length = np.zeros(x.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        over = x >= (np.uint64(1) << np.uint64(shift))
+        x = np.where(over, x >> np.uint64(shift), x)
+        length += over * shift
+    return length + (x > 0)
+
+class HyperLogLog:
+    """
+    Approximate, mergeable distinct count (HyperLogLog).
+    2**precision registers keep the longest run of leading zero bits seen
+    among the hashes routed to them; the relative standard error is about
+    1.04 / sqrt(2**precision).
+    """
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        """Adds a batch of values (pandas.Series; missing values are ignored)."""
+        hashes = _hash_values(values)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        remainder = hashes << np.uint64(self.precision)
+        # Position of the first 1 bit in the remaining 64 - precision bits
+        rank = np.minimum(64 - _bit_length(remainder), 64 - self.precision) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other):
+        """Combines another HyperLogLog with the same precision into this one (in place)."""
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        """
+        Returns:
+            float: The estimated number of distinct values.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros) # Linear counting for small cardinalities
+        return float(estimate)
+
+class ExactCounts:
+    """Exact key -> total mapping (value counts or group sums)."""
+
+    def __init__(self):
+        self.totals = {}
+
+    def add(self, totals):
+        """Adds a Series of per-key totals (e.g. from value_counts or a groupby sum)."""
+        _merge_counts(self.totals, totals.to_dict())
+
+    def merge(self, other):
+        """Combines another ExactCounts into this one (in place)."""
+        _merge_counts(self.totals, other.totals)
+
+    def series(self, index_name, name):
+        """Returns the totals as a Series sorted like value_counts()."""
+        series = pd.Series(self.totals, name=name, dtype=None if self.totals else 'int64')
+        return series.rename_axis(index_name).sort_values(ascending=False)
+
+class HeavyHitters:
+    """
+    Approximate, mergeable key -> total mapping for high-cardinality keys:
+    a Count-Min sketch plus the candidate keys with the largest estimates.
+    Estimates never undercount and overcount by at most count_error times
+    the grand total, with probability 1 - failure_probability.
+    """
+
+    def __init__(self, count_error=0.001, failure_probability=0.01, top_k=20):
+        self.width = math.ceil(math.e / count_error)
+        self.depth = math.ceil(math.log(1 / failure_probability))
+        self.top_k = top_k
+        self.table = np.zeros((self.depth, self.width))
+        self.candidates = {} # key -> hash, for the keys with the largest estimates
+        self.integral = True # Whether every weight so far was a whole number
+
+    def _cells(self, hashes):
+        """Column of each hash in every row (double hashing from one 64-bit hash)."""
+        low = hashes & np.uint64(0xFFFFFFFF)
+        high = hashes >> np.uint64(32)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((low + rows * high) % np.uint64(self.width)).astype(np.int64)
+
+    def _estimates(self, hashes):
+        cells = self._cells(hashes)
+        return self.table[np.arange(self.depth)[:, None], cells].min(axis=0)
+
+    def _keep_top(self, candidates):
+        """Keeps the candidates with the largest estimates (a few more than top_k)."""
+        keys = list(candidates)
+        if len(keys) > 4 * self.top_k:
+            estimates = self._estimates(np.array([candidates[key] for key in keys], dtype=np.uint64))
+            keys = [keys[i] for i in np.argsort(-estimates, kind='stable')[:4 * self.top_k]]
+        self.candidates = {key: candidates[key] for key in keys}
+
+    def add(self, totals):
+        """Adds a Series of per-key totals (e.g. from value_counts or a groupby sum)."""
+        totals = totals[totals.index.notna()]
+        if totals.empty:
+            return
+        keys = totals.index.tolist()
+        hashes = pd.util.hash_array(np.array([str(key) for key in keys], dtype=object))
+        weights = totals.to_numpy(dtype=float)
+        self.integral = self.integral and bool(np.all(weights == np.round(weights)))
+        np.add.at(self.table, (np.arange(self.depth)[:, None], self._cells(hashes)), weights)
+        self._keep_top({**self.candidates, **dict(zip(keys, hashes))})
+
+    def merge(self, other):
+        """Combines another HeavyHitters with the same dimensions into this one (in place)."""
+        self.table += other.table
+        self.integral = self.integral and other.integral
+        self._keep_top({**self.candidates, **other.candidates})
+
+    def series(self, index_name, name):
+        """Returns the estimated totals of the top_k keys, largest first."""
+        keys = list(self.candidates)
+        estimates = self._estimates(np.array([self.candidates[key] for key in keys], dtype=np.uint64))
+        series = pd.Series(estimates, index=keys, name=name)
+        if self.integral:
+            series = series.round().astype('int64')
+        return series.rename_axis(index_name).sort_values(ascending=False).head(self.top_k)
+
+class CorrelationStats:
+    """
+    Mergeable sufficient statistics for the correlation matrix of the
+    numerical columns: row count, column means and the matrix of centered
+    cross-products (co-moments), combined with Chan's parallel formula.
+    Rows with a missing value in any numerical column are left out.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.count = 0
+        self.mean = np.zeros(len(self.columns))
+        self.comoment = np.zeros((len(self.columns), len(self.columns)))
+
+    def update(self, frame):
+        """
+        Folds a batch of rows into the statistics.
+        Args:
+            frame (pandas.DataFrame): Rows containing (at least) the tracked columns.
+        """
+        array = frame[self.columns].dropna().to_numpy(dtype=float)
+        if len(array) == 0:
+            return
+        batch = CorrelationStats(self.columns)
+        batch.count = len(array)
+        batch.mean = array.mean(axis=0)
+        centered = array - batch.mean
+        batch.comoment = centered.T @ centered
+        self.merge(batch)
+
+    def merge(self, other):
+        """
+        Combines another CorrelationStats over the same columns into this one (in place).
+        Args:
+            other (CorrelationStats): Statistics over a disjoint set of rows.
+        """
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.comoment += other.comoment + np.outer(delta, delta) * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+
+    def correlation(self):
+        """
+        Returns:
+            pandas.DataFrame: The Pearson correlation matrix, like DataFrame.corr().
+        """
+        scale = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix = self.comoment / np.outer(scale, scale)
+        return pd.DataFrame(np.clip(matrix, -1.0, 1.0), index=self.columns, columns=self.columns)
+
+class SalesAggregate:
+    """
+    Mergeable aggregates for the whole sales report.
+    Fold chunks of rows in with update() and combine partial aggregates
+    (e.g. from different chunks or files) with merge(); report() then builds
+    the same report as analyze_dataframe() without ever holding all rows.
+    With error_bounds, sketches replace the exact summaries: KLL for the
+    percentiles, Count-Min heavy hitters for the value counts and group
+    sums, and HyperLogLog distinct counts, so memory no longer grows with
+    the number of distinct values.
+    """
+
+    def __init__(self, error_bounds=None):
+        self.error_bounds = error_bounds
+        self.rows = 0
+        self.numeric = {} # column name -> RunningStats, in file column order
+        self.distinct = {} # column name -> HyperLogLog (approximate mode only)
+        self.category_counts = self._new_counts()
+        self.region_counts = self._new_counts()
+        self.sales_by_category = self._new_counts()
+        self.sales_by_region = self._new_counts()
+        self.correlation = None # CorrelationStats, created with the first chunk
+
+    def _new_counts(self):
+        if self.error_bounds is None:
+            return ExactCounts()
+        return HeavyHitters(self.error_bounds.count_error, self.error_bounds.failure_probability,
+                            self.error_bounds.top_k)
+
+    def _new_stats(self):
+        if self.error_bounds is None:
+            return RunningStats()
+        return RunningStats(KLLSketch(math.ceil(3.3 / self.error_bounds.rank_error)))
+
+    def _new_distinct(self):
+        precision = math.ceil(math.log2((1.04 / self.error_bounds.distinct_error) ** 2))
+        return HyperLogLog(min(max(precision, 4), 18))
+
+    def update(self, chunk):
+        """
+        Folds a chunk of rows into the aggregates.
+        Args:
+            chunk (pandas.DataFrame): A slice of the sales data.
+        """
+        self.rows += len(chunk)
+        numerical_columns = chunk.select_dtypes(include=np.number).columns
+        for column in numerical_columns:
+            if column not in self.numeric:
+                self.numeric[column] = self._new_stats()
+            self.numeric[column].update(chunk[column])
+        if self.error_bounds is not None:
+            for column in chunk.columns:
+                if column not in self.distinct:
+                    self.distinct[column] = self._new_distinct()
+                self.distinct[column].update(chunk[column])
+        self.category_counts.add(chunk[CATEGORY_COLUMN].value_counts(sort=False))
+        self.region_counts.add(chunk[REGION_COLUMN].value_counts(sort=False))
+        self.sales_by_category.add(chunk.groupby(CATEGORY_COLUMN, observed=True)[SALES_COLUMN].sum())
+        self.sales_by_region.add(chunk.groupby(REGION_COLUMN, observed=True)[SALES_COLUMN].sum())
+        if self.correlation is None:
+            self.correlation = CorrelationStats(numerical_columns)
+        self.correlation.update(chunk)
+
+    def merge(self, other):
+        """
+        Combines another SalesAggregate (built with the same error bounds) into this one (in place).
+        Args:
+            other (SalesAggregate): Aggregates over a disjoint set of rows.
+        """
+        self.rows += other.rows
+        for column, stats in other.numeric.items():
+            if column not in self.numeric:
+                self.numeric[column] = self._new_stats()
+            self.numeric[column].merge(stats)
+        for column, sketch in other.distinct.items():
+            if column not in self.distinct:
+                self.distinct[column] = self._new_distinct()
+            self.distinct[column].merge(sketch)
+        self.category_counts.merge(other.category_counts)
+        self.region_counts.merge(other.region_counts)
+        self.sales_by_category.merge(other.sales_by_category)
+        self.sales_by_region.merge(other.sales_by_region)
+        if other.correlation is not None:
+            if self.correlation is None:
+                self.correlation = CorrelationStats(other.correlation.columns)
+            self.correlation.merge(other.correlation)
+
+    def report(self):
+        """
+        Returns:
+            dict: The report, in the same shape as analyze_dataframe() returns
+            (plus 'distinct_counts' in approximate mode).
+        """
+        index = ['count', 'mean', 'std', 'min'] + [f"{q:.0%}" for q in DESCRIBE_PERCENTILES] + ['max']
+        describe = pd.DataFrame({column: stats.describe() for column, stats in self.numeric.items()}, index=index)
+        sales = self.numeric.get(SALES_COLUMN, RunningStats())
+        report = {
+            'rows': self.rows,
+            'average_sales': sales.mean if sales.count else np.nan,
+            'describe': describe,
+            'category_counts': self.category_counts.series(CATEGORY_COLUMN, 'count'),
+            'region_counts': self.region_counts.series(REGION_COLUMN, 'count'),
+            'sales_by_category': self.sales_by_category.series(CATEGORY_COLUMN, SALES_COLUMN),
+            'sales_by_region': self.sales_by_region.series(REGION_COLUMN, SALES_COLUMN),
+            'correlation': (self.correlation or CorrelationStats([])).correlation(),
+        }
+        if self.error_bounds is not None:
+            report['distinct_counts'] = pd.Series({column: round(sketch.estimate())
+                                                   for column, sketch in self.distinct.items()},
+                                                  name='distinct', dtype='int64')
+        return report
+
+def aggregate_csv_file(csv_file_path, chunksize=DEFAULT_CHUNKSIZE, error_bounds=None):
+    """
+    Streams one CSV file in bounded chunks into a SalesAggregate.
+    Top-level so that it can run in a worker process.
+    Args:
+        csv_file_path (str): Path to the CSV file.
+        chunksize (int): Number of rows to read per chunk.
+        error_bounds (ErrorBounds): Use approximate sketches with these bounds (default: exact).
+    Returns:
+        SalesAggregate: The partial aggregates for this file.
+    """
+    aggregate = SalesAggregate(error_bounds)
+    for chunk in pd.read_csv(csv_file_path, chunksize=chunksize):
+        aggregate.update(chunk)
+    return aggregate
+
+def analyze_csv_in_chunks(csv_file_path, chunksize, error_bounds=None):
+    """
+    Computes the sales report by streaming the CSV in bounded chunks.
+    Peak memory depends on the chunk size, not on the size of the file:
+    exact percentiles keep a table of at most EXACT_QUANTILE_MAX_DISTINCT
+    distinct values per column, beyond which they come from a KLL sketch.
+    Args:
+        csv_file_path (str): Path to the CSV file.
+        chunksize (int): Number of rows to read per chunk.
+        error_bounds (ErrorBounds): Use approximate sketches with these bounds (default: exact).
+    Returns:
+        dict: The report, in the same shape as analyze_dataframe() returns.
+    """
+    try:
+        aggregate = aggregate_csv_file(csv_file_path, chunksize, error_bounds)
+    except FileNotFoundError:
+        print(f"Error: The file '{csv_file_path}' was not found.")
+        exit()
+    print(f"CSV file streamed successfully: {aggregate.rows} rows in chunks of {chunksize}.")
+    return aggregate.report()
+
+def analyze_csv_files(pattern, workers=None, chunksize=DEFAULT_CHUNKSIZE, error_bounds=None):
+    """
+    Computes the sales report over many CSV files (e.g. one per day or region).
+    Each file is aggregated on a process pool and the partial results are
+    merged in file order, giving the same numbers as analyzing the
+    concatenation of all files.
+    Args:
+        pattern (str): Glob pattern matching the CSV files.
+        workers (int): Number of worker processes (default: one per CPU).
+        chunksize (int): Number of rows each worker reads per chunk.
+        error_bounds (ErrorBounds): Use approximate sketches with these bounds (default: exact).
+    Returns:
+        dict: The report, in the same shape as analyze_dataframe() returns.
+    """
+    csv_file_paths = sorted(glob.glob(pattern))
+    if not csv_file_paths:
+        print(f"Error: No files match '{pattern}'.")
+        exit()
+
+    total = SalesAggregate(error_bounds)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for partial in pool.map(aggregate_csv_file, csv_file_paths, itertools.repeat(chunksize),
+                                itertools.repeat(error_bounds)):
+            total.merge(partial)
+    print(f"Aggregated {total.rows} rows from {len(csv_file_paths)} files "
+          f"on {workers or os.cpu_count()} worker processes.")
+    return total.report()
+
+class _FileSlice(io.RawIOBase):
+    """Read-only stream over bytes [start, stop) of an open binary file."""
+
+    def __init__(self, f, start, stop):
+        f.seek(start)
+        self._f = f
+        self._remaining = stop - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._remaining <= 0:
+            return 0
+        count = self._f.readinto(memoryview(buffer)[:self._remaining])
+        self._remaining -= count
+        return count
+
+def _complete_lines_end(f, size, block_size=1 << 16):
+    """Returns the offset just past the last newline in the file (0 if there is none)."""
+    position = size
+    while position > 0:
+        start = max(0, position - block_size)
+        f.seek(start)
+        newline = f.read(position - start).rfind(b'\n')
+        if newline != -1:
+            return start + newline + 1
+        position = start
+    return 0
+
+class _SummaryStateUnpickler(pickle.Unpickler):
+    """
+    Reads a pickled summary state whichever module wrote it. This script is
+    usually run as __main__ but may be loaded under another name (e.g. via
+    importlib), so the aggregate classes are resolved by name in this module.
+    """
+    STATE_CLASSES = ('SalesAggregate', 'RunningStats', 'FrequencyTable', 'KLLSketch', 'ExactCounts',
+                     'HeavyHitters', 'HyperLogLog', 'CorrelationStats', 'ErrorBounds')
+
+    def find_class(self, module, name):
+        if name in self.STATE_CLASSES:
+            return globals()[name]
+        return super().find_class(module, name)
+
+def update_summary_state(csv_file_path, state_path=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Brings a persisted SalesAggregate up to date with the rows appended to
+    the CSV since the last call, so a refresh costs O(new rows) rather than
+    O(total history). The state records how far into the file it has read;
+    if the file was rewritten rather than appended to, it is rebuilt.
+    A trailing line without a newline (still being written) is left for next time.
+    Args:
+        csv_file_path (str): Path to the (append-only) CSV file.
+        state_path (str): Where the state is kept (default: next to the CSV).
+        chunksize (int): Number of new rows to read per chunk.
+    Returns:
+        tuple: (SalesAggregate, number of rows added by this call)
+    """
+    state_path = state_path or csv_file_path + SUMMARY_STATE_SUFFIX
+    state = None
+    if os.path.exists(state_path):
+        try:
+            with open(state_path, 'rb') as f:
+                state = _SummaryStateUnpickler(f).load()
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            print(f"Could not read the summary state '{state_path}' ({e}); rebuilding it.")
+
+    with open(csv_file_path, 'rb') as f:
+        header_line = f.readline()
+        columns = next(csv.reader([header_line.decode()]))
+        end = _complete_lines_end(f, os.fstat(f.fileno()).st_size)
+
+        if state is not None:
+            # The bytes just before the saved offset must be unchanged for an append-only file
+            tail = state['tail']
+            f.seek(state['offset'] - len(tail))
+            if (state.get('version') != SUMMARY_STATE_VERSION or state['columns'] != columns
+                    or state['offset'] > end or f.read(len(tail)) != tail):
+                print(f"'{csv_file_path}' was rewritten, not appended to; rebuilding the summary state.")
+                state = None
+        if state is None:
+            state = {'version': SUMMARY_STATE_VERSION, 'columns': columns, 'offset': len(header_line),
+                     'tail': header_line, 'aggregate': SalesAggregate()}
+
+        aggregate = state['aggregate']
+        rows_before = aggregate.rows
+        if end > state['offset']:
+            new_rows = io.BufferedReader(_FileSlice(f, state['offset'], end))
+            for chunk in pd.read_csv(new_rows, header=None, names=columns, chunksize=chunksize):
+                aggregate.update(chunk)
+            f.seek(max(0, end - SUMMARY_STATE_TAIL_BYTES))
+            state['tail'] = f.read(end - f.tell())
+            state['offset'] = end
+
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f)
+    os.replace(tmp_path, state_path)
+    return aggregate, aggregate.rows - rows_before
+
+def analyze_csv_incrementally(csv_file_path, state_path=None):
+    """
+    Computes the sales report from the persisted summary state, folding in
+    only the rows appended since the previous run.
+    Args:
+        csv_file_path (str): Path to the (append-only) CSV file.
+        state_path (str): Where the state is kept (default: next to the CSV).
+    Returns:
+        dict: The report, in the same shape as analyze_dataframe() returns.
+    """
+    try:
+        aggregate, new_rows = update_summary_state(csv_file_path, state_path)
+    except FileNotFoundError:
+        print(f"Error: The file '{csv_file_path}' was not found.")
+        exit()
+    print(f"Summary state updated: {new_rows} new rows folded in ({aggregate.rows} rows in total).")
+    return aggregate.report()
+
+def build_date_partitions(csv_file_path, partition_dir, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Writes the sales data to Parquet files partitioned by month of
+    Order_Date (partition_dir/month=YYYY-MM/part-NNNNN.parquet), streaming
+    the CSV in chunks, plus a small index with the date range and row count
+    of every file. Any previous partitions in partition_dir are replaced.
+    Args:
+        csv_file_path (str): Path to the CSV file.
+        partition_dir (str): Directory for the partitions and index.
+        chunksize (int): Number of rows to read per chunk.
+    Returns:
+        list: The index entries, one per file.
+    """
+    os.makedirs(partition_dir, exist_ok=True)
+    for old_partition in glob.glob(os.path.join(partition_dir, 'month=*')):
+        shutil.rmtree(old_partition)
+
+    index = []
+    chunks = pd.read_csv(csv_file_path, chunksize=chunksize, dtype=SALES_DTYPES, parse_dates=DATE_COLUMNS)
+    for chunk_number, chunk in enumerate(chunks):
+        for month, rows in chunk.groupby(chunk[DATE_COLUMN].dt.strftime('%Y-%m')):
+            month_dir = os.path.join(partition_dir, f"month={month}")
+            os.makedirs(month_dir, exist_ok=True)
+            file_path = os.path.join(month_dir, f"part-{chunk_number:05d}.parquet")
+            rows.to_parquet(file_path, index=False)
+            index.append({'path': os.path.relpath(file_path, partition_dir), 'month': month,
+                          'min': rows[DATE_COLUMN].min().isoformat(), 'max': rows[DATE_COLUMN].max().isoformat(),
+                          'rows': len(rows)})
+
+    with open(os.path.join(partition_dir, PARTITION_INDEX), 'w') as f:
+        json.dump(index, f, indent=1)
+    print(f"Partitioned '{csv_file_path}' into {len(index)} files over "
+          f"{len({entry['month'] for entry in index})} months in '{partition_dir}'.")
+    return index
+
+def query_sales(partition_dir, start, end, group_by=CATEGORY_COLUMN, value=SALES_COLUMN):
+    """
+    Totals a column per group for orders in a date range, reading only the
+    partition files whose date range overlaps it (e.g. "sales by category
+    for March" is query_sales(dir, '2023-03-01', '2023-04-01')).
+    Args:
+        partition_dir (str): Directory written by build_date_partitions.
+        start (str): First date of the range (inclusive).
+        end (str): End of the range (exclusive).
+        group_by (str): Column to group by.
+        value (str): Column to sum.
+    Returns:
+        tuple: (pandas.Series of totals sorted largest first, number of files read)
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    with open(os.path.join(partition_dir, PARTITION_INDEX)) as f:
+        index = json.load(f)
+    files = [os.path.join(partition_dir, entry['path']) for entry in index
+             if pd.Timestamp(entry['min']) < end and pd.Timestamp(entry['max']) >= start]
+    if not files:
+        return pd.Series(dtype='int64', name=value).rename_axis(group_by), 0
+
+    columns = [DATE_COLUMN, group_by, value]
+    df = pd.concat([pd.read_parquet(file_path, columns=columns) for file_path in files], ignore_index=True)
+    in_range = df[(df[DATE_COLUMN] >= start) & (df[DATE_COLUMN] < end)]
+    totals = in_range.groupby(group_by, observed=True)[value].sum().sort_values(ascending=False)
+    return totals, len(files)
+
+def benchmark_date_queries(work_dir, history_days=(90, 365, 1460), range_days=(1, 30, 90, 365),
+                           rows_per_day=2000, repeats=3):
+    """
+    Shows how date-range query time scales with the width of the range
+    versus the total length of the history, against a full scan of the
+    same history without the partition index.
+    Args:
+        work_dir (str): Scratch directory for the generated histories.
+        history_days (tuple): Total history lengths to generate, in days.
+        range_days (tuple): Query range widths, in days (ending at the last day).
+        rows_per_day (int): Orders per day in the generated data.
+        repeats (int): Runs per query; the fastest is reported.
+    """
+    print(f"\n--- Date-Range Query Benchmark ({rows_per_day} rows/day, best of {repeats}) ---")
+    print(f"{'History (days)':>15}{'Range (days)':>14}{'Files read':>12}{'Query (s)':>12}{'Full scan (s)':>15}")
+    for days in history_days:
+        csv_file_path = os.path.join(work_dir, f"history_{days}.csv")
+        partition_dir = os.path.join(work_dir, f"history_{days}")
+        generate_sales_data(csv_file_path, days * rows_per_day, start_date='2020-01-01',
+                            end_date=str(pd.Timestamp('2020-01-01') + pd.Timedelta(days=days - 1)))
+        build_date_partitions(csv_file_path, partition_dir)
+        all_files = glob.glob(os.path.join(partition_dir, 'month=*', '*.parquet'))
+        last_day = pd.Timestamp('2020-01-01') + pd.Timedelta(days=days)
+
+        for width in range_days:
+            if width > days:
+                continue
+            start = last_day - pd.Timedelta(days=width)
+            timings = []
+            for _ in range(repeats):
+                begin = time.perf_counter()
+                _, files_read = query_sales(partition_dir, start, last_day)
+                timings.append(time.perf_counter() - begin)
+            scans = []
+            for _ in range(repeats):
+                begin = time.perf_counter()
+                df = pd.concat([pd.read_parquet(path) for path in all_files], ignore_index=True)
+                df[(df[DATE_COLUMN] >= start) & (df[DATE_COLUMN] < last_day)].groupby(CATEGORY_COLUMN, observed=True)[SALES_COLUMN].sum()
+                scans.append(time.perf_counter() - begin)
+            print(f"{days:>15}{width:>14}{files_read:>12}{min(timings):>12.4f}{min(scans):>15.4f}")
+
+def check_sketch_accuracy(rows=1_000_000, num_categories=10_000, error_bounds=DEFAULT_ERROR_BOUNDS,
+                          chunksize=100_000, seed=0):
+    """
+    Test harness for the approximate mode: generates skewed, high-cardinality
+    sales data, runs the sketches over it chunk by chunk and compares against
+    exact pandas results. Distinct counts are checked against three standard
+    errors; the other checks against the bounds themselves.
+    Args:
+        rows (int): Number of rows to generate.
+        num_categories (int): Number of distinct product categories (Zipf-skewed).
+        error_bounds (ErrorBounds): Accuracy targets for the sketches.
+        chunksize (int): Rows folded into the sketches at a time.
+        seed (int): Random seed for the generated data.
+    Returns:
+        bool: True if every measured error is within its bound.
+    """
+    categories = [f"Category_{number}" for number in range(num_categories)]
+    # Unrounded ratings make every value distinct; the string columns are compared as plain values
+    df = pd.concat(iter_sales_batches(rows, chunksize, seed, categories=categories, category_skew=1.1,
+                                      region_skew=1.0, rating_decimals=None), ignore_index=True)
+    df = df.astype({CATEGORY_COLUMN: str, REGION_COLUMN: str})
+
+    aggregate = SalesAggregate(error_bounds)
+    for start in range(0, rows, chunksize):
+        aggregate.update(df.iloc[start:start + chunksize])
+    report = aggregate.report()
+
+    checks = [] # (description, measured error, bound)
+    for column in aggregate.numeric:
+        values = np.sort(df[column].to_numpy(dtype=float))
+        for q in DESCRIBE_PERCENTILES:
+            estimate = report['describe'].loc[f"{q:.0%}", column]
+            # Normalized rank error: how far the estimate's rank is from the requested one
+            low = np.searchsorted(values, estimate, side='left') / rows
+            high = np.searchsorted(values, estimate, side='right') / rows
+            error = max(0.0, low - q, q - high)
+            checks.append((f"{column} {q:.0%} rank error", error, error_bounds.rank_error))
+    for column, estimate in report['distinct_counts'].items():
+        exact = df[column].nunique()
+        checks.append((f"{column} distinct count relative error", abs(estimate - exact) / exact,
+                       3 * error_bounds.distinct_error))
+    exact_totals = {
+        'category_counts': df[CATEGORY_COLUMN].value_counts(),
+        'region_counts': df[REGION_COLUMN].value_counts(),
+        'sales_by_category': df.groupby(CATEGORY_COLUMN)[SALES_COLUMN].sum(),
+        'sales_by_region': df.groupby(REGION_COLUMN)[SALES_COLUMN].sum(),
+    }
+    for key, exact in exact_totals.items():
+        estimates = report[key]
+        overcount = (estimates - exact.reindex(estimates.index)).abs().max() / exact.sum()
+        checks.append((f"{key} overcount / total", overcount, error_bounds.count_error))
+        top_exact = set(exact.nlargest(min(5, len(exact))).index)
+        missed = len(top_exact - set(estimates.index)) / len(top_exact)
+        checks.append((f"{key} top-5 keys missed", missed, 0.0))
+
+    print(f"\n--- Sketch Accuracy Check: {rows} rows, {num_categories} categories ---")
+    print(f"{'Check':<50}{'Error':>12}{'Bound':>12}")
+    passed = True
+    for description, error, bound in checks:
+        ok = error <= bound
+        passed = passed and ok
+        print(f"{description:<50}{error:>12.5f}{bound:>12.5f}  {'ok' if ok else 'FAIL'}")
+    print("All sketch errors are within bounds." if passed else "Some sketch errors exceed their bounds.")
+    return passed
+
+def print_report(report):
+    """
+    Prints the sales report.
+    Args:
+        report (dict): As returned by analyze_dataframe() or SalesAggregate.report().
+    """
+    print("\n--- Basic Data Analysis ---")
+
+    print(f"\nAverage Sales Amount: ${report['average_sales']:.2f}")
+
+    print("\nDescriptive Statistics for Numerical Columns:\n")
+    print(report['describe'])
+
+    print("\nValue Counts for 'Product_Category':\n")
+    print(report['category_counts'])
+
+    print("\nValue Counts for 'Region':\n")
+    print(report['region_counts'])
+
+    print("\nTotal Sales by Product Category:\n")
+    print(report['sales_by_category'])
+
+    print("\nCorrelation Matrix of Numerical Columns:\n")
+    print(report['correlation'])
+
+    if 'distinct_counts' in report:
+        print("\nApproximate Distinct Counts:\n")
+        print(report['distinct_counts'])
+
+# --- 4. Create Visualizations using Matplotlib and Seaborn ---
+PLOT_STYLE = 'seaborn-v0_8-darkgrid'
+SCATTER_HEXBIN_THRESHOLD = 100_000 # Above this many points the scatter plot becomes a hexbin plot
+FIGURE_MANIFEST = 'figures.json' # Input-data hashes of the figures in a headless output directory
+
+def plot_category_sales(sales_by_category):
+    """Figure 1: Bar Chart - Total Sales by Product Category."""
+    plt.figure(figsize=(10, 6))
+    sales_by_category.plot(kind='bar', color=sns.color_palette("viridis", len(sales_by_category)))
+    plt.title('Total Sales Amount by Product Category', fontsize=16)
+    plt.xlabel('Product Category', fontsize=12)
+    plt.ylabel('Total Sales Amount ($)', fontsize=12)
+    plt.xticks(rotation=45, ha='right')
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+
+def plot_rating_vs_sales(ratings_and_sales):
+    """
+    Figure 2: Scatter Plot - Sales Amount vs. Customer Rating.
+    Switches to a hexbin density plot above SCATTER_HEXBIN_THRESHOLD points,
+    which renders in roughly constant time however many rows there are.
+    """
+    plt.figure(figsize=(10, 6))
+    if len(ratings_and_sales) > SCATTER_HEXBIN_THRESHOLD:
+        plt.hexbin(ratings_and_sales['Customer_Rating'], ratings_and_sales['Sales_Amount'],
+                   gridsize=50, mincnt=1, cmap='Purples')
+        plt.colorbar(label='Number of orders')
+    else:
+        plt.scatter(ratings_and_sales['Customer_Rating'], ratings_and_sales['Sales_Amount'],
+                    alpha=0.7, color='purple', edgecolors='w', linewidth=0.5)
+    plt.title('Sales Amount vs. Customer Rating', fontsize=16)
+    plt.xlabel('Customer Rating (1-5)', fontsize=12)
+    plt.ylabel('Sales Amount ($)', fontsize=12)
+    plt.grid(True, linestyle='--', alpha=0.6)
+    plt.tight_layout()
+
+def plot_correlation_heatmap(correlation_matrix):
+    """Figure 3: Heatmap - Correlation Matrix of Numerical Columns."""
+    plt.figure(figsize=(8, 7))
+    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', fmt=".2f", linewidths=.5)
+    plt.title('Correlation Matrix of Numerical Features', fontsize=16)
+    plt.xticks(rotation=45, ha='right')
+    plt.yticks(rotation=0)
+    plt.tight_layout()
+
+def plot_rating_distribution(ratings):
+    """Figure 4: Distribution of Customer Ratings (Histogram)."""
+    plt.figure(figsize=(8, 6))
+    sns.histplot(ratings, bins=10, kde=True, color='skyblue', edgecolor='black')
+    plt.title('Distribution of Customer Ratings', fontsize=16)
+    plt.xlabel('Customer Rating', fontsize=12)
+    plt.ylabel('Frequency', fontsize=12)
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+
+def plot_sales_by_region(regions_and_sales):
+    """Figure 5: Box Plot - Sales Amount by Region."""
+    plt.figure(figsize=(10, 6))
+    sns.boxplot(x='Region', y='Sales_Amount', data=regions_and_sales, palette='pastel')
+    plt.title('Sales Amount Distribution by Region', fontsize=16)
+    plt.xlabel('Region', fontsize=12)
+    plt.ylabel('Sales Amount ($)', fontsize=12)
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+
+# (file name, plot function, input data from (df_loaded, report), needs the full rows)
+FIGURES = [
+    ('category_sales', plot_category_sales, lambda df, report: report['sales_by_category'], False),
+    ('rating_vs_sales', plot_rating_vs_sales, lambda df, report: df[['Customer_Rating', 'Sales_Amount']], True),
+    ('correlation_heatmap', plot_correlation_heatmap, lambda df, report: report['correlation'], False),
+    ('rating_distribution', plot_rating_distribution, lambda df, report: df['Customer_Rating'], True),
+    ('sales_by_region', plot_sales_by_region, lambda df, report: df[['Region', 'Sales_Amount']], True),
+]
+
+def show_visualizations(df_loaded, report):
+    """
+    Shows the report figures one after another.
+    Args:
+        df_loaded (pandas.DataFrame): The sales data.
+        report (dict): The computed report (for the totals and correlations).
+    """
+    print("\n--- Data Visualizations ---")
+
+    # Set a style for better aesthetics
+    plt.style.use(PLOT_STYLE)
+
+    for name, plot_function, get_data, needs_rows in FIGURES:
+        plot_function(get_data(df_loaded, report))
+        plt.show()
+
+def _data_hash(data):
+    """Returns a content hash of a figure's input Series or DataFrame."""
+    digest = hashlib.sha256()
+    labels = list(data.columns) if isinstance(data, pd.DataFrame) else [data.name]
+    digest.update(repr(labels).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def _render_figure(plot_function, data, output_paths):
+    """
+    Draws one figure with the Agg backend and saves it to each output path.
+    Top-level so that it can run in a worker process.
+    """
+    plt.switch_backend('Agg')
+    plt.style.use(PLOT_STYLE)
+    plot_function(data)
+    for output_path in output_paths:
+        plt.savefig(output_path)
+    plt.close('all')
+    return output_paths
+
+def render_figures(df_loaded, report, output_dir, formats=('png', 'svg'), workers=None):
+    """
+    Renders the report figures to files without a display, in parallel
+    worker processes. A figure is skipped when its input data hash matches
+    the one recorded in the output directory and its files still exist.
+    Args:
+        df_loaded (pandas.DataFrame): The sales data, or None when only the
+            aggregated report is available (row-level figures are then skipped).
+        report (dict): The computed report.
+        output_dir (str): Directory for the image files.
+        formats (tuple): File formats to write, e.g. ('png', 'svg').
+        workers (int): Number of worker processes (default: one per CPU).
+    """
+    print(f"\n--- Rendering Figures to '{output_dir}' ---")
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, FIGURE_MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = {}
+        for name, plot_function, get_data, needs_rows in FIGURES:
+            if needs_rows and df_loaded is None:
+                print(f"Skipping '{name}': it needs the full data in memory.")
+                continue
+            data = get_data(df_loaded, report)
+            data_hash = _data_hash(data)
+            output_paths = [os.path.join(output_dir, f"{name}.{fmt}") for fmt in formats]
+            if manifest.get(name) == data_hash and all(os.path.exists(path) for path in output_paths):
+                print(f"'{name}' is up to date.")
+                continue
+            jobs[pool.submit(_render_figure, plot_function, data, output_paths)] = (name, data_hash)
+
+        for future in as_completed(jobs):
+            name, data_hash = jobs[future]
+            print(f"Rendered {', '.join(future.result())}")
+            manifest[name] = data_hash
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+# --- 5. Benchmark Suite ---
+def _git_commit():
+    """Returns the current git commit of this script's checkout, or None."""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+def _run_pipeline_stages(csv_file_path, figure_dir):
+    """
+    Runs the in-memory pipeline once with stage timing. Runs in a fresh
+    process so the memory figures belong to this dataset alone.
+    Returns:
+        list: The stage records.
+    """
+    timer = StageTimer()
+    with timer.stage('load') as stage:
+        df_loaded = pd.read_csv(csv_file_path)
+        stage['rows'] = len(df_loaded)
+    report = analyze_dataframe(df_loaded, timer)
+    with timer.stage('plotting', len(df_loaded)):
+        render_figures(df_loaded, report, figure_dir, formats=('png',), workers=1)
+    return timer.stages
+
+def run_benchmark_suite(output_path, sizes=BENCHMARK_SIZES, repeats=1):
+    """
+    Runs the pipeline over generated datasets of several sizes and writes
+    the per-stage timings, tagged with the git commit, as JSON.
+    Args:
+        output_path (str): Where to write the results.
+        sizes (list): Dataset sizes in rows.
+        repeats (int): Runs per size; for each stage the fastest is kept.
+    Returns:
+        dict: The results.
+    """
+    results = {'commit': _git_commit(), 'created': datetime.datetime.now().isoformat(timespec='seconds'),
+               'python': platform.python_version(), 'pandas': pd.__version__, 'sizes': {}}
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as work_dir:
+        for rows in sizes:
+            csv_file_path = os.path.join(work_dir, f"sales_{rows}.csv")
+            generate_sales_data(csv_file_path, rows)
+            best = {}
+            for run in range(repeats):
+                figure_dir = os.path.join(work_dir, f"figures_{rows}_{run}")
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    stages = pool.submit(_run_pipeline_stages, csv_file_path, figure_dir).result()
+                for record in stages:
+                    if record['stage'] not in best or record['wall_seconds'] < best[record['stage']]['wall_seconds']:
+                        best[record['stage']] = record
+            results['sizes'][str(rows)] = list(best.values())
+
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n--- Benchmark Suite (commit {results['commit']}) ---")
+    for rows, stages in results['sizes'].items():
+        print(f"\n{rows} rows:")
+        timer = StageTimer()
+        timer.stages = stages
+        timer.print_summary()
+    print(f"\nResults written to '{output_path}'.")
+    return results
+
+def compare_benchmarks(baseline_path, results, threshold=0.2, min_seconds=0.01):
+    """
+    Compares benchmark results against a baseline run (e.g. from an earlier commit).
+    Args:
+        baseline_path (str): JSON file written by run_benchmark_suite.
+        results (dict): The current results.
+        threshold (float): Relative slowdown that counts as a regression.
+        min_seconds (float): Stages faster than this in both runs are too noisy to judge.
+    Returns:
+        bool: True if no stage regressed.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n--- Comparison: {baseline.get('commit')} -> {results.get('commit')} ---")
+    print(f"{'Rows':>10}  {'Stage':<16}{'Baseline (s)':>14}{'Current (s)':>14}{'Change':>10}")
+    passed = True
+    for rows, stages in results['sizes'].items():
+        baseline_stages = {record['stage']: record for record in baseline['sizes'].get(rows, [])}
+        for record in stages:
+            if record['stage'] not in baseline_stages:
+                continue
+            before = baseline_stages[record['stage']]['wall_seconds']
+            after = record['wall_seconds']
+            change = after / before - 1 if before else math.inf
+            regressed = change > threshold and max(before, after) >= min_seconds
+            passed = passed and not regressed
+            print(f"{rows:>10}  {record['stage']:<16}{before:>14.4f}{after:>14.4f}{change:>+10.1%}"
+                  f"{'  REGRESSION' if regressed else ''}")
+    print("No regressions." if passed else f"Regressions above {threshold:.0%} found.")
+    return passed
+
+def parse_args():
+    """Parses the command-line options."""
+    parser = argparse.ArgumentParser(description="Sales data analysis and visualization.")
+    parser.add_argument('--csv', help="Analyze an existing CSV file instead of generating the sample data.")
+    parser.add_argument('--chunksize', type=int,
+                        help="Stream the CSV in chunks of this many rows instead of loading it into memory. "
+                             f"Percentiles of columns with more than {EXACT_QUANTILE_MAX_DISTINCT:,} distinct values "
+                             "are then approximate (KLL sketch), so memory stays bounded.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Keep persisted summary statistics next to the CSV and fold in only newly appended rows.")
+    parser.add_argument('--approximate', action='store_true',
+                        help="Stream the data through mergeable sketches (KLL, HyperLogLog, Count-Min) "
+                             "so memory stays bounded for billions of rows and high-cardinality columns.")
+    parser.add_argument('--rank-error', type=float, default=DEFAULT_ERROR_BOUNDS.rank_error,
+                        help="Percentile rank error for --approximate (default: %(default)s).")
+    parser.add_argument('--distinct-error', type=float, default=DEFAULT_ERROR_BOUNDS.distinct_error,
+                        help="Relative standard error of distinct counts for --approximate (default: %(default)s).")
+    parser.add_argument('--count-error', type=float, default=DEFAULT_ERROR_BOUNDS.count_error,
+                        help="Count/sum overcount as a fraction of the total for --approximate (default: %(default)s).")
+    parser.add_argument('--check-sketches', action='store_true',
+                        help="Check the approximate mode against exact pandas results on generated data, then exit.")
+    parser.add_argument('--partition', metavar='PARTITION_DIR',
+                        help="Write the CSV as month partitions of Parquet files with a date index, then exit.")
+    parser.add_argument('--query', nargs=3, metavar=('PARTITION_DIR', 'START', 'END'),
+                        help="Total sales per --group-by for orders from START (inclusive) to END (exclusive), "
+                             "reading only the partitions that overlap the range.")
+    parser.add_argument('--group-by', default=CATEGORY_COLUMN,
+                        help="Column to group --query results by (default: %(default)s).")
+    parser.add_argument('--benchmark-queries', action='store_true',
+                        help="Benchmark date-range queries against history length, then exit.")
+    parser.add_argument('--generate', metavar='OUTPUT',
+                        help="Write synthetic sales data to OUTPUT (.csv, or .parquet), then exit.")
+    parser.add_argument('--rows', type=int, default=1_000_000,
+                        help="Number of rows for --generate (default: %(default)s).")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for --generate (default: %(default)s).")
+    parser.add_argument('--category-skew', type=float, default=0.0,
+                        help="Zipf exponent of category popularity for --generate (default: uniform).")
+    parser.add_argument('--region-skew', type=float, default=0.0,
+                        help="Zipf exponent of region popularity for --generate (default: uniform).")
+    parser.add_argument('--date-range', nargs=2, metavar=('START', 'END'), default=['2023-01-01', '2023-12-31'],
+                        help="First and last order date for --generate (default: all of 2023).")
+    parser.add_argument('--extra-columns', type=int, default=0,
+                        help="Extra random float columns to widen the rows for --generate.")
+    parser.add_argument('--target-rate', type=float,
+                        help="Throughput target for --generate in rows/second; a warning is printed if missed.")
+    parser.add_argument('--timings', metavar='JSON_PATH',
+                        help="Write per-stage wall/CPU time, peak RSS and rows/s as JSON ('-' for stdout).")
+    parser.add_argument('--benchmark-suite', metavar='OUTPUT_JSON',
+                        help="Time every pipeline stage over generated datasets of --sizes rows, then exit.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=BENCHMARK_SIZES,
+                        help="Dataset sizes for --benchmark-suite (default: %(default)s).")
+    parser.add_argument('--repeats', type=int, default=1,
+                        help="Runs per size for --benchmark-suite; the fastest run of each stage is kept.")
+    parser.add_argument('--compare', metavar='BASELINE_JSON',
+                        help="Compare --benchmark-suite results against an earlier run and exit 1 on regressions.")
+    parser.add_argument('--regression-threshold', type=float, default=0.2,
+                        help="Relative slowdown reported as a regression by --compare (default: %(default)s).")
+    parser.add_argument('--files',
+                        help="Glob of CSV files (e.g. 'sales/*.csv') to aggregate in parallel into one report.")
+    parser.add_argument('--workers', type=int,
+                        help="Number of worker processes for --files and --headless (default: one per CPU).")
+    parser.add_argument('--headless', metavar='OUTPUT_DIR',
+                        help="Render the figures to image files in this directory (no display needed).")
+    parser.add_argument('--formats', default='png,svg',
+                        help="Comma-separated image formats for --headless (default: png,svg).")
+    parser.add_argument('--cache', action='store_true',
+                        help="Load through a typed Parquet cache that is rebuilt only when the CSV changes.")
+    parser.add_argument('--benchmark-load', action='store_true',
+                        help="Compare load time and memory of read_csv against the columnar cache, then exit.")
+    return parser.parse_args()
+
+def show_aggregate_visualizations(report, args):
+    """Renders what the aggregated (streaming or multi-file) report supports."""
+    if args.headless:
+        render_figures(None, report, args.headless, args.formats.split(','), args.workers)
+    else:
+        print("\nSkipping visualizations: interactive figures need the full data in memory "
+              "(use --headless to render the aggregate figures to files).")
+
+def main():
+    """
+    Main function for the sales analysis.
+    Generates (or uses) the CSV file, prints the report and shows the figures.
+    """
+    args = parse_args()
+    error_bounds = None
+    if args.approximate or args.check_sketches:
+        error_bounds = DEFAULT_ERROR_BOUNDS._replace(rank_error=args.rank_error, distinct_error=args.distinct_error,
+                                                     count_error=args.count_error)
+    if args.check_sketches:
+        exit(0 if check_sketch_accuracy(error_bounds=error_bounds) else 1)
+
+    if args.generate:
+        generate_sales_data(args.generate, args.rows, args.target_rate,
+                            batch_size=args.chunksize or DEFAULT_CHUNKSIZE, seed=args.seed,
+                            category_skew=args.category_skew, region_skew=args.region_skew,
+                            start_date=args.date_range[0], end_date=args.date_range[1],
+                            extra_columns=args.extra_columns)
+        return
+    if args.query:
+        partition_dir, start, end = args.query
+        totals, files_read = query_sales(partition_dir, start, end, args.group_by)
+        print(f"\nTotal Sales by {args.group_by} from {start} to {end} ({files_read} partition files read):\n")
+        print(totals)
+        return
+    if args.benchmark_queries:
+        with tempfile.TemporaryDirectory() as work_dir:
+            benchmark_date_queries(work_dir)
+        return
+
+    if args.benchmark_suite:
+        results = run_benchmark_suite(args.benchmark_suite, args.sizes, args.repeats)
+        if args.compare and not compare_benchmarks(args.compare, results, args.regression_threshold):
+            exit(1)
+        return
+
+    timer = StageTimer()
+    df_loaded = None
+    if args.files:
+        with timer.stage('aggregate') as stage:
+            report = analyze_csv_files(args.files, args.workers, args.chunksize or DEFAULT_CHUNKSIZE, error_bounds)
+            stage['rows'] = report['rows']
+    else:
+        csv_file_path = args.csv
+        if csv_file_path is None:
+            csv_file_path = CSV_FILE_PATH
+            generate_sample_csv(csv_file_path)
+
+        if args.benchmark_load:
+            benchmark_load(csv_file_path)
+            return
+        if args.partition:
+            build_date_partitions(csv_file_path, args.partition, args.chunksize or DEFAULT_CHUNKSIZE)
+            return
+
+        if args.incremental:
+            with timer.stage('aggregate') as stage:
+                report = analyze_csv_incrementally(csv_file_path)
+                stage['rows'] = report['rows']
+        elif args.chunksize or args.approximate:
+            with timer.stage('aggregate') as stage:
+                report = analyze_csv_in_chunks(csv_file_path, args.chunksize or DEFAULT_CHUNKSIZE, error_bounds)
+                stage['rows'] = report['rows']
+        else:
+            with timer.stage('load') as stage:
+                df_loaded = load_csv(csv_file_path, use_cache=args.cache)
+                stage['rows'] = len(df_loaded)
+            report = analyze_dataframe(df_loaded, timer)
+
+    print_report(report)
+    with timer.stage('plotting', report['rows']):
+        if df_loaded is None:
+            show_aggregate_visualizations(report, args)
+        elif args.headless:
+            render_figures(df_loaded, report, args.headless, args.formats.split(','), args.workers)
+        else:
+            show_visualizations(df_loaded, report)
+
+    if args.timings:
+        timer.print_summary()
+        timer.write_json(args.timings)
+
+if __name__ == "__main__":
+    main()
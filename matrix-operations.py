@@ -1,135 +1,1396 @@
-import numpy as np
-
-def get_matrix_input(matrix_name):
-    """
-    Prompts the user to input the dimensions and elements of a matrix.
-    Args:
-        matrix_name (str): A descriptive name for the matrix (e.g., "Matrix A").
-    Returns:
-        numpy.ndarray: The matrix entered by the user.
-    """
-    print(f"\n--- Enter {matrix_name} ---")
-    while True:
-        try:
-            rows = int(input(f"Enter the number of rows for {matrix_name}: "))
-            cols = int(input(f"Enter the number of columns for {matrix_name}: "))
-            if rows <= 0 or cols <= 0:
-                print("Number of rows and columns must be positive integers. Please try again.")
-                continue
-            break
-        except ValueError:
-            print("Invalid input. Please enter integers for dimensions.")
-
-    matrix_elements = []
-    print(f"Enter the elements for {matrix_name} row by row (space-separated):")
-    for i in range(rows):
-        while True:
-            try:
-                row_str = input(f"Row {i + 1}: ")
-                row_elements = list(map(float, row_str.split()))
-                if len(row_elements) != cols:
-                    print(f"Incorrect number of elements. Expected {cols}, got {len(row_elements)}. Please re-enter the row.")
-                else:
-                    matrix_elements.append(row_elements)
-                    break
-            except ValueError:
-                print("Invalid input. Please enter numbers separated by spaces.")
-    return np.array(matrix_elements)
-
-def display_matrix(matrix, title="Matrix"):
-    """
-    Displays a NumPy matrix in a structured format.
-    Args:
-        matrix (numpy.ndarray): The matrix to display.
-        title (str): A title for the matrix display.
-    """
-    print(f"\n--- {title} ---")
-    if matrix.size == 0:
-        print("Empty Matrix")
-    else:
-        print(matrix)
-    print("-" * (len(title) + 8)) # Decorative line
-
-def main():
-    """
-    Main function for the Matrix Operations Tool.
-    Manages user interaction, operation selection, and result display.
-    """
-    print("Welcome to the Matrix Operations Tool!")
-
-    while True:
-        print("\n--- Choose an Operation ---")
-        print("1. Addition (A + B)")
-        print("2. Subtraction (A - B)")
-        print("3. Multiplication (A * B)")
-        print("4. Transpose (A^T)")
-        print("5. Determinant (det(A))")
-        print("6. Exit")
-
-        choice = input("Enter your choice (1-6): ")
-
-        if choice == '1':
-            matrix_a = get_matrix_input("Matrix A")
-            matrix_b = get_matrix_input("Matrix B")
-            if matrix_a.shape != matrix_b.shape:
-                print("\nError: Matrices must have the same dimensions for addition.")
-            else:
-                result = matrix_a + matrix_b
-                display_matrix(matrix_a, "Matrix A")
-                display_matrix(matrix_b, "Matrix B")
-                display_matrix(result, "Result of Addition (A + B)")
-
-        elif choice == '2':
-            matrix_a = get_matrix_input("Matrix A")
-            matrix_b = get_matrix_input("Matrix B")
-            if matrix_a.shape != matrix_b.shape:
-                print("\nError: Matrices must have the same dimensions for subtraction.")
-            else:
-                result = matrix_a - matrix_b
-                display_matrix(matrix_a, "Matrix A")
-                display_matrix(matrix_b, "Matrix B")
-                display_matrix(result, "Result of Subtraction (A - B)")
-
-        elif choice == '3':
-            matrix_a = get_matrix_input("Matrix A")
-            matrix_b = get_matrix_input("Matrix B")
-            # For matrix multiplication A * B, number of columns in A must equal number of rows in B
-            if matrix_a.shape[1] != matrix_b.shape[0]:
-                print("\nError: For matrix multiplication (A * B), the number of columns in Matrix A must equal the number of rows in Matrix B.")
-            else:
-                result = np.dot(matrix_a, matrix_b) # or matrix_a @ matrix_b in Python 3.5+
-                display_matrix(matrix_a, "Matrix A")
-                display_matrix(matrix_b, "Matrix B")
-                display_matrix(result, "Result of Multiplication (A * B)")
-
-        elif choice == '4':
-            matrix_a = get_matrix_input("Matrix A")
-            result = np.transpose(matrix_a)
-            display_matrix(matrix_a, "Original Matrix A")
-            display_matrix(result, "Result of Transpose (A^T)")
-
-        elif choice == '5':
-            matrix_a = get_matrix_input("Matrix A")
-            if matrix_a.shape[0] != matrix_a.shape[1]:
-                print("\nError: Determinant can only be calculated for square matrices.")
-            else:
-                try:
-                    result = np.linalg.det(matrix_a)
-                    display_matrix(matrix_a, "Matrix A")
-                    print(f"\n--- Determinant of Matrix A ---")
-                    print(f"det(A) = {result:.4f}") # Format to 4 decimal places
-                    print("-----------------------------")
-                except np.linalg.LinAlgError as e:
-                    print(f"\nError calculating determinant: {e}. This might happen for singular matrices.")
-
-        elif choice == '6':
-            print("Exiting Matrix Operations Tool. Goodbye!")
-            break
-
-        else:
-            print("Invalid choice. Please enter a number between 1 and 6.")
-
-        input("\nPress Enter to continue...") # Pause for user to read output
-
-if __name__ == "__main__":
-    main()
+import argparse
+import ast
+import collections
+import mmap
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+
+TEXT_BLOCK_SIZE = 16 << 20 # Bytes of text parsed per block when loading CSV/whitespace matrices
+COMMAS_TO_SPACES = bytes.maketrans(b',', b' ')
+FIELD_SEPARATORS = np.zeros(256, dtype=bool) # Bytes that separate the numbers of a text matrix
+FIELD_SEPARATORS[list(b' \t\r\n\v\f,')] = True
+DEFAULT_MEMORY_BUDGET = 1 << 30 # Bytes the blocked multiplication may keep resident at once
+THREAD_WORKSPACE = 256 << 10 # Fixed bytes per multiplying thread (stack, BLAS bookkeeping)
+SPARSE_DENSITY_THRESHOLD = 0.1 # Sparse results denser than this are returned dense (see benchmark_sparse)
+SPARSE_SUFFIXES = ('.coo', '.mtx', '.npz') # Files loaded as scipy.sparse matrices
+DISPLAY_MAX_ELEMENTS = 1000 # Larger matrices are summarised by display_matrix
+DISPLAY_MAX_NONZEROS = 10 # Nonzeros listed when summarising a sparse matrix
+
+def get_matrix_input(matrix_name):
+    """
+    Prompts the user to input the dimensions and elements of a matrix.
+    Args:
+        matrix_name (str): A descriptive name for the matrix (e.g., "Matrix A").
+    Returns:
+        numpy.ndarray: The matrix entered by the user.
+    """
+    print(f"\n--- Enter {matrix_name} ---")
+    while True:
+        try:
+            rows = int(input(f"Enter the number of rows for {matrix_name}: "))
+            cols = int(input(f"Enter the number of columns for {matrix_name}: "))
+            if rows <= 0 or cols <= 0:
+                print("Number of rows and columns must be positive integers. Please try again.")
+                continue
+            break
+        except ValueError:
+            print("Invalid input. Please enter integers for dimensions.")
+
+    matrix_elements = []
+    print(f"Enter the elements for {matrix_name} row by row (space-separated):")
+    for i in range(rows):
+        while True:
+            try:
+                row_str = input(f"Row {i + 1}: ")
+                row_elements = list(map(float, row_str.split()))
+                if len(row_elements) != cols:
+                    print(f"Incorrect number of elements. Expected {cols}, got {len(row_elements)}. Please re-enter the row.")
+                else:
+                    matrix_elements.append(row_elements)
+                    break
+            except ValueError:
+                print("Invalid input. Please enter numbers separated by spaces.")
+    return np.array(matrix_elements)
+
+def _text_matrix_layout(f):
+    """
+    Works out where the numbers in a text matrix file start and end and the
+    matrix shape, without parsing the numbers.
+    Args:
+        f (file): The file, opened in binary mode.
+    Returns:
+        tuple: (data start offset, data end offset, rows, cols)
+    """
+    first_line = f.readline()
+    fields = first_line.translate(COMMAS_TO_SPACES).split()
+    start = 0
+    try:
+        float(fields[0])
+    except (IndexError, ValueError):
+        start = len(first_line) # A header line (or an empty file)
+        fields = f.readline().translate(COMMAS_TO_SPACES).split()
+    cols = len(fields)
+
+    # The end of the data is the last non-whitespace byte; trailing blank lines are ignored
+    end = f.seek(0, 2)
+    while end > start:
+        f.seek(max(start, end - TEXT_BLOCK_SIZE))
+        block = f.read(end - f.tell())
+        stripped = block.rstrip()
+        if stripped:
+            end -= len(block) - len(stripped)
+            break
+        end -= len(block)
+
+    newlines = 0
+    f.seek(start)
+    position = start
+    while position < end:
+        block = f.read(min(TEXT_BLOCK_SIZE, end - position))
+        newlines += block.count(b'\n')
+        position += len(block)
+    rows = newlines + 1 if end > start else 0
+    return start, end, rows, cols
+
+def _fields_per_line(block):
+    """
+    Counts the fields on each line of a block of text, vectorized: a field
+    starts wherever a separator byte is followed by any other byte.
+    Returns:
+        numpy.ndarray: The field count of each line (a last line without a newline included).
+    """
+    data = np.frombuffer(block, dtype=np.uint8)
+    separator = FIELD_SEPARATORS[data]
+    starts = np.flatnonzero(separator[:-1] & ~separator[1:]) + 1
+    if data.size and not separator[0]:
+        starts = np.concatenate(([0], starts))
+    line_ends = np.flatnonzero(data == ord('\n'))
+    if data.size and data[-1] != ord('\n'):
+        line_ends = np.append(line_ends, data.size)
+    return np.diff(np.searchsorted(starts, line_ends), prepend=0)
+
+def _first_empty_field(block):
+    """
+    Finds an empty comma-separated field ('1,,3', or a comma at either end
+    of a line), vectorized: with blanks dropped, a comma next to another
+    comma or to a line break.
+    Returns:
+        int: Index of the first line with an empty field, or None.
+    """
+    data = np.frombuffer(block, dtype=np.uint8)
+    data = data[(data != ord(' ')) & (data != ord('\t')) & (data != ord('\r'))]
+    comma, newline = data == ord(','), data == ord('\n')
+    after_break = np.concatenate(([True], newline[:-1]))
+    before_break = np.concatenate(((comma | newline)[1:], [True]))
+    empty = np.flatnonzero(comma & (after_break | before_break))
+    return int(np.count_nonzero(newline[:empty[0]])) if empty.size else None
+
+def _read_csv_block(block, cols, delimiter):
+    """
+    Parses whole lines of text with pyarrow's C++ CSV reader, which checks
+    the field count of every line and rejects empty fields as it parses.
+    Returns:
+        pyarrow.Table: cols float64 columns, or None if pyarrow is not
+        installed or could not read the block.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as csv
+    except ImportError:
+        return None
+    names = [str(column) for column in range(cols)]
+    try:
+        return csv.read_csv(pa.BufferReader(block),
+                            read_options=csv.ReadOptions(column_names=names),
+                            parse_options=csv.ParseOptions(delimiter=delimiter, quote_char=False,
+                                                           ignore_empty_lines=False),
+                            convert_options=csv.ConvertOptions(column_types=dict.fromkeys(names, pa.float64()),
+                                                               null_values=[]))
+    except pa.ArrowInvalid:
+        return None
+
+def _parse_text_block(file_path, block, row, cols):
+    """
+    Parses whole lines of text with numpy.fromstring, after looking for
+    empty fields and checking the field count of every line (vectorized).
+    Args:
+        row (int): Index of the block's first line in the matrix, for error messages.
+    Returns:
+        numpy.ndarray: The (lines, cols) values.
+    """
+    empty = _first_empty_field(block) if b',' in block else None # fromstring and _fields_per_line skip them
+    if empty is not None:
+        raise ValueError(f"'{file_path}' row {row + empty + 1}: empty field.")
+    fields = _fields_per_line(block)
+    lines = len(fields)
+    ragged = np.flatnonzero(fields != cols)
+    if ragged.size:
+        bad = ragged[0]
+        raise ValueError(f"'{file_path}' row {row + bad + 1}: expected {cols} numbers, found {fields[bad]}.")
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning) # Reported below as a count mismatch
+        try:
+            values = np.fromstring(block.translate(COMMAS_TO_SPACES), dtype=float, sep=' ')
+        except ValueError: # Newer numpy raises instead of stopping at the first non-number
+            values = None
+    if values is None or values.size != lines * cols:
+        raise ValueError(f"'{file_path}' rows {row + 1}-{row + lines}: expected {cols} numbers per row, "
+                         f"found text that is not a number.")
+    return values.reshape(lines, cols)
+
+def load_text_matrix(file_path, out=None):
+    """
+    Loads a CSV or whitespace-separated text matrix (an optional header line
+    is skipped). The shape is found in a first, counting-only pass; the
+    numbers are then parsed block by block straight into a preallocated
+    float array by pyarrow's C++ CSV reader, which checks each line's field
+    count as it parses. Files it cannot read (columns aligned with runs of
+    spaces, or any file when pyarrow is not installed) are parsed with
+    numpy.fromstring after a separate field count instead, several times
+    more slowly (see benchmark_load). Empty fields, as in '1,,3', are
+    rejected either way.
+    Args:
+        file_path (str): Path to the text file.
+        out (numpy.ndarray): Optional preallocated (rows, cols) float array
+            to fill, e.g. a memory-mapped .npy file.
+    Returns:
+        numpy.ndarray: The matrix.
+    """
+    with open(file_path, 'rb') as f:
+        start, end, rows, cols = _text_matrix_layout(f)
+        if rows == 0 or cols == 0:
+            raise ValueError(f"'{file_path}' contains no matrix data.")
+        if out is None:
+            out = np.empty((rows, cols))
+        elif out.shape != (rows, cols):
+            raise ValueError(f"'{file_path}' holds a {rows}x{cols} matrix, but the output array is {out.shape}.")
+
+        f.seek(start)
+        delimiter = ',' if b',' in f.readline() else ' '
+        f.seek(start)
+        use_arrow = True
+        row = 0
+        pending = b''
+        position = start
+        while position < end:
+            block = f.read(min(TEXT_BLOCK_SIZE, end - position))
+            position += len(block)
+            block = pending + block
+            if position < end:
+                # Parse whole lines only; the partial last line waits for the next block
+                cut = block.rfind(b'\n') + 1
+                block, pending = block[:cut], block[cut:]
+            table = _read_csv_block(block, cols, delimiter) if use_arrow else None
+            if table is None:
+                values = _parse_text_block(file_path, block, row, cols) # Also says what pyarrow rejected
+                out[row:row + len(values)] = values
+                row += len(values)
+                use_arrow = False # The rest of the file is most likely laid out the same way
+                continue
+            for batch in table.to_batches():
+                for column, values in enumerate(batch.columns):
+                    out[row:row + batch.num_rows, column] = values.to_numpy()
+                row += batch.num_rows
+    return out
+
+def load_coo_matrix(file_path):
+    """
+    Loads a sparse matrix from a COO triplet file: one "row col value" line
+    per nonzero (0-based indices), optionally preceded by a "# ROWS COLS"
+    line giving the shape (otherwise the largest indices decide it).
+    Args:
+        file_path (str): Path to the triplet file.
+    Returns:
+        scipy.sparse.csr_array: The matrix.
+    """
+    import scipy.sparse as sparse
+
+    with open(file_path) as f:
+        header = f.readline().split()
+    shape = None
+    if header[:1] == ['#'] and header[1:2] and header[1][0].isdigit(): # Other '#' lines are column labels
+        if len(header) != 3 or not all(field.isdigit() for field in header[1:]):
+            raise ValueError(f"'{file_path}' line 1: expected a '# ROWS COLS' shape header, found '{' '.join(header)}'.")
+        shape = (int(header[1]), int(header[2]))
+    with open(file_path, 'rb') as f:
+        rows = _text_matrix_layout(f)[2]
+    triplets = load_text_matrix(file_path) if rows else np.empty((0, 3)) # No lines after the header: no nonzeros
+    if triplets.shape[1] != 3:
+        raise ValueError(f"'{file_path}' must have three columns (row col value), found {triplets.shape[1]}.")
+    indices = triplets[:, :2]
+    bad = np.flatnonzero(((indices != np.floor(indices)) | (indices < 0)).any(axis=1))
+    if bad.size:
+        row, col = indices[bad[0]]
+        raise ValueError(f"'{file_path}' row {bad[0] + 1}: indices must be non-negative whole numbers, found {row:g} {col:g}.")
+    rows, cols = indices[:, 0].astype(np.int64), indices[:, 1].astype(np.int64)
+    return sparse.coo_array((triplets[:, 2], (rows, cols)), shape=shape).tocsr()
+
+def save_coo_matrix(matrix, file_path):
+    """
+    Saves a matrix as a COO triplet file (see load_coo_matrix).
+    Args:
+        matrix: A scipy.sparse or dense matrix.
+        file_path (str): Path to the file.
+    """
+    import scipy.sparse as sparse
+
+    coo = sparse.coo_array(matrix)
+    triplets = np.column_stack([coo.row, coo.col, coo.data])
+    np.savetxt(file_path, triplets, fmt=['%d', '%d', '%.17g'], header=f"{coo.shape[0]} {coo.shape[1]}", comments='# ')
+
+def is_sparse(matrix):
+    """Returns True for scipy.sparse matrices (without importing scipy)."""
+    return hasattr(matrix, 'tocsr')
+
+def load_matrix(file_path, mmap=False):
+    """
+    Loads a matrix from a .npy file or a CSV/whitespace text file. A .npy
+    file may also hold an (N, r, c) stack of matrices. COO triplet (.coo),
+    Matrix Market (.mtx) and scipy (.npz) files load as sparse matrices.
+    Args:
+        file_path (str): Path to the file.
+        mmap (bool): Memory-map .npy files (read-only) instead of reading them into memory.
+    Returns:
+        numpy.ndarray: The matrix (or stack), or a scipy.sparse.csr_array.
+    """
+    if file_path.endswith(SPARSE_SUFFIXES):
+        import scipy.io
+        import scipy.sparse as sparse
+
+        if file_path.endswith('.coo'):
+            return load_coo_matrix(file_path)
+        if file_path.endswith('.mtx'):
+            return sparse.csr_array(scipy.io.mmread(file_path))
+        return sparse.csr_array(sparse.load_npz(file_path))
+    if file_path.endswith('.npy'):
+        matrix = np.load(file_path, mmap_mode='r' if mmap else None)
+    else:
+        matrix = load_text_matrix(file_path)
+    if matrix.ndim not in (2, 3):
+        raise ValueError(f"'{file_path}' holds a {matrix.ndim}-dimensional array, not a matrix.")
+    return matrix
+
+def save_matrix(matrix, file_path):
+    """
+    Saves a matrix as .npy, as a sparse .coo/.mtx/.npz file, or as text
+    (comma-separated for .csv, space-separated otherwise).
+    Args:
+        matrix: The matrix to save (numpy.ndarray or scipy.sparse).
+        file_path (str): Path to the file.
+    """
+    if file_path.endswith(SPARSE_SUFFIXES):
+        import scipy.io
+        import scipy.sparse as sparse
+
+        if file_path.endswith('.coo'):
+            save_coo_matrix(matrix, file_path)
+        elif file_path.endswith('.mtx'):
+            scipy.io.mmwrite(file_path, sparse.coo_array(matrix))
+        else:
+            sparse.save_npz(file_path, sparse.csr_array(matrix))
+        return
+    if is_sparse(matrix):
+        matrix = matrix.toarray()
+    if file_path.endswith('.npy'):
+        np.save(file_path, matrix)
+    else:
+        np.savetxt(file_path, matrix, delimiter=',' if file_path.endswith('.csv') else ' ')
+
+def display_matrix(matrix, title="Matrix"):
+    """
+    Displays a NumPy matrix in a structured format.
+    Args:
+        matrix (numpy.ndarray): The matrix to display.
+        title (str): A title for the matrix display.
+    """
+    print(f"\n--- {title} ---")
+    if is_sparse(matrix):
+        rows, cols = matrix.shape
+        density = matrix.nnz / (rows * cols) if rows * cols else 0.0
+        print(f"{rows}x{cols} sparse {matrix.format.upper()} matrix, {matrix.nnz} nonzeros (density {density:.4%})")
+        coo = matrix.tocoo()
+        for row, col, value in list(zip(coo.row, coo.col, coo.data))[:DISPLAY_MAX_NONZEROS]:
+            print(f"  ({row}, {col})  {value:g}")
+        if coo.nnz > DISPLAY_MAX_NONZEROS:
+            print(f"  ... {coo.nnz - DISPLAY_MAX_NONZEROS} more")
+    elif matrix.size == 0:
+        print("Empty Matrix")
+    elif matrix.size > DISPLAY_MAX_ELEMENTS:
+        print(f"{' x '.join(map(str, matrix.shape))} {matrix.dtype} matrix, "
+              f"min {matrix.min():g}, max {matrix.max():g}, mean {matrix.mean():g}")
+        print(np.array2string(np.asarray(matrix), threshold=DISPLAY_MAX_ELEMENTS, edgeitems=3))
+    else:
+        print(matrix)
+    print("-" * (len(title) + 8)) # Decorative line
+
+def choose_format(matrix, density_threshold=SPARSE_DENSITY_THRESHOLD):
+    """
+    Returns a sparse result as a dense array when fill-in has made it denser
+    than the threshold (dense arithmetic is then faster and no larger), and
+    anything else unchanged.
+    Args:
+        matrix: A result matrix (numpy.ndarray or scipy.sparse).
+        density_threshold (float): Largest nonzero fraction kept sparse.
+    """
+    if is_sparse(matrix):
+        rows, cols = matrix.shape
+        if rows * cols and matrix.nnz / (rows * cols) > density_threshold:
+            return matrix.toarray()
+        return matrix.tocsr()
+    return np.asarray(matrix) # Sparse-with-dense arithmetic may return numpy.matrix
+
+def add_matrices(matrix_a, matrix_b):
+    """Returns A + B (raises ValueError if the shapes differ)."""
+    if matrix_a.shape != matrix_b.shape:
+        raise ValueError("Matrices must have the same dimensions for addition.")
+    return choose_format(matrix_a + matrix_b)
+
+def subtract_matrices(matrix_a, matrix_b):
+    """Returns A - B (raises ValueError if the shapes differ)."""
+    if matrix_a.shape != matrix_b.shape:
+        raise ValueError("Matrices must have the same dimensions for subtraction.")
+    return choose_format(matrix_a - matrix_b)
+
+def multiply_matrices(matrix_a, matrix_b):
+    """Returns the matrix product A * B (raises ValueError if the inner dimensions differ)."""
+    # For matrix multiplication A * B, number of columns in A must equal number of rows in B
+    if matrix_a.shape[1] != matrix_b.shape[0]:
+        raise ValueError("For matrix multiplication (A * B), the number of columns in Matrix A must equal the number of rows in Matrix B.")
+    return choose_format(matrix_a @ matrix_b) # @ also dispatches to scipy.sparse products
+
+def transpose_matrix(matrix_a):
+    """Returns A^T (a view for dense matrices; CSR becomes CSC without copying)."""
+    return matrix_a.T
+
+def _permutation_sign(permutation):
+    """Returns the sign (+1 or -1) of a permutation given as an index array."""
+    seen = np.zeros(len(permutation), dtype=bool)
+    transpositions = 0
+    for start in range(len(permutation)):
+        length = 0
+        index = start
+        while not seen[index]:
+            seen[index] = True
+            index = permutation[index]
+            length += 1
+        transpositions += max(length - 1, 0)
+    return -1 if transpositions % 2 else 1
+
+def sparse_determinant(matrix_a):
+    """
+    Computes det(A) of a sparse matrix from its sparse LU factorization
+    (Pr A Pc = L U with unit-diagonal L), without densifying it.
+    Args:
+        matrix_a: A square scipy.sparse matrix.
+    Returns:
+        float: The determinant (0.0 for a singular matrix).
+    """
+    import scipy.sparse.linalg as sparse_linalg
+
+    try:
+        lu = sparse_linalg.splu(matrix_a.tocsc())
+    except RuntimeError: # SuperLU reports an exactly singular factor
+        return 0.0
+    diagonal = lu.U.diagonal()
+    sign = _permutation_sign(lu.perm_r) * _permutation_sign(lu.perm_c) * np.prod(np.sign(diagonal))
+    return float(sign * np.exp(np.sum(np.log(np.abs(diagonal)))))
+
+def determinant(matrix_a):
+    """Returns det(A) (raises ValueError if A is not square)."""
+    if matrix_a.shape[0] != matrix_a.shape[1]:
+        raise ValueError("Determinant can only be calculated for square matrices.")
+    if is_sparse(matrix_a):
+        return sparse_determinant(matrix_a)
+    return np.linalg.det(matrix_a)
+
+class Expression:
+    """
+    A lazily evaluated matrix expression. Wrap matrices with lazy(), combine
+    them with +, -, @ (or *) and .T, and call evaluate() once at the end:
+    transposes become views, chains of additions and subtractions run in
+    place in a single output buffer, and chains of products are evaluated in
+    the cheapest order. Shapes are checked as the expression is built.
+    """
+
+    def __init__(self, operation, operands, shape):
+        self.operation = operation # 'leaf', 'add', 'subtract', 'multiply' or 'transpose'
+        self.operands = operands # (matrix,) for a leaf, otherwise child Expressions
+        self.shape = shape
+
+    def __add__(self, other):
+        other = lazy(other)
+        if self.shape != other.shape:
+            raise ValueError("Matrices must have the same dimensions for addition.")
+        return Expression('add', (self, other), self.shape)
+
+    def __sub__(self, other):
+        other = lazy(other)
+        if self.shape != other.shape:
+            raise ValueError("Matrices must have the same dimensions for subtraction.")
+        return Expression('subtract', (self, other), self.shape)
+
+    def __matmul__(self, other):
+        other = lazy(other)
+        if self.shape[1] != other.shape[0]:
+            raise ValueError("For matrix multiplication (A * B), the number of columns in Matrix A must equal the number of rows in Matrix B.")
+        return Expression('multiply', (self, other), (self.shape[0], other.shape[1]))
+
+    __mul__ = __matmul__ # The tool writes matrix multiplication as A * B
+
+    @property
+    def T(self):
+        if self.operation == 'transpose':
+            return self.operands[0]
+        return Expression('transpose', (self,), self.shape[::-1])
+
+    def evaluate(self, out=None, stats=None):
+        """Evaluates the expression; see evaluate()."""
+        return evaluate(self, out, stats)
+
+def lazy(matrix):
+    """Wraps a matrix as a leaf Expression (Expressions are returned unchanged)."""
+    if isinstance(matrix, Expression):
+        return matrix
+    if np.ndim(matrix) != 2:
+        raise ValueError(f"Expressions take matrices, not {np.ndim(matrix)}-dimensional arrays.")
+    return Expression('leaf', (matrix,), tuple(matrix.shape))
+
+def _terms(expression, sign=1):
+    """Flattens nested additions and subtractions into (sign, term) pairs, sinking transposes into the terms."""
+    if expression.operation in ('add', 'subtract'):
+        left, right = expression.operands
+        return _terms(left, sign) + _terms(right, sign if expression.operation == 'add' else -sign)
+    if expression.operation == 'transpose' and expression.operands[0].operation in ('add', 'subtract'):
+        return [(term_sign, term.T) for term_sign, term in _terms(expression.operands[0], sign)]
+    return [(sign, expression)]
+
+def _factors(expression):
+    """Flattens nested products into a list of factors, using (XY)^T = Y^T X^T to keep chains flat."""
+    if expression.operation == 'multiply':
+        return _factors(expression.operands[0]) + _factors(expression.operands[1])
+    if expression.operation == 'transpose' and expression.operands[0].operation == 'multiply':
+        return [factor.T for factor in reversed(_factors(expression.operands[0]))]
+    return [expression]
+
+def matrix_chain_order(shapes):
+    """
+    Finds the cheapest parenthesization of a chain of matrix products by
+    dynamic programming over the chain's dimensions.
+    Args:
+        shapes (list): (rows, cols) of each factor, in order.
+    Returns:
+        tuple: (split table, scalar multiplications). split[i][j] is the
+        factor after which the product of factors i..j is split.
+    """
+    count = len(shapes)
+    dims = [shapes[0][0]] + [cols for rows, cols in shapes]
+    cost = [[0] * count for _ in range(count)]
+    split = [[0] * count for _ in range(count)]
+    for length in range(2, count + 1):
+        for i in range(count - length + 1):
+            j = i + length - 1
+            cost[i][j] = float('inf')
+            for k in range(i, j):
+                candidate = cost[i][k] + cost[k + 1][j] + dims[i] * dims[k + 1] * dims[j + 1]
+                if candidate < cost[i][j]:
+                    cost[i][j], split[i][j] = candidate, k
+    return split, cost[0][count - 1]
+
+def _allocate(shape, dtype, stats):
+    """Allocates an evaluation buffer, counting it in stats."""
+    if stats is not None:
+        stats['allocations'] += 1
+    return np.empty(shape, dtype=dtype)
+
+def _leaves(expression):
+    """Yields the matrices at the leaves of an expression."""
+    if expression.operation == 'leaf':
+        yield expression.operands[0]
+    else:
+        for operand in expression.operands:
+            yield from _leaves(operand)
+
+def _evaluate_chain(factors, split, i, j, out, stats):
+    """Evaluates the product of factors i..j in the order given by the split table."""
+    if i == j:
+        return factors[i]
+    k = split[i][j]
+    left = _evaluate_chain(factors, split, i, k, None, stats)
+    right = _evaluate_chain(factors, split, k + 1, j, None, stats)
+    if out is None:
+        out = _allocate((left.shape[0], right.shape[1]), np.result_type(left, right), stats)
+    return np.matmul(left, right, out=out)
+
+def evaluate(expression, out=None, stats=None):
+    """
+    Evaluates a lazy expression. Leaves and their transposes are used as
+    views; an addition/subtraction chain is accumulated in place in one
+    buffer (out, if given); a product chain is multiplied in the order that
+    needs the fewest scalar multiplications, writing the last product into
+    out. Expressions involving sparse matrices are evaluated step by step
+    with the regular operations.
+    Args:
+        expression (Expression): The expression (a plain matrix is returned as is).
+        out (numpy.ndarray): Optional preallocated result buffer.
+        stats (collections.Counter): Optional counter of buffers allocated ('allocations').
+    Returns:
+        numpy.ndarray: The result (out, if given).
+    """
+    expression = lazy(expression)
+    if any(map(is_sparse, _leaves(expression))):
+        return _evaluate_eagerly(expression, stats)
+    operation = expression.operation
+    if operation == 'leaf':
+        result = expression.operands[0]
+    elif operation == 'transpose':
+        if out is not None:
+            evaluate(expression.operands[0], out.T, stats) # Written through the transposed view of out
+            return out
+        result = evaluate(expression.operands[0], None, stats).T
+    elif operation == 'multiply':
+        factors = [evaluate(factor, None, stats) for factor in _factors(expression)]
+        split, unused = matrix_chain_order([factor.shape for factor in factors])
+        result = _evaluate_chain(factors, split, 0, len(factors) - 1, out, stats)
+    else:
+        terms = _terms(expression)
+        dtype = np.result_type(*_leaves(expression))
+        if out is None:
+            out = _allocate(expression.shape, dtype, stats)
+        # Evaluate the first positive term straight into the buffer when it needs computing
+        first = next((index for index, (sign, term) in enumerate(terms)
+                      if sign > 0 and term.operation not in ('leaf', 'transpose')), 0)
+        sign, term = terms.pop(first)
+        value = evaluate(term, out, stats) if sign > 0 and term.operation not in ('leaf', 'transpose') else evaluate(term, None, stats)
+        if value is not out:
+            np.multiply(value, sign, out=out) if sign < 0 else np.copyto(out, value)
+        for sign, term in terms:
+            (np.add if sign > 0 else np.subtract)(out, evaluate(term, None, stats), out=out)
+        return out
+    if out is not None and result is not out and not np.shares_memory(result, out):
+        np.copyto(out, result)
+        return out
+    return result
+
+def _evaluate_eagerly(expression, stats=None):
+    """
+    Evaluates an expression one operation at a time, in the order written,
+    with the regular operations (each one materializing its result). Used
+    for sparse operands and as the benchmark baseline.
+    """
+    if expression.operation == 'leaf':
+        return expression.operands[0]
+    operands = [_evaluate_eagerly(operand, stats) for operand in expression.operands]
+    if stats is not None and expression.operation != 'transpose':
+        stats['allocations'] += 1
+    function = {'add': add_matrices, 'subtract': subtract_matrices,
+                'multiply': multiply_matrices, 'transpose': transpose_matrix}[expression.operation]
+    return function(*operands)
+
+def parse_expression(text, resolve):
+    """
+    Parses an expression such as "(A + B).T @ C" (or "(A + B).T * C") into a
+    lazy Expression. Only names, parentheses, +, -, @, * and .T are allowed.
+    Args:
+        text (str): The expression.
+        resolve (callable): Maps a name to its matrix.
+    Returns:
+        Expression: The unevaluated expression.
+    """
+    operators = {ast.Add: Expression.__add__, ast.Sub: Expression.__sub__,
+                 ast.MatMult: Expression.__matmul__, ast.Mult: Expression.__matmul__}
+
+    def build(node):
+        if isinstance(node, ast.Name):
+            return lazy(resolve(node.id))
+        if isinstance(node, ast.Attribute) and node.attr == 'T':
+            return build(node.value).T
+        if isinstance(node, ast.BinOp) and type(node.op) in operators:
+            return operators[type(node.op)](build(node.left), build(node.right))
+        raise ValueError(f"Unsupported expression syntax: '{ast.unparse(node)}'.")
+
+    try:
+        tree = ast.parse(text, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression '{text}': {e.msg}.")
+    return build(tree.body)
+
+def benchmark_expressions(size=1000, seed=0):
+    """
+    Compares lazy evaluation against evaluating one operation at a time on
+    long chains: a sum of eight matrices, (A + B)^T * C, and a product chain
+    whose written order is expensive. Reports time, evaluation buffers
+    allocated and peak traced memory.
+    Args:
+        size (int): The larger matrix edge.
+        seed (int): Random seed.
+    """
+    rng = np.random.default_rng(seed)
+    thin = max(1, size // 100)
+    square = [rng.random((size, size)) for _ in range(8)]
+    tall, wide = rng.random((size, thin)), rng.random((thin, size))
+    chains = [
+        ("Sum of 8 matrices", lambda: sum((lazy(m) for m in square[1:]), lazy(square[0]))),
+        ("(A + B)^T * C", lambda: (lazy(square[0]) + square[1]).T @ square[2]),
+        ("X*Y*X*Y*A (tall X, wide Y)", lambda: lazy(tall) @ wide @ tall @ wide @ square[0]),
+    ]
+    print(f"\n--- Lazy Expression Benchmark ({size}x{size}) ---")
+    print(f"{'Expression':<28}{'Mode':<7}{'Time (s)':>10}{'Buffers':>9}{'Peak MB':>9}")
+    for label, build in chains:
+        for mode, run in (("eager", _evaluate_eagerly), ("lazy", evaluate)):
+            stats = collections.Counter()
+            expression = build()
+            tracemalloc.start()
+            start = time.perf_counter()
+            run(expression, stats=stats)
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{label:<28}{mode:<7}{seconds:>10.3f}{stats['allocations']:>9}{peak / 1e6:>9.1f}")
+
+def _release_pages(array):
+    """
+    Drops the resident pages of a memory-mapped array from this process, so
+    tiles that were read do not pile up in its RSS. The data stays in (or is
+    written back through) the OS page cache. No-op for in-memory arrays.
+    """
+    mapping = getattr(array, '_mmap', None)
+    if mapping is not None and hasattr(mmap, 'MADV_DONTNEED'):
+        if array.flags.writeable:
+            array.flush()
+        mapping.madvise(mmap.MADV_DONTNEED)
+
+def choose_tile_size(n, memory_budget, workers=1, itemsize=8, k=None):
+    """
+    Picks the tile edge t for blocked_matmul so that everything resident at
+    once fits in the budget: one A tile (t x t) shared by the workers; per
+    worker a B tile, a product tile and BLAS's packed copies of both
+    operands (4 t x t); the in-memory output row panel and the pages of the
+    B row band and the output band it touches (t x n each); and the pages of
+    the A row band (t x k) mapped in while reading an A tile, whose strided
+    rows make whole pages around each row segment resident.
+    THREAD_WORKSPACE per worker is set aside first.
+    Args:
+        n (int): Number of columns of the result.
+        memory_budget (int): Budget in bytes.
+        workers (int): Number of threads.
+        itemsize (int): Bytes per element.
+        k (int): Number of columns of A (default: n).
+    Returns:
+        int: The tile edge (a multiple of 64 when larger than 64).
+    Raises:
+        ValueError: If the budget cannot hold even 1 x 1 tiles.
+    """
+    k = n if k is None else k
+    elements = (memory_budget - workers * THREAD_WORKSPACE) / itemsize
+    square = 1 + 4 * workers
+    band = 3 * n + k
+    if elements < square + band: # Including a budget below the workspace alone, which would make the root NaN
+        minimum = workers * THREAD_WORKSPACE + (square + band) * itemsize
+        raise ValueError(f"A memory budget of {memory_budget} bytes is too small for {workers} thread(s) and a result "
+                         f"with {n} columns; at least {minimum} bytes ({minimum / (1 << 20):.2f} MB) are needed.")
+    # Largest t with square * t^2 + band * t <= elements
+    tile = max(1, int((-band + np.sqrt(band * band + 4 * square * elements)) / (2 * square))) # 1 fits (see above)
+    return tile - tile % 64 if tile > 64 else tile
+
+def blocked_matmul(matrix_a, matrix_b, out=None, memory_budget=DEFAULT_MEMORY_BUDGET, workers=1):
+    """
+    Multiplies A (m x k) by B (k x n) tile by tile, so the operands and the
+    result can be memory-mapped files larger than RAM. For each band of t
+    rows of A, each A tile is read once and reused against every B tile of
+    the matching band of B (spread over a thread pool when workers > 1),
+    accumulating into an in-memory row panel of the result that is then
+    written out. Pages of memory-mapped operands are released after use, so
+    the resident memory stays within memory_budget.
+    Args:
+        matrix_a (numpy.ndarray): Left operand (may be a numpy.memmap).
+        matrix_b (numpy.ndarray): Right operand (may be a numpy.memmap).
+        out (numpy.ndarray): Optional (m x n) result array (e.g. a writable numpy.memmap).
+        memory_budget (int): Bytes of resident memory to stay within.
+        workers (int): Number of threads multiplying tiles.
+    Returns:
+        numpy.ndarray: The product (out, if given).
+    """
+    m, k = matrix_a.shape
+    if k != matrix_b.shape[0]:
+        raise ValueError("For matrix multiplication (A * B), the number of columns in Matrix A must equal the number of rows in Matrix B.")
+    n = matrix_b.shape[1]
+    dtype = np.result_type(matrix_a.dtype, matrix_b.dtype)
+    if out is None:
+        out = np.empty((m, n), dtype=dtype)
+    tile = choose_tile_size(n, memory_budget, workers, dtype.itemsize, k)
+    column_blocks = [slice(j, min(j + tile, n)) for j in range(0, n, tile)]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i in range(0, m, tile):
+            rows = slice(i, min(i + tile, m))
+            panel = np.zeros((rows.stop - rows.start, n), dtype=dtype)
+            for p in range(0, k, tile):
+                inner = slice(p, min(p + tile, k))
+                a_tile = np.array(matrix_a[rows, inner], dtype=dtype) # Read once, reused for every B tile
+
+                def multiply_tile(columns):
+                    panel[:, columns] += a_tile @ np.asarray(matrix_b[inner, columns], dtype=dtype)
+
+                list(pool.map(multiply_tile, column_blocks))
+                _release_pages(matrix_a)
+                _release_pages(matrix_b)
+            out[rows] = panel
+            _release_pages(out)
+    return out
+
+# Results of the batched operations: values holds one result per item (an
+# (N, ...) array when every result has the same shape, NaN where an item
+# failed; otherwise a list with None for failed items) and errors maps the
+# index of each failed or singular item to the reason.
+BatchResult = collections.namedtuple('BatchResult', ['values', 'errors'])
+
+def _pair_groups(stack_a, stack_b=None):
+    """
+    Splits a batch into groups of items whose operands have the same shapes,
+    so each group can be computed in one vectorized call. A uniform (N, r, c)
+    array is a single group; a list of matrices is grouped by shape. Either
+    operand may also be a single (r, c) matrix, which is broadcast across the
+    other operand's batch.
+    Args:
+        stack_a: An (N, r, c) array, a sequence of matrices, or (with a batch
+            stack_b) a single matrix.
+        stack_b: None, a single matrix, or a batch of the same length.
+    Returns:
+        tuple: (N, list of (indices, A stack or matrix, B stack or matrix or None))
+    """
+    broadcast = stack_b is None or (isinstance(stack_b, np.ndarray) and stack_b.ndim == 2)
+    if not broadcast and isinstance(stack_a, np.ndarray) and stack_a.ndim == 2:
+        count, groups = _pair_groups(stack_b)
+        return count, [(indices, stack_a, group_b) for indices, group_b, _ in groups]
+    if isinstance(stack_a, np.ndarray) and stack_a.ndim == 3 and (
+            broadcast or (isinstance(stack_b, np.ndarray) and stack_b.ndim == 3)):
+        if not broadcast and len(stack_b) != len(stack_a):
+            raise ValueError(f"Batches have different lengths ({len(stack_a)} and {len(stack_b)}).")
+        return len(stack_a), [(np.arange(len(stack_a)), stack_a, stack_b)]
+
+    items_a = [np.asarray(matrix) for matrix in stack_a]
+    items_b = None if broadcast else [np.asarray(matrix) for matrix in stack_b]
+    if items_b is not None and len(items_b) != len(items_a):
+        raise ValueError(f"Batches have different lengths ({len(items_a)} and {len(items_b)}).")
+    groups = collections.defaultdict(list)
+    for index, matrix in enumerate(items_a):
+        groups[(matrix.shape, None if broadcast else items_b[index].shape)].append(index)
+    result = []
+    for indices in groups.values():
+        group_a = np.stack([items_a[index] for index in indices])
+        group_b = stack_b if broadcast else np.stack([items_b[index] for index in indices])
+        result.append((np.array(indices), group_a, group_b))
+    return len(items_a), result
+
+def _collect_batch(count, parts, errors):
+    """
+    Assembles per-group results into a BatchResult.
+    Args:
+        count (int): Number of items in the batch.
+        parts (list): (indices, values) per successful group.
+        errors (dict): index -> message for failed or singular items.
+    """
+    if len(parts) == 1 and len(parts[0][0]) == count:
+        return BatchResult(parts[0][1], errors) # One group covering the batch, already in order
+    shapes = {values.shape[1:] for indices, values in parts}
+    if len(shapes) <= 1:
+        shape = shapes.pop() if shapes else ()
+        dtype = np.result_type(*[values.dtype for indices, values in parts], np.float64)
+        out = np.full((count,) + shape, np.nan, dtype=dtype)
+        for indices, values in parts:
+            out[indices] = values
+        return BatchResult(out, errors)
+    out = [None] * count
+    for indices, values in parts:
+        for index, value in zip(indices, values):
+            out[index] = value
+    return BatchResult(out, errors)
+
+def _batch_binary(stack_a, stack_b, compatible, compute, message):
+    """Runs a binary batched operation group by group, reporting incompatible items."""
+    count, groups = _pair_groups(stack_a, stack_b)
+    parts, errors = [], {}
+    for indices, group_a, group_b in groups:
+        if compatible(group_a.shape[-2:], group_b.shape[-2:]):
+            parts.append((indices, compute(group_a, group_b)))
+        else:
+            errors.update((int(index), message) for index in indices)
+    return _collect_batch(count, parts, errors)
+
+def batch_add(stack_a, stack_b):
+    """
+    Adds two batches of matrices item by item (or one matrix to every item
+    of the other batch), vectorized across items of the same shape.
+    Args:
+        stack_a: An (N, r, c) array, a sequence of matrices, or a single (r, c) matrix.
+        stack_b: A batch of the same length, or a single (r, c) matrix.
+    Returns:
+        BatchResult: The sums; shape-mismatched items are reported in errors.
+    """
+    return _batch_binary(stack_a, stack_b, lambda a, b: a == b, np.add,
+                         "Matrices must have the same dimensions for addition.")
+
+def batch_subtract(stack_a, stack_b):
+    """
+    Subtracts two batches of matrices item by item (or one matrix from every
+    item of stack_a, or every item of stack_b from one matrix), vectorized
+    across items of the same shape.
+    Args:
+        stack_a: An (N, r, c) array, a sequence of matrices, or a single (r, c) matrix.
+        stack_b: A batch of the same length, or a single (r, c) matrix.
+    Returns:
+        BatchResult: The differences; shape-mismatched items are reported in errors.
+    """
+    return _batch_binary(stack_a, stack_b, lambda a, b: a == b, np.subtract,
+                         "Matrices must have the same dimensions for subtraction.")
+
+def batch_multiply(stack_a, stack_b):
+    """
+    Multiplies two batches of matrices item by item (or every item of one
+    batch by a single matrix) with a single batched np.matmul per shape group.
+    Args:
+        stack_a: An (N, r, k) array, a sequence of matrices, or a single (r, k) matrix.
+        stack_b: A batch of the same length, or a single (k, c) matrix.
+    Returns:
+        BatchResult: The products; items whose inner dimensions differ are reported in errors.
+    """
+    return _batch_binary(stack_a, stack_b, lambda a, b: a[1] == b[0], np.matmul,
+                         "For matrix multiplication (A * B), the number of columns in Matrix A must equal the number of rows in Matrix B.")
+
+def batch_transpose(stack_a):
+    """
+    Transposes every matrix in a batch.
+    Args:
+        stack_a: An (N, r, c) array or a sequence of matrices.
+    Returns:
+        BatchResult: The transposes (views of stack_a when it is a uniform array).
+    """
+    count, groups = _pair_groups(stack_a)
+    return _collect_batch(count, [(indices, np.swapaxes(group, 1, 2)) for indices, group, unused in groups], {})
+
+def batch_slogdet(stack_a):
+    """
+    Computes the sign and log of the absolute determinant of every matrix
+    in a batch (one LU factorization per item, vectorized per shape group),
+    which does not overflow for large determinants.
+    Args:
+        stack_a: An (N, n, n) array or a sequence of square matrices.
+    Returns:
+        tuple: (BatchResult of signs, BatchResult of log|det|). Non-square
+        items are NaN in both and reported in errors, as are singular items
+        (sign 0, log|det| -inf).
+    """
+    count, groups = _pair_groups(stack_a)
+    signs, logdets, errors = [], [], {}
+    for indices, group, unused in groups:
+        if group.shape[1] != group.shape[2]:
+            errors.update((int(index), "Determinant can only be calculated for square matrices.") for index in indices)
+            continue
+        sign, logdet = np.linalg.slogdet(group)
+        signs.append((indices, sign))
+        logdets.append((indices, logdet))
+        errors.update((int(index), "Matrix is singular.") for index in indices[sign == 0])
+    return _collect_batch(count, signs, errors), _collect_batch(count, logdets, errors)
+
+def batch_determinant(stack_a):
+    """
+    Computes the determinant of every matrix in a batch.
+    Args:
+        stack_a: An (N, n, n) array or a sequence of square matrices.
+    Returns:
+        BatchResult: The determinants; non-square items are NaN and
+        reported in errors, singular items are 0 and reported in errors.
+    """
+    signs, logdets = batch_slogdet(stack_a)
+    return BatchResult(signs.values * np.exp(logdets.values), signs.errors)
+
+def _loop_operation(function, stack_a, stack_b=None):
+    """Applies a single-matrix operation item by item (the benchmark baseline)."""
+    if stack_b is None:
+        return [function(matrix) for matrix in stack_a]
+    return [function(matrix_a, matrix_b) for matrix_a, matrix_b in zip(stack_a, stack_b)]
+
+def benchmark_batch(count=100_000, sizes=(3, 8, 16, 64), seed=0):
+    """
+    Compares the throughput of the batched operations against a Python loop
+    over the single-matrix functions, on random (N, n, n) stacks.
+    Args:
+        count (int): Matrices per batch (reduced for large sizes to about 64 MB per stack).
+        sizes (tuple): Matrix edges to try.
+        seed (int): Random seed.
+    """
+    rng = np.random.default_rng(seed)
+    cases = [
+        ('add', add_matrices, batch_add, 2),
+        ('multiply', multiply_matrices, batch_multiply, 2),
+        ('det', determinant, batch_determinant, 1),
+    ]
+    print(f"\n--- Batched Operations Benchmark ---")
+    print(f"{'Operation':<10}{'Size':>6}{'Items':>9}{'Loop items/s':>16}{'Batch items/s':>16}{'Speedup':>10}")
+    for size in sizes:
+        items = max(1, min(count, (8 << 20) // (size * size)))
+        stack_a = rng.random((items, size, size))
+        stack_b = rng.random((items, size, size))
+        for name, single, batched, arity in cases:
+            operands = (stack_a, stack_b)[:arity]
+            start = time.perf_counter()
+            _loop_operation(single, *operands)
+            loop_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            batched(*operands)
+            batch_seconds = time.perf_counter() - start
+            print(f"{name:<10}{size:>6}{items:>9}{items / loop_seconds:>16,.0f}{items / batch_seconds:>16,.0f}"
+                  f"{loop_seconds / batch_seconds:>9.1f}x")
+
+def _best_time(function, repeats=3):
+    """Returns the fastest of a few timed calls of function, in seconds."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def benchmark_sparse(size=2000, densities=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5), seed=0):
+    """
+    Compares dense and CSR representations of random size x size matrices
+    across densities: memory, addition and multiplication time, and the
+    determinant (dense LU against sparse LU), showing where each one wins.
+    Args:
+        size (int): Matrix edge.
+        densities (tuple): Nonzero fractions to try.
+        seed (int): Random seed.
+    """
+    import scipy.sparse as sparse
+
+    rng = np.random.default_rng(seed)
+    print(f"\n--- Sparse vs Dense Benchmark: {size}x{size} ---")
+    print(f"{'Density':>8}{'Dense MB':>10}{'CSR MB':>8}{'Add dense/CSR (ms)':>22}"
+          f"{'Multiply dense/CSR (ms)':>26}{'Det dense/CSR (ms)':>22}")
+    for density in densities:
+        sparse_a = sparse.random_array((size, size), density=density, format='csr', rng=rng)
+        sparse_b = sparse.random_array((size, size), density=density, format='csr', rng=rng)
+        sparse_a = sparse_a + sparse.eye_array(size, format='csr') # Keep det(A) away from zero
+        dense_a, dense_b = sparse_a.toarray(), sparse_b.toarray()
+        csr_bytes = sparse_a.data.nbytes + sparse_a.indices.nbytes + sparse_a.indptr.nbytes
+        timings = [
+            (_best_time(lambda: dense_a + dense_b), _best_time(lambda: sparse_a + sparse_b)),
+            (_best_time(lambda: dense_a @ dense_b, 1), _best_time(lambda: sparse_a @ sparse_b, 1)),
+        ]
+        with np.errstate(over='ignore'): # Only the timing matters; large determinants overflow to inf
+            timings.append((_best_time(lambda: np.linalg.det(dense_a), 1),
+                            _best_time(lambda: sparse_determinant(sparse_a), 1)))
+        cells = ''.join(f"{f'{d * 1e3:.1f}/{c * 1e3:.1f}' + ('*' if c < d else ' '):>{width}}"
+                        for (d, c), width in zip(timings, (22, 26, 22)))
+        print(f"{density:>8.1%}{dense_a.nbytes / 1e6:>10.1f}{csr_bytes / 1e6:>8.1f}{cells}")
+    print("(* = CSR faster)")
+
+def benchmark_load(rows=100_000, cols=50, seed=0):
+    """
+    Compares load_text_matrix against pandas.read_csv (C engine) on a random
+    rows x cols matrix saved as CSV, as space-separated text, and aligned
+    in columns padded with spaces (which pyarrow cannot read, so numpy
+    parses it).
+    Args:
+        rows (int): Matrix rows.
+        cols (int): Matrix columns.
+        seed (int): Random seed.
+    """
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+    matrix = np.random.default_rng(seed).standard_normal((rows, cols))
+    with tempfile.TemporaryDirectory() as work_dir:
+        cases = [
+            ("CSV", os.path.join(work_dir, 'm.csv'), ',', '%.17g'),
+            ("space-separated", os.path.join(work_dir, 'm.txt'), ' ', '%.17g'),
+            ("aligned columns", os.path.join(work_dir, 'aligned.txt'), ' ', '%25.17g'),
+        ]
+        print(f"\n--- Text Matrix Load Benchmark: {rows}x{cols} ---")
+        print(f"{'Format':<18}{'MB':>8}{'load_text_matrix (s)':>22}{'MB/s':>8}{'pandas.read_csv (s)':>21}")
+        for label, path, delimiter, fmt in cases:
+            np.savetxt(path, matrix, fmt=fmt, delimiter=delimiter)
+            size = os.path.getsize(path)
+            seconds = _best_time(lambda: load_text_matrix(path), 1)
+            if pd is None:
+                reference = "-"
+            else:
+                sep = ',' if delimiter == ',' else r'\s+'
+                reference = f"{_best_time(lambda: pd.read_csv(path, sep=sep, header=None).to_numpy(), 1):.2f}"
+            print(f"{label:<18}{size / 1e6:>8.1f}{seconds:>22.2f}{size / 1e6 / seconds:>8.0f}{reference:>21}")
+
+# Batched counterparts used when a script operand is an (N, r, c) stack
+BATCH_OPERATIONS = {
+    'add': batch_add,
+    'subtract': batch_subtract,
+    'multiply': batch_multiply,
+    'transpose': batch_transpose,
+    'det': batch_determinant,
+}
+
+# Operations available to batch scripts: name -> (number of operands, function, result title)
+OPERATIONS = {
+    'add': (2, add_matrices, "Result of Addition (A + B)"),
+    'subtract': (2, subtract_matrices, "Result of Subtraction (A - B)"),
+    'multiply': (2, multiply_matrices, "Result of Multiplication (A * B)"),
+    'transpose': (1, transpose_matrix, "Result of Transpose (A^T)"),
+    'det': (1, determinant, "Determinant of Matrix A"),
+}
+
+def run_script_line(line, matrices, mmap=False, memory_budget=DEFAULT_MEMORY_BUDGET, workers=1):
+    """
+    Runs one batch script statement. Statements are:
+        load NAME FILE           - load a matrix and name it
+        save NAME FILE           - save a named matrix
+        show NAME                - display a named matrix
+        eval EXPRESSION [-> NAME] - evaluate e.g. (A + B).T * C lazily
+                                   (see Expression); names as for operations
+        OPERATION A [B] [-> NAME] - run add/subtract/multiply/transpose/det;
+                                   operands are names or file paths. The
+                                   result is stored under NAME, or displayed.
+                                   A NAME ending in .npy is also written to
+                                   that file; for multiply it is computed
+                                   out of core straight into the file.
+                                   An (N, r, c) stack operand (from .npy)
+                                   runs the batched operation instead.
+    Args:
+        line (str): The statement (without comments).
+        matrices (dict): Named matrices, updated in place.
+        mmap (bool): Memory-map .npy operands.
+        memory_budget (int): Bytes of memory for out-of-core multiplication.
+        workers (int): Threads for out-of-core multiplication.
+    """
+    tokens = line.split()
+    target = None
+    if '->' in tokens:
+        arrow = tokens.index('->')
+        if arrow != len(tokens) - 2:
+            raise ValueError("'->' must be followed by exactly one result name.")
+        target = tokens[-1]
+        tokens = tokens[:arrow]
+    operation, operands = tokens[0].lower(), tokens[1:]
+
+    def resolve(operand):
+        return matrices[operand] if operand in matrices else load_matrix(operand, mmap)
+
+    if operation == 'load' and len(operands) == 2:
+        matrices[operands[0]] = load_matrix(operands[1], mmap)
+    elif operation == 'save' and len(operands) == 2:
+        save_matrix(resolve(operands[0]), operands[1])
+    elif operation == 'show' and len(operands) == 1:
+        display_matrix(resolve(operands[0]), operands[0])
+    elif operation == 'eval' and operands:
+        text = ' '.join(operands)
+        result = evaluate(parse_expression(text, resolve))
+        if (target or '').endswith('.npy'):
+            save_matrix(result, target)
+        if target is not None:
+            matrices[target] = result
+        else:
+            display_matrix(result, f"Result of {text}")
+    elif operation in OPERATIONS:
+        arity, function, title = OPERATIONS[operation]
+        if len(operands) != arity:
+            raise ValueError(f"'{operation}' takes {arity} operand(s), got {len(operands)}.")
+        arguments = [resolve(operand) for operand in operands]
+        if any(np.ndim(argument) == 3 for argument in arguments):
+            result, errors = BATCH_OPERATIONS[operation](*arguments)
+            for index, message in sorted(errors.items()):
+                print(f"Item {index}: {message}")
+            if (target or '').endswith('.npy'):
+                save_matrix(result, target)
+        elif operation == 'multiply' and (target or '').endswith('.npy') and not any(map(is_sparse, arguments)):
+            if arguments[0].shape[1] != arguments[1].shape[0]:
+                raise ValueError("For matrix multiplication (A * B), the number of columns in Matrix A must equal the number of rows in Matrix B.")
+            out = np.lib.format.open_memmap(target, mode='w+', dtype=np.result_type(*arguments),
+                                            shape=(arguments[0].shape[0], arguments[1].shape[1]))
+            result = blocked_matmul(arguments[0], arguments[1], out, memory_budget, workers)
+        elif (operation == 'multiply' and any(isinstance(argument, np.memmap) for argument in arguments)
+              and not any(map(is_sparse, arguments))):
+            result = blocked_matmul(arguments[0], arguments[1], None, memory_budget, workers)
+        else:
+            result = function(*arguments)
+            if (target or '').endswith('.npy'):
+                save_matrix(result, target)
+        if target is not None:
+            matrices[target] = result
+        elif np.ndim(result) == 0:
+            print(f"\n--- {title} ---")
+            print(f"det(A) = {result:.4f}") # Format to 4 decimal places
+            print("-----------------------------")
+        else:
+            display_matrix(result, title)
+    else:
+        raise ValueError(f"Unknown statement '{tokens[0]}' or wrong number of operands.")
+
+def run_script(lines, mmap=False, memory_budget=DEFAULT_MEMORY_BUDGET, workers=1):
+    """
+    Runs a batch script of matrix operations without prompting. A failing
+    statement is reported and the script carries on with the next one.
+    Args:
+        lines (iterable): The script lines ('#' starts a comment).
+        mmap (bool): Memory-map .npy operands.
+        memory_budget (int): Bytes of memory for out-of-core multiplication.
+        workers (int): Threads for out-of-core multiplication.
+    Returns:
+        int: The number of statements that failed.
+    """
+    matrices = {}
+    failures = 0
+    for line_number, line in enumerate(lines, start=1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        try:
+            run_script_line(line, matrices, mmap, memory_budget, workers)
+        except ImportError as e:
+            print(f"Error on line {line_number} ({line}): sparse files need scipy ({e}).")
+            failures += 1
+        except (ValueError, KeyError, OSError, np.linalg.LinAlgError) as e:
+            print(f"Error on line {line_number} ({line}): {e}")
+            failures += 1
+    return failures
+
+def _peak_rss_bytes():
+    """Returns the peak resident memory of this process in bytes (VmHWM on Linux)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # ru_maxrss is in KiB on Linux
+
+def _write_random_npy(file_path, rows, cols, seed, band=1024):
+    """Writes a random matrix to a .npy file a band of rows at a time."""
+    rng = np.random.default_rng(seed)
+    out = np.lib.format.open_memmap(file_path, mode='w+', dtype=np.float64, shape=(rows, cols))
+    for start in range(0, rows, band):
+        out[start:start + band] = rng.random((min(band, rows - start), cols))
+        _release_pages(out)
+    del out
+
+def _timed_multiply(path_a, path_b, out_path, blocked, memory_budget, workers):
+    """
+    Multiplies two .npy matrices once and reports the cost. Runs in a fresh
+    process so the peak resident memory belongs to this multiplication alone.
+    Returns:
+        tuple: (seconds, baseline RSS bytes before loading, peak RSS bytes)
+    """
+    baseline = _peak_rss_bytes()
+    if blocked:
+        matrix_a = np.load(path_a, mmap_mode='r')
+        matrix_b = np.load(path_b, mmap_mode='r')
+        out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float64,
+                                        shape=(matrix_a.shape[0], matrix_b.shape[1]))
+        start = time.perf_counter()
+        blocked_matmul(matrix_a, matrix_b, out, memory_budget, workers)
+    else:
+        matrix_a = np.load(path_a)
+        matrix_b = np.load(path_b)
+        start = time.perf_counter()
+        np.dot(matrix_a, matrix_b)
+    return time.perf_counter() - start, baseline, _peak_rss_bytes()
+
+def benchmark_matmul(size=4096, memory_budget=64 << 20, workers=(1, os.cpu_count() or 1)):
+    """
+    Compares GFLOP/s and peak RSS of in-memory np.dot against blocked_matmul
+    over memory-mapped operands and output, for size x size matrices.
+    Args:
+        size (int): Matrix edge.
+        memory_budget (int): Memory budget in bytes for the blocked runs.
+        workers (tuple): Thread counts to try for the blocked runs.
+    """
+    flops = 2 * size ** 3
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as work_dir:
+        path_a = os.path.join(work_dir, 'a.npy')
+        path_b = os.path.join(work_dir, 'b.npy')
+        out_path = os.path.join(work_dir, 'c.npy')
+        _write_random_npy(path_a, size, size, seed=1)
+        _write_random_npy(path_b, size, size, seed=2)
+
+        print(f"\n--- Matrix Multiplication Benchmark: {size}x{size}, "
+              f"operands {size * size * 8 / 1e6:.0f} MB each, budget {memory_budget / 1e6:.1f} MB ---")
+        print(f"{'Method':<34}{'Time (s)':>10}{'GFLOP/s':>10}{'Peak RSS above baseline (MB)':>30}")
+        cases = [("np.dot, in memory", False, 1)]
+        cases += [(f"blocked_matmul, memmap, {count} thread(s)", True, count) for count in sorted(set(workers))]
+        for label, blocked, count in cases:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                seconds, baseline, peak = pool.submit(_timed_multiply, path_a, path_b, out_path,
+                                                      blocked, memory_budget, count).result()
+            print(f"{label:<34}{seconds:>10.2f}{flops / seconds / 1e9:>10.2f}{(peak - baseline) / 1e6:>30.1f}")
+
+def parse_args(argv=None):
+    """Parses the command-line options."""
+    parser = argparse.ArgumentParser(
+        description="Matrix Operations Tool. Runs interactively unless a batch script is given.")
+    parser.add_argument('--script',
+                        help="Run the statements in this file ('-' for stdin) without prompts; see run_script_line.")
+    parser.add_argument('--mmap', action='store_true',
+                        help="Memory-map .npy operands instead of reading them into memory.")
+    parser.add_argument('--memory-budget', type=float, default=DEFAULT_MEMORY_BUDGET / (1 << 20),
+                        help="Megabytes of memory out-of-core multiplication may use (default: %(default).0f).")
+    parser.add_argument('--threads', type=int, default=1,
+                        help="Threads multiplying tiles in out-of-core multiplication (default: %(default)s).")
+    parser.add_argument('--benchmark-matmul', type=int, metavar='SIZE',
+                        help="Benchmark blocked multiplication of SIZE x SIZE memory-mapped matrices, then exit.")
+    parser.add_argument('--benchmark-batch', type=int, metavar='COUNT',
+                        help="Benchmark batched operations on stacks of COUNT small matrices, then exit.")
+    parser.add_argument('--benchmark-sparse', type=int, metavar='SIZE',
+                        help="Benchmark sparse against dense SIZE x SIZE matrices across densities, then exit.")
+    parser.add_argument('--benchmark-expressions', type=int, metavar='SIZE',
+                        help="Benchmark lazy against step-by-step evaluation of chained operations, then exit.")
+    parser.add_argument('--benchmark-load', type=int, metavar='ROWS',
+                        help="Benchmark loading a ROWS x 50 matrix from CSV and whitespace-separated text, then exit.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    Main function for the Matrix Operations Tool.
+    Manages user interaction, operation selection, and result display,
+    or runs a batch script when one is given on the command line.
+    """
+    args = parse_args(argv)
+    memory_budget = int(args.memory_budget * (1 << 20))
+    if args.benchmark_matmul:
+        benchmark_matmul(args.benchmark_matmul, memory_budget, (1, args.threads))
+        return
+    if args.benchmark_batch:
+        benchmark_batch(args.benchmark_batch)
+        return
+    if args.benchmark_sparse:
+        benchmark_sparse(args.benchmark_sparse)
+        return
+    if args.benchmark_expressions:
+        benchmark_expressions(args.benchmark_expressions)
+        return
+    if args.benchmark_load:
+        benchmark_load(args.benchmark_load)
+        return
+    if args.script:
+        if args.script == '-':
+            failures = run_script(sys.stdin, args.mmap, memory_budget, args.threads)
+        else:
+            with open(args.script) as script:
+                failures = run_script(script, args.mmap, memory_budget, args.threads)
+        sys.exit(1 if failures else 0)
+
+    print("Welcome to the Matrix Operations Tool!")
+
+    while True:
+        print("\n--- Choose an Operation ---")
+        print("1. Addition (A + B)")
+        print("2. Subtraction (A - B)")
+        print("3. Multiplication (A * B)")
+        print("4. Transpose (A^T)")
+        print("5. Determinant (det(A))")
+        print("6. Exit")
+
+        choice = input("Enter your choice (1-6): ")
+
+        try:
+            if choice == '1':
+                matrix_a = get_matrix_input("Matrix A")
+                matrix_b = get_matrix_input("Matrix B")
+                result = add_matrices(matrix_a, matrix_b)
+                display_matrix(matrix_a, "Matrix A")
+                display_matrix(matrix_b, "Matrix B")
+                display_matrix(result, "Result of Addition (A + B)")
+
+            elif choice == '2':
+                matrix_a = get_matrix_input("Matrix A")
+                matrix_b = get_matrix_input("Matrix B")
+                result = subtract_matrices(matrix_a, matrix_b)
+                display_matrix(matrix_a, "Matrix A")
+                display_matrix(matrix_b, "Matrix B")
+                display_matrix(result, "Result of Subtraction (A - B)")
+
+            elif choice == '3':
+                matrix_a = get_matrix_input("Matrix A")
+                matrix_b = get_matrix_input("Matrix B")
+                result = multiply_matrices(matrix_a, matrix_b)
+                display_matrix(matrix_a, "Matrix A")
+                display_matrix(matrix_b, "Matrix B")
+                display_matrix(result, "Result of Multiplication (A * B)")
+
+            elif choice == '4':
+                matrix_a = get_matrix_input("Matrix A")
+                result = transpose_matrix(matrix_a)
+                display_matrix(matrix_a, "Original Matrix A")
+                display_matrix(result, "Result of Transpose (A^T)")
+
+            elif choice == '5':
+                matrix_a = get_matrix_input("Matrix A")
+                try:
+                    result = determinant(matrix_a)
+                    display_matrix(matrix_a, "Matrix A")
+                    print(f"\n--- Determinant of Matrix A ---")
+                    print(f"det(A) = {result:.4f}") # Format to 4 decimal places
+                    print("-----------------------------")
+                except np.linalg.LinAlgError as e:
+                    print(f"\nError calculating determinant: {e}. This might happen for singular matrices.")
+
+            elif choice == '6':
+                print("Exiting Matrix Operations Tool. Goodbye!")
+                break
+
+            else:
+                print("Invalid choice. Please enter a number between 1 and 6.")
+        except ValueError as e:
+            print(f"\nError: {e}")
+
+        input("\nPress Enter to continue...") # Pause for user to read output
+
+if __name__ == "__main__":
+    main()
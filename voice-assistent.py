@@ -1,257 +1,1880 @@
-import speech_recognition as sr
-import pyttsx3
-import requests
-import datetime
-import time
-import threading
-
-# --- Configuration ---
-# Replace with your actual API keys
-OPENWEATHER_API_KEY = "YOUR_OPENWEATHER_API_KEY" # Get from https://openweathermap.org/api
-NEWSAPI_API_KEY = "YOUR_NEWSAPI_API_KEY"       # Get from https://newsapi.org/
-
-# --- Initialize Speech Recognizer and Text-to-Speech Engine ---
-r = sr.Recognizer()
-engine = pyttsx3.init()
-
-# Configure voice properties (optional)
-voices = engine.getProperty('voices')
-# You can try different voices if available
-# for voice in voices:
-#     print(f"ID: {voice.id}, Name: {voice.name}, Lang: {voice.languages}")
-# engine.setProperty('voice', voices[0].id) # Set a specific voice if desired (e.g., voices[0].id for male, voices[1].id for female)
-engine.setProperty('rate', 180) # Speed of speech
-engine.setProperty('volume', 0.9) # Volume (0.0 to 1.0)
-
-# --- Global Variables for Reminders ---
-reminders = []
-reminder_check_interval = 10 # Check for reminders every 10 seconds
-
-# --- Helper Functions ---
-
-def speak(text):
-    """Converts text to speech and plays it."""
-    print(f"Assistant: {text}")
-    engine.say(text)
-    engine.runAndWait()
-
-def listen_for_command():
-    """
-    Listens for audio input from the microphone and converts it to text.
-    Returns:
-        str: The recognized text, or None if recognition fails.
-    """
-    with sr.Microphone() as source:
-        print("Listening...")
-        r.adjust_for_ambient_noise(source, duration=1) # Adjust for ambient noise
-        try:
-            audio = r.listen(source, timeout=5, phrase_time_limit=5) # Listen for up to 5 seconds
-            print("Recognizing...")
-            command = r.recognize_google(audio).lower() # Using Google Web Speech API
-            print(f"You said: {command}")
-            return command
-        except sr.WaitTimeoutError:
-            print("No speech detected within timeout.")
-            return None
-        except sr.UnknownValueError:
-            print("Could not understand audio. Please try again.")
-            speak("Sorry, I didn't catch that. Could you please repeat?")
-            return None
-        except sr.RequestError as e:
-            print(f"Could not request results from Google Speech Recognition service; {e}")
-            speak("My speech service is currently unavailable. Please check your internet connection.")
-            return None
-
-def get_weather(city):
-    """Fetches current weather information for a given city."""
-    base_url = "http://api.openweathermap.org/data/2.5/weather?"
-    complete_url = f"{base_url}q={city}&appid={OPENWEATHER_API_KEY}&units=metric"
-    try:
-        response = requests.get(complete_url)
-        data = response.json()
-
-        if data["cod"] == 200: # Check if API call was successful
-            main = data["main"]
-            weather_desc = data["weather"][0]["description"]
-            temperature = main["temp"]
-            humidity = main["humidity"]
-
-            speak(f"The weather in {city} is {weather_desc}, with a temperature of {temperature:.1f} degrees Celsius and humidity of {humidity} percent.")
-        else:
-            speak(f"Sorry, I couldn't find weather information for {city}. Please check the city name.")
-    except requests.exceptions.RequestException as e:
-        speak(f"I'm having trouble connecting to the weather service. Please check your internet connection. Error: {e}")
-    except Exception as e:
-        speak(f"An unexpected error occurred while fetching weather. Error: {e}")
-
-def get_news(category="general"):
-    """Fetches top news headlines for a given category."""
-    base_url = "https://newsapi.org/v2/top-headlines?"
-    # You can specify country, e.g., 'us' for United States news
-    params = {
-        "apiKey": NEWSAPI_API_KEY,
-        "category": category,
-        "language": "en",
-        "pageSize": 5 # Get top 5 headlines
-    }
-    try:
-        response = requests.get(base_url, params=params)
-        data = response.json()
-
-        if data["status"] == "ok" and data["articles"]:
-            speak(f"Here are the top {category} headlines:")
-            for i, article in enumerate(data["articles"]):
-                speak(f"Headline {i+1}: {article['title']}")
-                # Optional: Open article in browser
-                # import webbrowser
-                # webbrowser.open(article['url'])
-                time.sleep(1) # Pause between headlines
-        else:
-            speak(f"Sorry, I couldn't find any news for the '{category}' category or there was an issue with the news service.")
-    except requests.exceptions.RequestException as e:
-        speak(f"I'm having trouble connecting to the news service. Please check your internet connection. Error: {e}")
-    except Exception as e:
-        speak(f"An unexpected error occurred while fetching news. Error: {e}")
-
-def set_reminder():
-    """Guides the user to set a reminder."""
-    speak("What should I remind you about?")
-    task = listen_for_command()
-    if not task:
-        return
-
-    speak("And when should I remind you? For example, 'tomorrow at 5 PM' or 'in 10 minutes'.")
-    time_str = listen_for_command()
-    if not time_str:
-        return
-
-    # Simple time parsing (can be improved for more complex inputs)
-    reminder_time = None
-    now = datetime.datetime.now()
-
-    try:
-        if "tomorrow" in time_str:
-            date_part = (now + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
-            time_part_match = re.search(r'at (\d{1,2}(?::\d{2})?\s*(?:am|pm)?)', time_str)
-            if time_part_match:
-                time_part = time_part_match.group(1).replace(' ', '').upper()
-                # Handle 'PM' conversion
-                if 'PM' in time_part and ':' not in time_part:
-                    hour = int(time_part.replace('PM', ''))
-                    if hour < 12: hour += 12
-                    time_part = f"{hour}:00"
-                elif 'AM' in time_part and ':' not in time_part:
-                    hour = int(time_part.replace('AM', ''))
-                    time_part = f"{hour}:00"
-                reminder_time = datetime.datetime.strptime(f"{date_part} {time_part}", '%Y-%m-%d %I:%M%p')
-            else:
-                speak("I couldn't understand the time for tomorrow. Please be more specific.")
-                return
-        elif "in" in time_str and "minutes" in time_str:
-            minutes_match = re.search(r'in (\d+) minutes', time_str)
-            if minutes_match:
-                minutes = int(minutes_match.group(1))
-                reminder_time = now + datetime.timedelta(minutes=minutes)
-            else:
-                speak("I couldn't understand the number of minutes. Please try again.")
-                return
-        elif "at" in time_str: # Try to parse a specific time today
-            time_only_str = time_str.split("at")[-1].strip()
-            # Try various common time formats
-            formats = ["%I %p", "%I:%M %p", "%H:%M"]
-            for fmt in formats:
-                try:
-                    parsed_time = datetime.datetime.strptime(time_only_str, fmt).time()
-                    reminder_time = now.replace(hour=parsed_time.hour, minute=parsed_time.minute, second=0, microsecond=0)
-                    if reminder_time < now: # If time is already past today, set for tomorrow
-                        reminder_time += datetime.timedelta(days=1)
-                    break
-                except ValueError:
-                    continue
-            if not reminder_time:
-                speak("I couldn't understand the time. Please try a format like 'at 5 PM' or 'at 14:30'.")
-                return
-        else:
-            speak("I couldn't understand the time you specified. Please try again with a clear time.")
-            return
-
-    except Exception as e:
-        print(f"Error parsing time: {e}")
-        speak("I had trouble understanding the time you provided. Please try again.")
-        return
-
-    if reminder_time:
-        reminders.append({"task": task, "time": reminder_time, "set_time": now})
-        speak(f"Okay, I'll remind you to {task} on {reminder_time.strftime('%B %d at %I:%M %p')}.")
-    else:
-        speak("I couldn't set the reminder. Please provide a clearer time.")
-
-def check_reminders():
-    """Checks and announces active reminders."""
-    global reminders
-    while True:
-        now = datetime.datetime.now()
-        reminders_to_remove = []
-        for i, reminder in enumerate(reminders):
-            if now >= reminder["time"]:
-                speak(f"Reminder: It's time to {reminder['task']}!")
-                reminders_to_remove.append(i)
-        
-        # Remove announced reminders in reverse order to avoid index issues
-        for index in sorted(reminders_to_remove, reverse=True):
-            del reminders[index]
-        
-        time.sleep(reminder_check_interval)
-
-# Start reminder checking in a separate thread
-reminder_thread = threading.Thread(target=check_reminders, daemon=True)
-reminder_thread.start()
-
-# --- Main Assistant Loop ---
-def start_assistant():
-    """Main loop for the personal assistant."""
-    speak("Hello! I am your personal assistant. How can I help you today?")
-    import re # Import regex here to avoid circular dependency if not used before
-
-    while True:
-        command = listen_for_command()
-
-        if command:
-            if "hello" in command or "hi assistant" in command:
-                speak("Hello there! How can I assist you?")
-            elif "what is your name" in command:
-                speak("I am your personal assistant, designed to help you.")
-            elif "set a reminder" in command or "remind me" in command:
-                set_reminder()
-            elif "check weather" in command or "what's the weather" in command:
-                speak("Which city would you like the weather for?")
-                city = listen_for_command()
-                if city:
-                    get_weather(city)
-                else:
-                    speak("I didn't hear a city name. Please try again.")
-            elif "read news" in command or "tell me the news" in command:
-                speak("What kind of news are you interested in? For example, 'technology', 'sports', or 'general'.")
-                category = listen_for_command()
-                if category:
-                    get_news(category)
-                else:
-                    get_news("general") # Default to general news
-            elif "stop" in command or "exit" in command or "goodbye" in command:
-                speak("Goodbye! Have a great day!")
-                break
-            else:
-                speak("I'm sorry, I don't understand that command yet. Please try saying 'set a reminder', 'check weather', or 'read news'.")
-
-if __name__ == "__main__":
-    # Ensure API keys are set before running
-    if OPENWEATHER_API_KEY == "YOUR_OPENWEATHER_API_KEY" or NEWSAPI_API_KEY == "YOUR_NEWSAPI_API_KEY":
-        print("\n--- IMPORTANT ---")
-        print("Please replace 'YOUR_OPENWEATHER_API_KEY' and 'YOUR_NEWSAPI_API_KEY' with your actual API keys.")
-        print("You can get them from: https://openweathermap.org/api and https://newsapi.org/")
-        print("The assistant will not function correctly without valid API keys.")
-        print("-----------------\n")
-        # Optionally, you can exit here or proceed with limited functionality
-        # exit()
-
-    start_assistant()
+import speech_recognition as sr
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import argparse
+import asyncio
+import collections
+import datetime
+import hashlib
+import heapq
+import http.server
+import io
+import itertools
+import json
+import os
+import re
+import tempfile
+import time
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configuration ---
+# Replace with your actual API keys
+OPENWEATHER_API_KEY = "YOUR_OPENWEATHER_API_KEY" # Get from https://openweathermap.org/api
+NEWSAPI_API_KEY = "YOUR_NEWSAPI_API_KEY"       # Get from https://newsapi.org/
+WEATHER_URL = "http://api.openweathermap.org/data/2.5/weather"
+NEWS_URL = "https://newsapi.org/v2/top-headlines"
+
+# HTTP lookups share one pooled session (see get_session) and a response cache
+HTTP_TIMEOUT = (3.05, 10) # Seconds to connect, seconds to wait for the response
+HTTP_RETRIES = 3 # Retries for connection errors and 429/5xx responses
+HTTP_BACKOFF = 0.5 # Retry delays grow as 0.5 s, 1 s, 2 s, ...
+WEATHER_TTL = 600 # Weather changes about every 10 minutes
+NEWS_TTL = 1800 # Headlines change less often
+LOOKUP_CACHE_SIZE = 128 # Cached lookups kept (least recently used are evicted)
+LOOKUP_CACHE_FILE = None # e.g. "lookup_cache.json" to keep cached lookups across restarts
+
+# --- Text-to-Speech ---
+TTS_RATE = 180 # Speed of speech
+TTS_VOLUME = 0.9 # Volume (0.0 to 1.0)
+TTS_VOICE = None # A voice id (e.g. voices[0].id for male, voices[1].id for female), or None for the default
+TTS_CACHE_DIR = "tts_cache" # Rendered fixed prompts are kept here across restarts (None to disable)
+TTS_CACHE_SIZE = 64 # Rendered phrases kept in memory (least recently used are evicted)
+STATIC_PHRASES = [ # Fixed prompts, rendered in the background at startup
+    "Hello! I am your personal assistant. How can I help you today?",
+    "Hello there! How can I assist you?",
+    "I am your personal assistant, designed to help you.",
+    "Which city would you like the weather for?",
+    "I didn't hear a city name. Please try again.",
+    "What kind of news are you interested in? For example, 'technology', 'sports', or 'general'.",
+    "What should I remind you about?",
+    "And when should I remind you? For example, 'tomorrow at 5 PM', 'in 10 minutes' or 'every day at 8 AM'.",
+    "Which reminder should I cancel?",
+    "Sorry, I didn't catch that. Could you please repeat?",
+    "My speech service is currently unavailable. Please check your internet connection.",
+    "I'm sorry, I don't understand that command yet. Please try saying 'set a reminder', 'check weather', or 'read news'.",
+    "Goodbye! Have a great day!",
+]
+
+# --- Speech Recognition ---
+RECOGNIZER_BACKEND = "google" # "google" (online) or "vosk" (offline: pip install vosk, plus a model)
+VOSK_MODEL_PATH = "vosk-model-small-en-us-0.15" # Unpacked model from https://alphacephei.com/vosk/models
+AUDIO_CHUNK_SECONDS = 0.1 # Chunk length when streaming WAV fixtures in benchmark_recognizers
+
+# --- Conversation ---
+ANSWER_TIMEOUT = 10 # Seconds to wait for the answer to a question
+NEWS_HEADLINE_PAUSE = 1 # Seconds of silence after each headline
+SIMULATED_UTTERANCES = ["hello", "check weather", "London", "read news", "technology",
+                        "what is your name", "goodbye"] # Scripted user for --simulate
+
+# --- Reminders ---
+REMINDERS_FILE = "reminders.json" # Pending reminders are kept here across restarts (None to disable)
+
+# --- HTTP Session and Lookup Cache ---
+
+_session = None
+_session_lock = threading.Lock()
+
+def create_session(retries=HTTP_RETRIES, backoff=HTTP_BACKOFF, pool_size=10):
+    """
+    Creates a requests session whose connections are kept alive and reused,
+    retrying connection errors and 429/5xx responses with exponential backoff.
+    Args:
+        retries (int): Number of retries per request.
+        backoff (float): Backoff factor in seconds.
+        pool_size (int): Connections kept per host.
+    Returns:
+        requests.Session: The session.
+    """
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(["GET"]), raise_on_status=False)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_session():
+    """Returns the shared HTTP session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+class _Flight:
+    """An upstream call in progress, shared by every caller asking for the same key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class LookupCache:
+    """
+    A thread-safe cache of lookup results with a time-to-live per entry and
+    least-recently-used eviction, optionally persisted to a JSON file.
+    get_or_fetch coalesces concurrent misses for the same key into a single
+    upstream call whose result (or error) every waiting caller receives.
+    """
+
+    def __init__(self, max_entries=LOOKUP_CACHE_SIZE, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = collections.OrderedDict() # key -> (expiry as time.time(), value)
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    def get(self, key):
+        """Returns the cached value for key, or None if it is missing or expired."""
+        with self.lock:
+            return self._get(key)
+
+    def _get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value, ttl):
+        """Caches value under key for ttl seconds."""
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        if self.path:
+            self.save()
+
+    def get_or_fetch(self, key, ttl, fetch, cacheable=lambda value: True):
+        """
+        Returns the cached value for key, or calls fetch() to get it. While
+        one caller is fetching a key, other callers for the same key wait for
+        that result instead of making their own upstream call.
+        Args:
+            key (str): The cache key.
+            ttl (float): Seconds a fetched value stays fresh.
+            fetch (callable): Makes the upstream call.
+            cacheable (callable): Whether a fetched value should be cached.
+        Returns:
+            The value (an error raised by fetch is raised to every waiting caller).
+        """
+        with self.lock:
+            value = self._get(key)
+            if value is not None:
+                return value
+            flight = self.in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.in_flight[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fetch()
+            if cacheable(flight.value):
+                self.put(key, flight.value, ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            flight.done.set()
+
+    def clear(self):
+        """Drops every cached entry."""
+        with self.lock:
+            self.entries.clear()
+
+    def load(self):
+        """Loads the unexpired entries saved in the cache file."""
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read the lookup cache '{self.path}' ({e}); starting empty.")
+            return
+        now = time.time()
+        with self.lock:
+            for key, expiry, value in saved:
+                if expiry > now:
+                    self.entries[key] = (expiry, value)
+
+    def save(self):
+        """Writes the cache to its file (atomically, via a temporary file)."""
+        with self.lock:
+            saved = [[key, expiry, value] for key, (expiry, value) in self.entries.items()]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', dir=directory, delete=False, suffix='.tmp') as f:
+            json.dump(saved, f)
+        os.replace(f.name, self.path)
+
+lookup_cache = LookupCache(path=LOOKUP_CACHE_FILE)
+
+def fetch_json(url, params):
+    """Makes a GET request on the shared session and returns the decoded JSON body."""
+    response = get_session().get(url, params=params, timeout=HTTP_TIMEOUT)
+    return response.json()
+
+def fetch_weather(city):
+    """
+    Returns the OpenWeather current-weather response for a city, served from
+    the lookup cache for WEATHER_TTL seconds.
+    """
+    city = city.strip().lower()
+    params = {"q": city, "appid": OPENWEATHER_API_KEY, "units": "metric"}
+    return lookup_cache.get_or_fetch(f"weather:{city}", WEATHER_TTL, lambda: fetch_json(WEATHER_URL, params),
+                                     cacheable=lambda data: data.get("cod") == 200)
+
+def fetch_news(category="general"):
+    """
+    Returns the NewsAPI top-headlines response for a category, served from
+    the lookup cache for NEWS_TTL seconds.
+    """
+    category = category.strip().lower()
+    # You can specify country, e.g., 'us' for United States news
+    params = {
+        "apiKey": NEWSAPI_API_KEY,
+        "category": category,
+        "language": "en",
+        "pageSize": 5 # Get top 5 headlines
+    }
+    return lookup_cache.get_or_fetch(f"news:{category}", NEWS_TTL, lambda: fetch_json(NEWS_URL, params),
+                                     cacheable=lambda data: data.get("status") == "ok")
+
+# --- Helper Functions ---
+
+class ReminderTimeError(ValueError):
+    """A reminder time that could not be understood; the message is spoken to the user."""
+
+# One compiled pattern for every supported time expression, shared by the
+# reminder dialog and by one-shot commands ("remind me to stretch in 10 minutes")
+TIME_EXPRESSION = re.compile(r"""
+    (?P<every>\bevery\s+(?P<interval>\d+)\s+minutes?)
+  | \bin\s+(?P<amount>\d+)\s+(?P<unit>minutes?|hours?)
+  | (?:\b(?:every\s+day|daily)\s+)?(?:\b(?P<day>today|tomorrow)\s+)?
+    \bat\s+(?P<hour>\d{1,2})(?:[:.](?P<minute>\d{2}))?(?:\s*(?P<meridiem>[ap])\.?\s*m\b\.?)?
+    (?:\s+(?P<day_after>today|tomorrow)\b)? # "at 5 pm tomorrow"
+""", re.VERBOSE)
+
+def parse_reminder_time(time_str, now):
+    """
+    Works out when a spoken reminder time falls.
+    Args:
+        time_str (str): e.g. 'tomorrow at 5 pm', 'at 5 pm tomorrow', 'in 10 minutes', 'every day at 8 am'.
+        now (datetime.datetime): The current time.
+    Returns:
+        tuple: (reminder time, repeat interval or None)
+    Raises:
+        ReminderTimeError: If the time cannot be understood, or is already past on a day said to be today.
+    """
+    match = TIME_EXPRESSION.search(time_str)
+    if match is None:
+        if "tomorrow" in time_str:
+            raise ReminderTimeError("I couldn't understand the time for tomorrow. Please be more specific.")
+        if "minutes" in time_str:
+            raise ReminderTimeError("I couldn't understand the number of minutes. Please try again.")
+        if "at" in time_str.split():
+            raise ReminderTimeError("I couldn't understand the time. Please try a format like 'at 5 PM' or 'at 14:30'.")
+        raise ReminderTimeError("I couldn't understand the time you specified. Please try again with a clear time.")
+
+    if match.group("every"):
+        repeat = datetime.timedelta(minutes=int(match.group("interval")))
+        return now + repeat, repeat
+    if match.group("amount"):
+        amount = int(match.group("amount"))
+        unit = "hours" if match.group("unit").startswith("hour") else "minutes"
+        return now + datetime.timedelta(**{unit: amount}), None
+
+    hour, minute = int(match.group("hour")), int(match.group("minute") or 0)
+    meridiem = match.group("meridiem")
+    if meridiem == "p" and hour < 12:
+        hour += 12
+    elif meridiem == "a" and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59 or (meridiem and int(match.group("hour")) > 12):
+        raise ReminderTimeError("I couldn't understand the time. Please try a format like 'at 5 PM' or 'at 14:30'.")
+    reminder_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    day = match.group("day") or match.group("day_after")
+    if day == "tomorrow":
+        reminder_time += datetime.timedelta(days=1)
+    elif day == "today" and reminder_time < now:
+        raise ReminderTimeError("That time has already passed today. Please choose a later time, or say tomorrow.")
+    elif reminder_time < now: # If time is already past today, set for tomorrow
+        reminder_time += datetime.timedelta(days=1)
+    repeat = datetime.timedelta(days=1) if "every day" in time_str or "daily" in time_str else None
+    return reminder_time, repeat
+
+def _describe_interval(interval):
+    """Describes a repeat interval in words, e.g. 'day' or '15 minutes'."""
+    minutes = int(interval.total_seconds() // 60)
+    if minutes == 24 * 60:
+        return "day"
+    return f"{minutes} minutes" if minutes != 1 else "minute"
+
+def describe_reminder(task, reminder_time, repeat):
+    """Returns the sentence confirming a new reminder."""
+    if repeat:
+        return f"Okay, I'll remind you to {task} every {_describe_interval(repeat)}, starting {reminder_time.strftime('%B %d at %I:%M %p')}."
+    return f"Okay, I'll remind you to {task} on {reminder_time.strftime('%B %d at %I:%M %p')}."
+
+def describe_weather(city, data):
+    """Returns the sentence reporting a weather lookup."""
+    if data["cod"] == 200: # Check if API call was successful
+        main = data["main"]
+        weather_desc = data["weather"][0]["description"]
+        temperature = main["temp"]
+        humidity = main["humidity"]
+        return f"The weather in {city} is {weather_desc}, with a temperature of {temperature:.1f} degrees Celsius and humidity of {humidity} percent."
+    return f"Sorry, I couldn't find weather information for {city}. Please check the city name."
+
+def describe_news(category, data):
+    """Returns the sentences reading out a news lookup."""
+    if data["status"] == "ok" and data["articles"]:
+        lines = [f"Here are the top {category} headlines:"]
+        lines += [f"Headline {i+1}: {article['title']}" for i, article in enumerate(data["articles"])]
+        return lines
+    return [f"Sorry, I couldn't find any news for the '{category}' category or there was an issue with the news service."]
+
+def announce_reminder(reminder):
+    """
+    Announces a reminder that has come due. Prints it; a running Assistant
+    replaces this with one that speaks through its output queue.
+    """
+    print(f"Reminder: It's time to {reminder['task']}!")
+
+# --- Command Routing ---
+
+WORD = re.compile(r"[a-z0-9']+")
+
+class KeywordAutomaton:
+    """
+    An Aho-Corasick automaton over words: finds every registered keyword
+    phrase in a command in one left-to-right pass over its words, however
+    many phrases there are.
+    """
+
+    def __init__(self, phrases):
+        self.goto = [{}] # node -> {word: node}
+        self.fail = [0]
+        self.output = [[]] # node -> ids of the phrases ending there
+        for phrase_id, phrase in enumerate(phrases):
+            node = 0
+            for word in WORD.findall(phrase.lower()):
+                if word not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][word] = len(self.goto) - 1
+                node = self.goto[node][word]
+            self.output[node].append(phrase_id)
+
+        # Breadth-first: each node fails over to the longest proper suffix that is also a path
+        queue = collections.deque(self.goto[0].values()) # Depth-one nodes fail over to the root
+        while queue:
+            node = queue.popleft()
+            for word, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(word, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, words):
+        """Returns the ids of the phrases occurring in a list of words."""
+        found = set()
+        node = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for word in words:
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+Intent = collections.namedtuple('Intent', ['name', 'triggers', 'handler', 'slots', 'order'])
+
+class CommandRouter:
+    """
+    A registry of intents, matched by keyword phrases. Each trigger is a
+    phrase, or a tuple of phrases that must all occur; when several intents
+    match, the one registered first wins. All phrases share one
+    KeywordAutomaton, so matching costs the same however many intents are
+    registered. An intent's optional slot extractor (a regex with named
+    groups, or a function of the command returning a dict) pulls values
+    such as a city or a time out of the command.
+    """
+
+    def __init__(self):
+        self.intents = []
+        self.automaton = None
+
+    def register(self, name, triggers, handler=None, slots=None):
+        """
+        Adds an intent.
+        Args:
+            name (str): The intent name.
+            triggers (list): Phrases, or tuples of phrases that must all occur.
+            handler (str): Name of the Assistant method that carries it out.
+            slots (str or callable): Optional regex with named groups for slot
+                values, or a function taking the (lowercase) command and returning them.
+        """
+        triggers = [trigger if isinstance(trigger, tuple) else (trigger,) for trigger in triggers]
+        if isinstance(slots, str):
+            slots = _regex_slots(re.compile(slots))
+        self.intents.append(Intent(name, triggers, handler, slots, len(self.intents)))
+        self.automaton = None # Rebuilt on the next match
+
+    def _compile(self):
+        phrase_ids = {}
+        self.candidates = collections.defaultdict(list) # phrase id -> (intent, trigger phrase ids)
+        for intent in self.intents:
+            for trigger in intent.triggers:
+                ids = tuple(phrase_ids.setdefault(phrase, len(phrase_ids)) for phrase in trigger)
+                for phrase_id in ids:
+                    self.candidates[phrase_id].append((intent, ids))
+        phrases = sorted(phrase_ids, key=phrase_ids.get)
+        self.automaton = KeywordAutomaton(phrases)
+
+    def match(self, command):
+        """
+        Finds the intent of a command.
+        Returns:
+            tuple: (Intent, {slot: value}), or (None, {}) if nothing matches.
+        """
+        if self.automaton is None:
+            self._compile()
+        command = command.lower()
+        found = self.automaton.find(WORD.findall(command))
+        best = None
+        for phrase_id in found:
+            for intent, ids in self.candidates[phrase_id]:
+                if (best is None or intent.order < best.order) and all(i in found for i in ids):
+                    best = intent
+        if best is None:
+            return None, {}
+        return best, best.slots(command) if best.slots is not None else {}
+
+def _regex_slots(pattern):
+    """Returns a slot extractor giving the non-empty named groups of pattern's first match."""
+    def extract(command):
+        slot_match = pattern.search(command)
+        if slot_match is None:
+            return {}
+        return {name: value.strip() for name, value in slot_match.groupdict().items() if value}
+    return extract
+
+REMINDER_REQUEST = re.compile(r"remind me to (?P<rest>.+)")
+
+def reminder_slots(command):
+    """
+    Splits "remind me to <task> <time>" into task and when slots, finding
+    the time with the same TIME_EXPRESSION that parse_reminder_time uses,
+    so "check in with bob at 5 pm" keeps "check in with bob" as the task.
+    """
+    request = REMINDER_REQUEST.search(command)
+    if request is None:
+        return {}
+    rest = request.group("rest").strip()
+    when = TIME_EXPRESSION.search(rest)
+    if when is None:
+        return {"task": rest}
+    slots = {"when": rest[when.start():].strip()}
+    task = rest[:when.start()].strip()
+    if task:
+        slots["task"] = task
+    return slots
+
+NEWS_CATEGORIES = "business|entertainment|general|health|science|sports|technology"
+
+command_router = CommandRouter()
+command_router.register("greeting", ["hello", "hi assistant"], "greet")
+command_router.register("name", ["what is your name"], "tell_name")
+command_router.register("cancel_reminder", [("cancel", "reminder")], "cancel_reminder")
+command_router.register("set_reminder", ["set a reminder", "remind me"], "set_reminder",
+                        slots=reminder_slots)
+command_router.register("weather", ["check weather", "what's the weather", ("weather", "in")], "check_weather",
+                        slots=r"weather (?:in|for) (?P<city>[a-z .'-]+?)(?:\s+(?:today|now|please))?$")
+command_router.register("news", ["read news", "tell me the news", ("read", "news")], "news",
+                        slots=rf"\b(?P<category>{NEWS_CATEGORIES})\b")
+command_router.register("stop", ["stop", "exit", "goodbye"], "stop")
+
+def _match_linearly(intents, command):
+    """The old dispatch: substring checks for each intent in turn (the benchmark baseline)."""
+    for intent in intents:
+        for trigger in intent.triggers:
+            if all(phrase in command for phrase in trigger):
+                return intent
+    return None
+
+def benchmark_router(intent_counts=(10, 100, 1000, 10000), transcripts=20_000, seed=0):
+    """
+    Measures command matching throughput over a synthetic transcript corpus
+    as the number of registered intents grows, for the CommandRouter and for
+    the old chain of substring checks.
+    Args:
+        intent_counts (tuple): Intent counts to try (padded with synthetic intents).
+        transcripts (int): Transcripts in the corpus.
+        seed (int): Random seed.
+    """
+    import random
+
+    rng = random.Random(seed)
+    templates = ["hello there", "what is your name", "what's the weather in {city}", "check weather",
+                 "remind me to {task} in {n} minutes", "please cancel my {task} reminder", "read {category} news",
+                 "tell me the news", "open app {i}", "play station {i} please", "i said something unrelated", "goodbye"]
+    cities = ["london", "paris", "new york", "tokyo", "mumbai"]
+    tasks = ["stretch", "call mom", "water the plants", "take a break"]
+    largest = max(intent_counts)
+    corpus = [rng.choice(templates).format(city=rng.choice(cities), task=rng.choice(tasks), n=rng.randint(1, 60),
+                                           category=rng.choice(NEWS_CATEGORIES.split("|")), i=rng.randrange(largest))
+              for _ in range(transcripts)]
+
+    print(f"\n--- Command Matching Throughput ({transcripts:,} transcripts) ---")
+    print(f"{'Intents':>8}{'Router (cmd/s)':>16}{'Substring chain (cmd/s)':>25}")
+    for count in intent_counts:
+        router = CommandRouter()
+        for intent in command_router.intents:
+            router.register(intent.name, intent.triggers, intent.handler, intent.slots)
+        for i in range(count - len(command_router.intents)):
+            router.register(f"app_{i}", [f"open app {i}", f"play station {i}"], None)
+        router.match("warm up") # Compile outside the timing
+
+        start = time.perf_counter()
+        for transcript in corpus:
+            router.match(transcript)
+        routed = transcripts / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for transcript in corpus:
+            _match_linearly(router.intents, transcript)
+        chained = transcripts / (time.perf_counter() - start)
+        print(f"{count:>8}{routed:>16,.0f}{chained:>25,.0f}")
+
+# --- Audio and Speech Backends ---
+# Blocking backends, run by the Assistant on worker threads. Any object with the
+# same method (capture, recognize or say) can stand in, e.g. the fakes below.
+# Nothing here touches audio hardware until it is created, so the module can
+# be imported (e.g. for tests) without a microphone or a speech engine.
+
+_recognizer = None
+_recognizer_lock = threading.Lock()
+
+def get_recognizer():
+    """Returns the shared speech_recognition Recognizer, creating it on first use."""
+    global _recognizer
+    with _recognizer_lock:
+        if _recognizer is None:
+            _recognizer = sr.Recognizer()
+        return _recognizer
+
+class MicrophoneAudio:
+    """
+    Captures spoken phrases from the microphone. The microphone is opened and
+    calibrated for ambient noise once, on first use; after that the energy
+    threshold adapts as it listens (dynamic_energy_threshold) instead of
+    spending a second recalibrating before every phrase.
+    """
+
+    def __init__(self, recognizer, calibration_seconds=1):
+        self.recognizer = recognizer
+        self.recognizer.dynamic_energy_threshold = True
+        self.calibration_seconds = calibration_seconds
+        self.source = None
+
+    def _open(self):
+        if self.source is None:
+            self.source = sr.Microphone()
+            self.source.__enter__()
+            self.recalibrate()
+        return self.source
+
+    def recalibrate(self):
+        """Measures the ambient noise again (e.g. after moving to a noisier room)."""
+        print("Calibrating for ambient noise...")
+        self.recognizer.adjust_for_ambient_noise(self._open(), duration=self.calibration_seconds)
+
+    def capture(self):
+        """
+        Listens for one phrase.
+        Returns:
+            sr.AudioData: The phrase, or None if nothing was said within the timeout.
+        """
+        source = self._open()
+        print("Listening...")
+        try:
+            return self.recognizer.listen(source, timeout=5, phrase_time_limit=5) # Listen for up to 5 seconds
+        except sr.WaitTimeoutError:
+            print("No speech detected within timeout.")
+            return None
+
+    def stream(self):
+        """Yields one phrase as sr.AudioData chunks while it is spoken (nothing if no speech starts in time)."""
+        source = self._open()
+        print("Listening...")
+        try:
+            yield from self.recognizer.listen(source, timeout=5, phrase_time_limit=5, stream=True)
+        except sr.WaitTimeoutError:
+            print("No speech detected within timeout.")
+
+    def close(self):
+        """Releases the microphone."""
+        if self.source is not None:
+            self.source.__exit__(None, None, None)
+            self.source = None
+
+class GoogleRecognizer:
+    """Converts captured phrases to text with the Google Web Speech API (online, whole phrases only)."""
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+
+    def recognize(self, audio):
+        """Returns the text of a phrase (raises sr.UnknownValueError or sr.RequestError on failure)."""
+        return self.recognizer.recognize_google(audio)
+
+class VoskRecognizer:
+    """
+    Recognizes speech offline with a local Vosk (Kaldi) model. Besides whole
+    phrases it accepts a phrase as a stream of chunks, reporting partial
+    hypotheses while the phrase is still being spoken.
+    """
+
+    def __init__(self, model_path=VOSK_MODEL_PATH, sample_rate=16000):
+        import vosk
+
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError(f"Vosk model not found at '{model_path}'. Download one from https://alphacephei.com/vosk/models")
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+        self.sample_rate = sample_rate
+
+    def recognize(self, audio):
+        """Returns the text of a phrase (raises sr.UnknownValueError if nothing was recognized)."""
+        return self.recognize_stream([audio])
+
+    def recognize_stream(self, chunks, on_partial=None):
+        """
+        Recognizes a phrase from its chunks as they arrive.
+        Args:
+            chunks (iterable): sr.AudioData chunks of one phrase.
+            on_partial (callable): Called with the hypothesis so far after each chunk.
+        Returns:
+            str: The final text, or None if there were no chunks (no speech).
+        """
+        recognizer = self.vosk.KaldiRecognizer(self.model, self.sample_rate)
+        segments = []
+        heard = False
+        for chunk in chunks:
+            heard = True
+            if recognizer.AcceptWaveform(chunk.get_raw_data(convert_rate=self.sample_rate, convert_width=2)):
+                segments.append(json.loads(recognizer.Result())["text"])
+            elif on_partial is not None:
+                partial = json.loads(recognizer.PartialResult())["partial"]
+                if partial:
+                    on_partial(" ".join(segments + [partial]).strip())
+        if not heard:
+            return None
+        segments.append(json.loads(recognizer.FinalResult())["text"])
+        text = " ".join(segment for segment in segments if segment)
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+def create_recognizer(backend=RECOGNIZER_BACKEND):
+    """Returns the configured recognizer backend, falling back to Google if Vosk is unavailable."""
+    if backend == "vosk":
+        try:
+            return VoskRecognizer()
+        except (ImportError, OSError) as e:
+            print(f"Offline recognition is unavailable ({e}); using Google Speech Recognition.")
+    return GoogleRecognizer(get_recognizer())
+
+def create_engine(rate=TTS_RATE, volume=TTS_VOLUME, voice=TTS_VOICE):
+    """
+    Starts the pyttsx3 engine and configures its voice.
+    Args:
+        rate (int): Speed of speech in words per minute.
+        volume (float): Volume (0.0 to 1.0).
+        voice (str): A voice id, or None for the default voice.
+    Returns:
+        pyttsx3.Engine: The engine.
+    """
+    import pyttsx3
+
+    engine = pyttsx3.init()
+    # You can try different voices if available
+    # for voice in engine.getProperty('voices'):
+    #     print(f"ID: {voice.id}, Name: {voice.name}, Lang: {voice.languages}")
+    if voice is not None:
+        engine.setProperty('voice', voice)
+    engine.setProperty('rate', rate)
+    engine.setProperty('volume', volume)
+    return engine
+
+class Pyttsx3Speech:
+    """Speaks through a pyttsx3 engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def say(self, text):
+        """Speaks text, returning when it has been spoken."""
+        self.engine.say(text)
+        self.engine.runAndWait()
+
+class CachedSpeech:
+    """
+    Speaks through a pyttsx3 engine by rendering each phrase to WAV audio and
+    playing it (through PyAudio, which the microphone already needs), so a
+    phrase is synthesized once. Rendered phrases are kept in an in-memory
+    LRU; the fixed prompts are also kept in a content-addressed store on disk
+    (files named by a hash of the voice settings and the text), so they
+    survive restarts. prewarm renders the fixed prompts on a background
+    thread at startup. Whichever thread asks, the engine itself is only ever
+    driven from one thread of its own (pyttsx3 drivers such as nsss and
+    sapi5 require it), so a phrase spoken during prewarming waits for at most
+    one render. That thread also creates the engine, calling engine_factory
+    (create_engine by default). If the engine cannot render to a WAV file,
+    phrases are spoken live instead.
+    """
+
+    def __init__(self, engine_factory=create_engine, cache_dir=TTS_CACHE_DIR, memory_size=TTS_CACHE_SIZE,
+                 persistent=STATIC_PHRASES):
+        def start():
+            engine = engine_factory()
+            return engine, repr([engine.getProperty(name) for name in ('voice', 'rate', 'volume')])
+
+        self.engine_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-engine")
+        try:
+            self.engine, self.voice = self.engine_thread.submit(start).result()
+        except BaseException:
+            self.engine_thread.shutdown(wait=False)
+            raise
+        self.cache_dir = cache_dir
+        self.memory_size = memory_size
+        self.persistent = frozenset(persistent)
+        self.rendered = collections.OrderedDict() # key -> WAV bytes, least recently used first
+        self.lock = threading.Lock()
+        self.can_render = True
+        self.player = None
+        self.stats = collections.Counter() # Renders served from memory, from disk and synthesized
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.voice}\n{text}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.wav")
+
+    def _remember(self, key, wav):
+        with self.lock:
+            self.rendered[key] = wav
+            self.rendered.move_to_end(key)
+            while len(self.rendered) > self.memory_size:
+                self.rendered.popitem(last=False)
+
+    def _cached(self, key):
+        with self.lock:
+            wav = self.rendered.get(key)
+            if wav is not None:
+                self.rendered.move_to_end(key)
+            return wav
+
+    def render(self, text):
+        """
+        Returns a phrase as WAV bytes, from memory, from disk or synthesized.
+        Raises:
+            OSError, RuntimeError or wave.Error: If the engine cannot render to a WAV file.
+        """
+        key = self._key(text)
+        wav = self._cached(key)
+        if wav is not None:
+            self.stats["memory"] += 1
+            return wav
+        path = self._path(key) if self.cache_dir and text in self.persistent else None
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                wav = f.read()
+            self.stats["disk"] += 1
+            self._remember(key, wav)
+            return wav
+        return self.engine_thread.submit(self._synthesize, key, text, path).result()
+
+    def _synthesize(self, key, text, path):
+        """Renders text to WAV bytes on the engine thread, keeping them in memory (and at path if given)."""
+        wav = self._cached(key) # Another thread may have asked for it first
+        if wav is not None:
+            self.stats["memory"] += 1
+            return wav
+        directory = os.path.dirname(path) if path else None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False, suffix='.wav') as f:
+            pass
+        try:
+            self.engine.save_to_file(text, f.name)
+            self.engine.runAndWait()
+            with open(f.name, 'rb') as rendered:
+                wav = rendered.read()
+            wave.open(io.BytesIO(wav)).close() # Not every driver writes WAV (e.g. AIFF on macOS)
+            if path:
+                os.replace(f.name, path) # Atomic: a half-written file is never found in the store
+        finally:
+            if os.path.exists(f.name):
+                os.remove(f.name)
+        self.stats["synthesized"] += 1
+        self._remember(key, wav) # Before the next queued render, which may be for the same phrase
+        return wav
+
+    def play(self, wav):
+        """Plays WAV bytes, returning when they have been played."""
+        import pyaudio
+
+        if self.player is None:
+            self.player = pyaudio.PyAudio()
+        with wave.open(io.BytesIO(wav)) as audio:
+            stream = self.player.open(format=self.player.get_format_from_width(audio.getsampwidth()),
+                                      channels=audio.getnchannels(), rate=audio.getframerate(), output=True)
+            try:
+                stream.write(audio.readframes(audio.getnframes()))
+            finally:
+                stream.stop_stream()
+                stream.close()
+
+    def say(self, text):
+        """Speaks text, returning when it has been spoken."""
+        if self.can_render:
+            try:
+                self.play(self.render(text))
+                return
+            except (ImportError, OSError, RuntimeError, wave.Error, EOFError) as e:
+                print(f"Could not play rendered speech ({e}); speaking live from now on.")
+                self.can_render = False
+        self.engine_thread.submit(self._speak_live, text).result()
+
+    def _speak_live(self, text):
+        self.engine.say(text)
+        self.engine.runAndWait()
+
+    def prewarm(self, phrases=STATIC_PHRASES):
+        """
+        Renders phrases on a background thread, so they are ready when first spoken.
+        Returns:
+            threading.Thread: The (daemon) thread doing it.
+        """
+        def warm():
+            for phrase in phrases:
+                if not self.can_render:
+                    return
+                try:
+                    self.render(phrase)
+                except (OSError, RuntimeError, wave.Error, EOFError) as e:
+                    print(f"Could not pre-render speech ({e}).")
+                    return
+
+        thread = threading.Thread(target=warm, name="tts-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        """Releases the audio output and the engine thread."""
+        self.engine_thread.shutdown(wait=False, cancel_futures=True)
+        if self.player is not None:
+            self.player.terminate()
+            self.player = None
+
+class FakeAudio:
+    """
+    Plays back scripted utterances instead of listening, for tests and
+    benchmarks. The "audio" of each phrase is its text (streamed word by
+    word); capture and stream raise EOFError once the script runs out.
+    """
+
+    def __init__(self, utterances, phrase_seconds=0.5):
+        self.utterances = iter(utterances)
+        self.phrase_seconds = phrase_seconds
+
+    def _next(self):
+        utterance = next(self.utterances, None)
+        if utterance is None:
+            raise EOFError("No more scripted utterances.")
+        return utterance
+
+    def capture(self):
+        utterance = self._next()
+        time.sleep(self.phrase_seconds) # The time it takes to say the phrase
+        return utterance
+
+    def stream(self):
+        words = self._next().split() or [""] # An empty phrase is noise: one chunk, no words
+        for word in words:
+            time.sleep(self.phrase_seconds / len(words))
+            yield word
+
+class FakeRecognizer:
+    """
+    Recognizes FakeAudio phrases: a whole phrase after delay seconds, or a
+    streamed one word by word, finishing final_delay seconds after its end.
+    An empty phrase is not understood.
+    """
+
+    def __init__(self, delay=0.3, final_delay=0.05):
+        self.delay = delay
+        self.final_delay = final_delay
+
+    def recognize(self, audio):
+        time.sleep(self.delay)
+        if not audio:
+            raise sr.UnknownValueError()
+        return audio
+
+    def recognize_stream(self, chunks, on_partial=None):
+        words = []
+        heard = False
+        for chunk in chunks:
+            heard = True
+            if chunk:
+                words.append(chunk)
+                if on_partial is not None:
+                    on_partial(" ".join(words))
+        if not heard:
+            return None
+        time.sleep(self.final_delay)
+        if not words:
+            raise sr.UnknownValueError()
+        return " ".join(words)
+
+class FakeSpeech:
+    """Records what would be spoken, taking as long as speaking it at the given rate."""
+
+    def __init__(self, words_per_second=3.0):
+        self.words_per_second = words_per_second
+        self.spoken = []
+
+    def say(self, text):
+        time.sleep(len(text.split()) / self.words_per_second)
+        self.spoken.append(text)
+
+# --- Reminder Scheduler ---
+
+class ReminderScheduler:
+    """
+    Fires reminders at their due time from a background thread. Pending
+    reminders sit in a min-heap ordered by due time; the thread sleeps on a
+    condition variable exactly until the earliest one is due, and is woken
+    early when a sooner reminder is added. Cancelled reminders are dropped
+    lazily when they reach the top of the heap. Recurring reminders are
+    rescheduled after they fire. Pending reminders are saved to a JSON file
+    (by the scheduler thread, so bursts of changes are written once).
+    """
+
+    def __init__(self, path=None, on_due=announce_reminder):
+        self.path = path
+        self.on_due = on_due
+        self.heap = [] # (due timestamp, reminder id)
+        self.pending = {} # reminder id -> reminder dict
+        self.ids = itertools.count(1)
+        self.condition = threading.Condition()
+        self.dirty = False
+        self.running = False
+        self.thread = None
+        if path and os.path.exists(path):
+            self.load()
+
+    def add(self, task, due, repeat=None):
+        """
+        Schedules a reminder.
+        Args:
+            task (str): What to remind about.
+            due (datetime.datetime): When it first fires.
+            repeat (datetime.timedelta): Interval for recurring reminders, or None.
+        Returns:
+            int: The reminder id (for cancel).
+        """
+        reminder = {"id": next(self.ids), "task": task, "time": due, "set_time": datetime.datetime.now(),
+                    "repeat": repeat}
+        with self.condition:
+            self._push(reminder)
+            self.dirty = True
+            if self.path or self.heap[0][1] == reminder["id"]:
+                self.condition.notify() # The new reminder is the next one due, or must be saved
+        return reminder["id"]
+
+    def _push(self, reminder):
+        self.pending[reminder["id"]] = reminder
+        heapq.heappush(self.heap, (reminder["time"].timestamp(), reminder["id"]))
+
+    def cancel(self, reminder_id):
+        """Cancels a pending reminder. Returns True if it was pending."""
+        with self.condition:
+            if self.pending.pop(reminder_id, None) is None:
+                return False
+            self.dirty = True
+            self.condition.notify() # Let the thread drop it and save
+            return True
+
+    def cancel_matching(self, text):
+        """Cancels every pending reminder whose task contains text. Returns how many were cancelled."""
+        with self.condition:
+            matching = [reminder_id for reminder_id, reminder in self.pending.items() if text in reminder["task"]]
+        return sum(self.cancel(reminder_id) for reminder_id in matching)
+
+    def upcoming(self):
+        """Returns the pending reminders, soonest first."""
+        with self.condition:
+            return sorted(self.pending.values(), key=lambda reminder: reminder["time"])
+
+    def __len__(self):
+        with self.condition:
+            return len(self.pending)
+
+    def start(self):
+        """Starts the scheduler thread (if it is not running yet)."""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run, name="reminders", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops the scheduler thread, saving any unsaved changes."""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _next_due(self):
+        """Returns the reminders due now, rescheduling recurring ones, and the seconds until the next one."""
+        due = []
+        now = time.time()
+        while self.heap:
+            timestamp, reminder_id = self.heap[0]
+            reminder = self.pending.get(reminder_id)
+            if reminder is None or reminder["time"].timestamp() != timestamp:
+                heapq.heappop(self.heap) # Cancelled
+                continue
+            if timestamp > now:
+                return due, timestamp - now
+            heapq.heappop(self.heap)
+            due.append(dict(reminder))
+            del self.pending[reminder_id]
+            if reminder["repeat"]:
+                # Next occurrence after now (missed occurrences while stopped are skipped)
+                missed = (now - timestamp) // reminder["repeat"].total_seconds()
+                reminder["time"] += reminder["repeat"] * (missed + 1)
+                self._push(reminder)
+            self.dirty = True
+        return due, None
+
+    def _run(self):
+        while True:
+            with self.condition:
+                due, timeout = self._next_due()
+                snapshot = self._snapshot() if self.dirty and self.path else None
+                self.dirty = False
+                if not due and snapshot is None:
+                    if not self.running:
+                        return
+                    self.condition.wait(timeout)
+                    continue
+            # Announce and save outside the lock, so add/cancel never wait on speech or disk
+            for reminder in due:
+                try:
+                    self.on_due(reminder)
+                except Exception as e:
+                    print(f"Error announcing reminder: {e}")
+            if snapshot is not None:
+                self._save(snapshot)
+
+    def _snapshot(self):
+        return [{"id": reminder["id"], "task": reminder["task"], "time": reminder["time"].isoformat(),
+                 "set_time": reminder["set_time"].isoformat(),
+                 "repeat": reminder["repeat"].total_seconds() if reminder["repeat"] else None}
+                for reminder in self.pending.values()]
+
+    def _save(self, snapshot):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            with tempfile.NamedTemporaryFile('w', dir=directory, delete=False, suffix='.tmp') as f:
+                json.dump(snapshot, f)
+            os.replace(f.name, self.path)
+        except OSError as e:
+            print(f"Could not save reminders to '{self.path}': {e}")
+
+    def load(self):
+        """Loads the reminders saved in the reminders file (overdue ones fire as soon as the thread starts)."""
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read reminders from '{self.path}' ({e}); starting with none.")
+            return
+        with self.condition:
+            for item in saved:
+                self._push({"id": item["id"], "task": item["task"],
+                            "time": datetime.datetime.fromisoformat(item["time"]),
+                            "set_time": datetime.datetime.fromisoformat(item["set_time"]),
+                            "repeat": datetime.timedelta(seconds=item["repeat"]) if item["repeat"] else None})
+            self.ids = itertools.count(max(self.pending, default=0) + 1)
+
+def benchmark_reminders(pending=100_000, fired=200, spacing=0.005, idle_seconds=2.0):
+    """
+    Measures the scheduler with many pending reminders: time to add them,
+    how late due reminders fire, and CPU used while waiting, next to the
+    cost of one scan of the same reminders by the old 10-second poll.
+    Args:
+        pending (int): Reminders due far in the future.
+        fired (int): Reminders due during the benchmark.
+        spacing (float): Seconds between the due times of the fired reminders.
+        idle_seconds (float): Length of the idle CPU measurement.
+    """
+    import resource # Unix only
+
+    latencies = []
+    all_fired = threading.Event()
+
+    def record(reminder):
+        latencies.append(time.time() - reminder["time"].timestamp())
+        if len(latencies) == fired:
+            all_fired.set()
+
+    scheduler = ReminderScheduler(on_due=record)
+    scheduler.start()
+    now = datetime.datetime.now()
+    start = time.perf_counter()
+    for i in range(pending):
+        scheduler.add(f"task {i}", now + datetime.timedelta(hours=1, seconds=i))
+    add_seconds = time.perf_counter() - start
+
+    first_due = datetime.datetime.now() + datetime.timedelta(seconds=0.2)
+    for i in range(fired):
+        scheduler.add(f"due task {i}", first_due + datetime.timedelta(seconds=i * spacing))
+    all_fired.wait()
+
+    cpu_start, wall_start = resource.getrusage(resource.RUSAGE_SELF), time.perf_counter()
+    time.sleep(idle_seconds)
+    cpu_end, wall = resource.getrusage(resource.RUSAGE_SELF), time.perf_counter() - wall_start
+    idle_cpu = (cpu_end.ru_utime + cpu_end.ru_stime) - (cpu_start.ru_utime + cpu_start.ru_stime)
+    scheduler.stop()
+
+    legacy = [{"task": f"task {i}", "time": now + datetime.timedelta(hours=1, seconds=i)} for i in range(pending)]
+    start = time.perf_counter()
+    current = datetime.datetime.now()
+    [i for i, reminder in enumerate(legacy) if current >= reminder["time"]]
+    scan_seconds = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"\n--- Reminder Scheduler Benchmark ({pending:,} pending) ---")
+    print(f"Adding {pending:,} reminders:      {add_seconds:.2f} s ({add_seconds / pending * 1e6:.1f} us each)")
+    print(f"Firing latency ({fired} reminders): median {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+    print(f"CPU while idle:                  {idle_cpu / wall:.2%} of one core")
+    print(f"Old poll: one scan of {pending:,} reminders takes {scan_seconds * 1000:.1f} ms every 10 s, "
+          f"and reminders fire up to 10 s late")
+
+# --- Main Assistant Loop ---
+
+class _Recognized:
+    """A phrase recognized while it was captured (streaming), or the error recognizing it."""
+
+    def __init__(self, text=None, error=None):
+        self.text = text
+        self.error = error
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.text
+
+class Assistant:
+    """
+    The assistant's asyncio core. A capture task and a recognition task feed
+    recognized commands into a queue; everything the assistant says goes
+    through one output queue spoken by a single TTS task (reminders are
+    queued too, never spoken from the scheduler thread); lookups run on
+    worker threads and are started before the speech that precedes their
+    results, so network time overlaps speaking. Capture only runs when the
+    assistant is waiting for a command or an answer and is not speaking.
+    For each command the delay from the end of the phrase to the start of
+    the reply is recorded (see report_latency).
+    """
+
+    def __init__(self, audio, recognizer, speech, scheduler=None, streaming=None):
+        self.audio = audio
+        self.recognizer = recognizer
+        self.speech = speech
+        self.scheduler = scheduler
+        # Stream phrases through the recognizer while they are spoken when both backends can
+        if streaming is None:
+            streaming = hasattr(audio, "stream") and hasattr(recognizer, "recognize_stream")
+        self.streaming = streaming
+        self.latencies = [] # (recognition seconds, response seconds) per command
+        self.command_heard_at = None
+        self.prefetched = {} # Lookups started from partial hypotheses, by cache key
+
+    async def run(self):
+        """Runs the assistant until the user says goodbye or the audio source ends."""
+        self.loop = asyncio.get_running_loop()
+        self.output = asyncio.Queue()
+        self.phrases = asyncio.Queue()
+        self.commands = asyncio.Queue()
+        self.quiet = asyncio.Event() # Set while nothing is being spoken
+        self.quiet.set()
+        self.expecting = False # Waiting for a command or an answer
+        self.listening = asyncio.Event() # Set while expecting and no phrase has been captured yet
+        # One thread per blocking backend: the TTS engine must only ever be driven from one thread
+        self.tts_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+        self.capture_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture")
+        self.recognition_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recognition")
+        tasks = [asyncio.create_task(self._speak_queued()), asyncio.create_task(self._capture()),
+                 asyncio.create_task(self._recognize())]
+        if self.scheduler is not None:
+            previous_on_due = self.scheduler.on_due
+            self.scheduler.on_due = lambda reminder: self.loop.call_soon_threadsafe(
+                self.say, f"Reminder: It's time to {reminder['task']}!")
+        try:
+            self.say("Hello! I am your personal assistant. How can I help you today?")
+            while True:
+                command = await self.next_command()
+                if command is None or not await self.handle(command):
+                    break
+            await self.output.join() # Finish speaking before shutting down
+        finally:
+            if self.scheduler is not None:
+                self.scheduler.on_due = previous_on_due
+            for task in tasks:
+                task.cancel()
+            for executor in (self.tts_thread, self.capture_thread, self.recognition_thread):
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def say(self, text, pause=0.0):
+        """
+        Queues text to be spoken, followed by a pause in seconds.
+        Returns:
+            asyncio.Future: Done once the text has been spoken (await it to wait).
+        """
+        spoken = self.loop.create_future()
+        self.output.put_nowait((text, pause, spoken))
+        return spoken
+
+    async def _speak_queued(self):
+        while True:
+            text, pause, spoken = await self.output.get()
+            self.quiet.clear()
+            if self.command_heard_at is not None:
+                self.latencies[-1][1] = time.perf_counter() - self.command_heard_at
+                self.command_heard_at = None
+            print(f"Assistant: {text}")
+            try:
+                await self.loop.run_in_executor(self.tts_thread, self.speech.say, text)
+                if pause:
+                    await asyncio.sleep(pause)
+            except Exception as e:
+                print(f"Error speaking: {e}")
+            if not spoken.done():
+                spoken.set_result(None)
+            self.output.task_done()
+            if self.output.empty():
+                self.quiet.set()
+
+    async def next_command(self):
+        """Waits for the next recognized command (None once the audio source has ended)."""
+        self.expecting = True
+        self.listening.set()
+        try:
+            return await self.commands.get()
+        finally:
+            self.expecting = False
+            self.listening.clear()
+
+    async def _capture(self):
+        while True:
+            # Listen only when a command is expected, and never to ourselves
+            while not (self.listening.is_set() and self.quiet.is_set()):
+                await self.listening.wait()
+                await self.quiet.wait()
+            try:
+                if self.streaming:
+                    phrase = await self.loop.run_in_executor(self.capture_thread, self._stream_phrase)
+                else:
+                    audio = await self.loop.run_in_executor(self.capture_thread, self.audio.capture)
+                    phrase = None if audio is None else (audio, time.perf_counter())
+            except EOFError:
+                await self.phrases.put(None)
+                return
+            except Exception as e: # e.g. no microphone or PyAudio: end the conversation rather than hang
+                print(f"Listening failed: {e!r}")
+                await self.phrases.put(None)
+                return
+            if phrase is not None:
+                self.listening.clear() # One phrase per command; recognition failures listen again
+                await self.phrases.put(phrase)
+
+    def _stream_phrase(self):
+        """
+        Captures one phrase while streaming it through the recognizer (on the
+        capture thread), passing partial hypotheses to the event loop.
+        Returns:
+            tuple: (_Recognized, end of phrase time), or None if nothing was said.
+        """
+        ended = []
+
+        def timed(chunks):
+            yield from chunks
+            ended.append(time.perf_counter())
+
+        def on_partial(text):
+            self.loop.call_soon_threadsafe(self._on_partial, text)
+
+        try:
+            text = self.recognizer.recognize_stream(timed(self.audio.stream()), on_partial)
+        except (sr.UnknownValueError, sr.RequestError) as e:
+            return _Recognized(error=e), (ended or [time.perf_counter()])[0]
+        if text is None:
+            return None
+        return _Recognized(text), ended[0]
+
+    def _on_partial(self, text):
+        """Starts work a command will need as soon as a partial hypothesis reveals it."""
+        intent, slots = command_router.match(text)
+        if intent is not None and intent.name == "news" and not slots and "news:general" not in self.prefetched:
+            self.prefetched["news:general"] = asyncio.create_task(self.lookup(fetch_news, "general"))
+
+    async def _recognize(self):
+        while True:
+            phrase = await self.phrases.get()
+            if phrase is None:
+                await self.commands.put(None)
+                return
+            audio, heard_at = phrase
+            print("Recognizing...")
+            try:
+                if isinstance(audio, _Recognized):
+                    command = audio.result()
+                else:
+                    command = await self.loop.run_in_executor(self.recognition_thread, self.recognizer.recognize, audio)
+            except sr.UnknownValueError:
+                print("Could not understand audio. Please try again.")
+                self.say("Sorry, I didn't catch that. Could you please repeat?")
+                self._listen_again()
+                continue
+            except sr.RequestError as e:
+                print(f"Could not request results from Google Speech Recognition service; {e}")
+                self.say("My speech service is currently unavailable. Please check your internet connection.")
+                self._listen_again()
+                continue
+            except Exception as e: # A broken recognizer backend ends the conversation rather than hang it
+                print(f"Speech recognition failed: {e!r}")
+                await self.commands.put(None)
+                return
+            command = command.lower()
+            print(f"You said: {command}")
+            self.latencies.append([time.perf_counter() - heard_at, None])
+            self.command_heard_at = heard_at
+            await self.commands.put(command)
+
+    def _listen_again(self):
+        if self.expecting:
+            self.listening.set()
+
+    async def ask(self, prompt, timeout=ANSWER_TIMEOUT):
+        """
+        Asks a question and waits for the answer.
+        Returns:
+            str: The recognized answer, or None if none came within the timeout
+            (or the audio source ended).
+        """
+        await self.say(prompt)
+        try:
+            answer = await asyncio.wait_for(self.next_command(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if answer is None:
+            self.commands.put_nowait(None) # Let the main loop see the end of input too
+        return answer
+
+    async def lookup(self, function, *args):
+        """Runs a blocking lookup on a worker thread (start it as a task to prefetch)."""
+        return await asyncio.to_thread(function, *args)
+
+    async def handle(self, command):
+        """
+        Carries out one command.
+        Returns:
+            bool: False if the assistant should stop.
+        """
+        intent, slots = command_router.match(command)
+        if intent is None:
+            self.say("I'm sorry, I don't understand that command yet. Please try saying 'set a reminder', 'check weather', or 'read news'.")
+            return True
+        return await getattr(self, intent.handler)(slots) is not False
+
+    async def greet(self, slots):
+        self.say("Hello there! How can I assist you?")
+
+    async def tell_name(self, slots):
+        self.say("I am your personal assistant, designed to help you.")
+
+    async def stop(self, slots):
+        await self.say("Goodbye! Have a great day!")
+        return False
+
+    async def check_weather(self, slots):
+        """Reports the weather for the city in the command, asking for one if it has none."""
+        city = slots.get("city") or await self.ask("Which city would you like the weather for?")
+        if city:
+            await self.report_weather(city)
+        else:
+            self.say("I didn't hear a city name. Please try again.")
+
+    async def news(self, slots):
+        """Reads the headlines for the category in the command, asking for one if it has none."""
+        category = slots.get("category")
+        general = self.prefetched.pop("news:general", None)
+        if category is None:
+            # Prefetch the default category while asking which one is wanted (if a partial hypothesis hasn't already)
+            general = general or asyncio.create_task(self.lookup(fetch_news, "general"))
+            category = await self.ask("What kind of news are you interested in? For example, 'technology', 'sports', or 'general'.")
+            category = (category or "general").strip()
+        await self.read_news(category, general if category == "general" else None)
+        if general is not None and category != "general":
+            general.cancel()
+
+    async def report_weather(self, city):
+        """Fetches and reports the weather for a city, acknowledging while the lookup runs."""
+        weather = asyncio.create_task(self.lookup(fetch_weather, city))
+        self.say(f"Checking the weather in {city}.")
+        try:
+            self.say(describe_weather(city, await weather))
+        except requests.exceptions.RequestException as e:
+            self.say(f"I'm having trouble connecting to the weather service. Please check your internet connection. Error: {e}")
+        except Exception as e:
+            self.say(f"An unexpected error occurred while fetching weather. Error: {e}")
+
+    async def read_news(self, category, prefetched=None):
+        """Fetches (unless prefetched) and reads out the headlines for a category."""
+        try:
+            data = await (prefetched or self.lookup(fetch_news, category))
+            for line in describe_news(category, data):
+                self.say(line, pause=NEWS_HEADLINE_PAUSE) # Queued at once; the pauses don't block the loop
+        except requests.exceptions.RequestException as e:
+            self.say(f"I'm having trouble connecting to the news service. Please check your internet connection. Error: {e}")
+        except Exception as e:
+            self.say(f"An unexpected error occurred while fetching news. Error: {e}")
+
+    async def set_reminder(self, slots):
+        """Sets a reminder, asking for whatever the command did not say (the task, the time)."""
+        task = slots.get("task") or await self.ask("What should I remind you about?")
+        if not task:
+            return
+        time_str = slots.get("when") or await self.ask("And when should I remind you? For example, 'tomorrow at 5 PM', 'in 10 minutes' or 'every day at 8 AM'.")
+        if not time_str:
+            return
+        try:
+            reminder_time, repeat = parse_reminder_time(time_str, datetime.datetime.now())
+        except ReminderTimeError as e:
+            self.say(str(e))
+            return
+        self.scheduler.add(task, reminder_time, repeat)
+        self.say(describe_reminder(task, reminder_time, repeat))
+
+    async def cancel_reminder(self, slots):
+        """Guides the user to cancel the pending reminders for a task."""
+        task = await self.ask("Which reminder should I cancel?")
+        if not task:
+            return
+        cancelled = self.scheduler.cancel_matching(task)
+        if cancelled:
+            self.say(f"Okay, I cancelled {cancelled} reminder{'s' if cancelled > 1 else ''} about {task}.")
+        else:
+            self.say(f"I couldn't find a reminder about {task}.")
+
+    def report_latency(self):
+        """Prints recognition and end-to-end response latency over the commands handled."""
+        answered = sorted(response for recognition, response in self.latencies if response is not None)
+        if not answered:
+            print("No commands were answered.")
+            return
+        recognition = sorted(recognition for recognition, response in self.latencies)
+
+        def percentile(values, fraction):
+            return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+        print(f"\n--- Response Latency ({len(answered)} commands) ---")
+        print(f"Recognition:              median {percentile(recognition, 0.5):7.1f} ms, p95 {percentile(recognition, 0.95):7.1f} ms")
+        print(f"End of phrase to reply:   median {percentile(answered, 0.5):7.1f} ms, p95 {percentile(answered, 0.95):7.1f} ms")
+
+def start_assistant():
+    """
+    Runs the personal assistant on the microphone, the configured recognizer
+    and pyttsx3 (with cached prompts). The speech engine, recognizer and
+    reminder thread are only started here, not when the module is imported.
+    """
+    speech = CachedSpeech()
+    speech.prewarm()
+    reminders = ReminderScheduler(path=REMINDERS_FILE)
+    reminders.start()
+    audio = MicrophoneAudio(get_recognizer())
+    assistant = Assistant(audio, create_recognizer(), speech, reminders)
+    try:
+        asyncio.run(assistant.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        audio.close()
+        reminders.stop()
+        speech.close()
+    assistant.report_latency()
+
+def simulate_assistant(utterances=SIMULATED_UTTERANCES, phrase_seconds=0.5, recognition_delay=0.3,
+                       words_per_second=3.0, upstream_delay=0.2, streaming=True):
+    """
+    Runs the assistant on fake audio, recognition and speech backends and the
+    local stub weather/news server, then reports response latency.
+    Args:
+        utterances (list): What the fake user says, in order.
+        phrase_seconds (float): Time taken to say each phrase.
+        recognition_delay (float): Simulated recognition time.
+        words_per_second (float): Simulated speaking rate.
+        upstream_delay (float): Simulated weather/news API latency.
+        streaming (bool): Stream phrases through the recognizer as they are spoken.
+    """
+    server = start_stub_server(upstream_delay)
+    scheduler = ReminderScheduler()
+    scheduler.start()
+    assistant = Assistant(FakeAudio(utterances, phrase_seconds), FakeRecognizer(recognition_delay),
+                          FakeSpeech(words_per_second), scheduler, streaming)
+    try:
+        asyncio.run(assistant.run())
+    finally:
+        scheduler.stop()
+        server.shutdown()
+    assistant.report_latency()
+
+class _FailingAudio(FakeAudio):
+    """FakeAudio whose device fails (as with no microphone) on the given phrase."""
+
+    def __init__(self, utterances, fail_at=0, **options):
+        super().__init__(utterances, **options)
+        self.fail_at = fail_at
+        self.captured = 0
+
+    def _next(self):
+        if self.captured == self.fail_at:
+            raise OSError("No Default Input Device Available")
+        self.captured += 1
+        return super()._next()
+
+class _FailingRecognizer(FakeRecognizer):
+    """FakeRecognizer that fails with an unexpected error instead of recognizing."""
+
+    def recognize(self, audio):
+        raise RuntimeError("recognizer backend crashed")
+
+    def recognize_stream(self, chunks, on_partial=None):
+        list(chunks)
+        raise RuntimeError("recognizer backend crashed")
+
+def check_backend_failures(timeout=5.0):
+    """
+    Runs the assistant on fake backends that fail unexpectedly (audio
+    capture raising OSError at the first and at a later phrase, and a
+    recognizer raising RuntimeError, streaming and not) and checks that
+    each conversation ends within timeout seconds instead of hanging.
+    Returns:
+        bool: True if every case ended in time.
+    """
+    cases = [
+        ("capture fails at once", lambda: _FailingAudio(["hello"], phrase_seconds=0.05), FakeRecognizer, None),
+        ("capture fails later", lambda: _FailingAudio(["hello", "goodbye"], fail_at=1, phrase_seconds=0.05),
+         FakeRecognizer, None),
+        ("recognizer fails (batch)", lambda: FakeAudio(["hello"], 0.05), _FailingRecognizer, False),
+        ("recognizer fails (streaming)", lambda: FakeAudio(["hello"], 0.05), _FailingRecognizer, True),
+    ]
+    passed = True
+    print(f"\n--- Backend Failure Checks ---")
+    for label, audio, recognizer, streaming in cases:
+        assistant = Assistant(audio(), recognizer(0.01, 0.01), FakeSpeech(100.0), streaming=streaming)
+        try:
+            asyncio.run(asyncio.wait_for(assistant.run(), timeout))
+            result = "ok (conversation ended)"
+        except (asyncio.TimeoutError, TimeoutError):
+            result = f"FAILED (still waiting after {timeout:.0f} s)"
+            passed = False
+        print(f"{label:<30}{result}")
+    return passed
+
+# --- Recognizer Benchmark (on recorded WAV files) ---
+
+def _wav_chunks(audio, chunk_seconds):
+    """Splits sr.AudioData into chunks of chunk_seconds."""
+    raw = audio.get_raw_data()
+    step = int(audio.sample_rate * chunk_seconds) * audio.sample_width
+    return [sr.AudioData(raw[offset:offset + step], audio.sample_rate, audio.sample_width)
+            for offset in range(0, len(raw), step)]
+
+def benchmark_recognizers(wav_paths, chunk_seconds=AUDIO_CHUNK_SECONDS):
+    """
+    Compares recognizers on recorded WAV files: for each backend, the delay
+    between the end of the recording and the final text, both recognizing
+    the whole phrase afterwards and (where supported) streaming it in real
+    time, plus when the first partial hypothesis arrived.
+    Args:
+        wav_paths (list): WAV files, one phrase each.
+        chunk_seconds (float): Chunk length for streaming.
+    """
+    backends = [("google", GoogleRecognizer(get_recognizer()))]
+    try:
+        backends.append(("vosk", VoskRecognizer()))
+    except (ImportError, OSError) as e:
+        print(f"Vosk is unavailable ({e}); benchmarking Google only.")
+
+    print(f"\n--- Recognizer Latency ---")
+    print(f"{'File':<24}{'Backend':<8}{'Mode':<11}{'After end (ms)':>15}{'First partial (s)':>19}  Text")
+    for path in wav_paths:
+        with sr.AudioFile(path) as source:
+            audio = get_recognizer().record(source)
+        for name, backend in backends:
+            modes = ["whole"] + (["streaming"] if hasattr(backend, "recognize_stream") else [])
+            for mode in modes:
+                partials = []
+                started = time.perf_counter()
+                try:
+                    if mode == "whole":
+                        ended = time.perf_counter()
+                        text = backend.recognize(audio)
+                    else:
+                        chunks = _wav_chunks(audio, chunk_seconds)
+                        ended = None
+
+                        def paced():
+                            # Chunks arrive at the pace they were recorded, as from a microphone
+                            nonlocal ended
+                            for chunk in chunks:
+                                time.sleep(chunk_seconds)
+                                yield chunk
+                            ended = time.perf_counter()
+
+                        text = backend.recognize_stream(paced(), lambda partial: partials.append(time.perf_counter()))
+                except (sr.UnknownValueError, sr.RequestError) as e:
+                    text = f"<{type(e).__name__}>"
+                after_end = (time.perf_counter() - ended) * 1000
+                first_partial = f"{partials[0] - started:.2f}" if partials else "-"
+                print(f"{os.path.basename(path):<24}{name:<8}{mode:<11}{after_end:>15.0f}{first_partial:>19}  {text}")
+
+# --- Startup Benchmark ---
+
+def benchmark_startup(runs=5):
+    """
+    Measures startup: the time to import this module in a fresh interpreter,
+    the time to start the recognizer, speech engine and reminder thread (which
+    used to happen on import), and the time to render the fixed prompts
+    (synthesized, from the disk store, from memory), i.e. the delay before
+    each can start playing.
+    Args:
+        runs (int): Imports timed.
+    """
+    import statistics
+    import subprocess
+    import sys
+
+    script = ("import importlib.util, time; start = time.perf_counter(); "
+              f"spec = importlib.util.spec_from_file_location('assistant', {os.path.abspath(__file__)!r}); "
+              "spec.loader.exec_module(importlib.util.module_from_spec(spec)); print(time.perf_counter() - start)")
+    imports = [float(subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout)
+               for _ in range(runs)]
+    print(f"\n--- Startup ---")
+    print(f"Import (median of {runs}):              {statistics.median(imports) * 1000:8.1f} ms")
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            get_recognizer()
+            speech = CachedSpeech(cache_dir=directory)
+        except (ImportError, OSError, RuntimeError) as e:
+            print(f"No speech engine available ({e}); skipping the speech measurements.")
+            return
+        scheduler = ReminderScheduler(path=os.path.join(directory, "reminders.json"))
+        scheduler.start()
+        scheduler.stop()
+        print(f"Recognizer, engine and reminder thread: {(time.perf_counter() - start) * 1000:8.1f} ms (now deferred to start_assistant)")
+
+        def render_times(speech):
+            times = []
+            for phrase in STATIC_PHRASES:
+                start = time.perf_counter()
+                speech.render(phrase)
+                times.append(time.perf_counter() - start)
+            return statistics.median(times) * 1000
+
+        try:
+            synthesized = render_times(speech)
+            from_memory = render_times(speech)
+            speech.rendered.clear() # As after a restart
+            from_disk = render_times(speech)
+        except (OSError, RuntimeError, wave.Error, EOFError) as e:
+            print(f"The engine cannot render to WAV ({e}); prompts would be spoken live.")
+            return
+        finally:
+            speech.close()
+    print(f"\n--- Time to First Audio ({len(STATIC_PHRASES)} fixed prompts, median) ---")
+    print(f"Synthesized:  {synthesized:8.2f} ms")
+    print(f"From disk:    {from_disk:8.2f} ms")
+    print(f"From memory:  {from_memory:8.3f} ms")
+
+# --- Lookup Benchmark (against a local stub server) ---
+
+class _StubHandler(http.server.BaseHTTPRequestHandler):
+    """Answers weather and news requests with canned JSON after a fixed delay."""
+    protocol_version = "HTTP/1.1" # Keep-alive, so pooled connections are reused
+    disable_nagle_algorithm = True # Headers and body go out in separate writes
+    delay = 0.05
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        time.sleep(self.delay)
+        if "weather" in self.path:
+            data = {"cod": 200, "main": {"temp": 21.5, "humidity": 40}, "weather": [{"description": "clear sky"}]}
+        else:
+            data = {"status": "ok", "articles": [{"title": f"Headline {i + 1}"} for i in range(5)]}
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Keep the benchmark output readable
+
+def start_stub_server(delay=0.05):
+    """
+    Starts a local HTTP server imitating the weather and news APIs, and points
+    WEATHER_URL and NEWS_URL at it.
+    Args:
+        delay (float): Seconds the server waits before answering (simulated upstream latency).
+    Returns:
+        http.server.ThreadingHTTPServer: The running server (call shutdown() when done).
+    """
+    global WEATHER_URL, NEWS_URL
+    _StubHandler.delay = delay
+    _StubHandler.hits = 0
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    WEATHER_URL, NEWS_URL = f"{base}/weather", f"{base}/news"
+    return server
+
+def benchmark_lookups(rounds=20, callers=10, delay=0.05):
+    """
+    Measures lookup latency against the stub server: a new connection per
+    request (plain requests.get), the pooled session without the cache, a
+    cold cached lookup and warm cached lookups, and how many upstream calls
+    concurrent callers for one key make.
+    Args:
+        rounds (int): Lookups timed per mode.
+        callers (int): Concurrent callers in the coalescing test.
+        delay (float): Simulated upstream latency in seconds.
+    """
+    server = start_stub_server(delay)
+    params = {"q": "london", "appid": OPENWEATHER_API_KEY, "units": "metric"}
+
+    def timed(function):
+        start = time.perf_counter()
+        function()
+        return (time.perf_counter() - start) * 1000
+
+    def average(function):
+        return sum(timed(function) for _ in range(rounds)) / rounds
+
+    try:
+        lookup_cache.clear()
+        print(f"\n--- Lookup Latency (stub server, {delay * 1000:.0f} ms upstream delay) ---")
+        print(f"requests.get, new connection:  {average(lambda: requests.get(WEATHER_URL, params=params, timeout=HTTP_TIMEOUT).json()):8.2f} ms")
+        print(f"Pooled session, no cache:      {average(lambda: fetch_json(WEATHER_URL, params)):8.2f} ms")
+        print(f"Cached lookup, cold:           {timed(lambda: fetch_weather('London')):8.2f} ms")
+        print(f"Cached lookup, warm:           {average(lambda: fetch_weather('London')):8.3f} ms")
+
+        lookup_cache.clear()
+        hits_before = _StubHandler.hits
+        threads = [threading.Thread(target=fetch_news, args=("technology",)) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(f"{callers} concurrent lookups of one key: {_StubHandler.hits - hits_before} upstream call(s)")
+    finally:
+        server.shutdown()
+
+def parse_args():
+    """Parses the command-line options."""
+    parser = argparse.ArgumentParser(description="Voice-controlled personal assistant.")
+    parser.add_argument('--benchmark-lookups', action='store_true',
+                        help="Measure weather/news lookup latency against a local stub server, then exit.")
+    parser.add_argument('--benchmark-reminders', type=int, metavar='COUNT',
+                        help="Measure the reminder scheduler with COUNT pending reminders, then exit.")
+    parser.add_argument('--simulate', nargs='?', const='streaming', choices=['streaming', 'batch'],
+                        help="Run a scripted conversation on fake audio/TTS backends and report latency, then exit.")
+    parser.add_argument('--check-failures', action='store_true',
+                        help="Check that failing audio/recognizer backends end the conversation instead of hanging, then exit.")
+    parser.add_argument('--benchmark-router', action='store_true',
+                        help="Measure command matching throughput as the number of intents grows, then exit.")
+    parser.add_argument('--benchmark-startup', action='store_true',
+                        help="Measure import and startup time and cached vs. synthesized prompts, then exit.")
+    parser.add_argument('--benchmark-recognizers', nargs='+', metavar='WAV',
+                        help="Compare recognizer latency on recorded WAV files, then exit.")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.benchmark_lookups:
+        benchmark_lookups()
+        raise SystemExit
+    if args.benchmark_reminders:
+        benchmark_reminders(args.benchmark_reminders)
+        raise SystemExit
+    if args.simulate:
+        simulate_assistant(streaming=args.simulate == 'streaming')
+        raise SystemExit
+    if args.check_failures:
+        raise SystemExit(0 if check_backend_failures() else 1)
+    if args.benchmark_router:
+        benchmark_router()
+        raise SystemExit
+    if args.benchmark_recognizers:
+        benchmark_recognizers(args.benchmark_recognizers)
+        raise SystemExit
+    if args.benchmark_startup:
+        benchmark_startup()
+        raise SystemExit
+
+    # Ensure API keys are set before running
+    if OPENWEATHER_API_KEY == "YOUR_OPENWEATHER_API_KEY" or NEWSAPI_API_KEY == "YOUR_NEWSAPI_API_KEY":
+        print("\n--- IMPORTANT ---")
+        print("Please replace 'YOUR_OPENWEATHER_API_KEY' and 'YOUR_NEWSAPI_API_KEY' with your actual API keys.")
+        print("You can get them from: https://openweathermap.org/api and https://newsapi.org/")
+        print("The assistant will not function correctly without valid API keys.")
+        print("-----------------\n")
+        # Optionally, you can exit here or proceed with limited functionality
+        # exit()
+
+    start_assistant()